@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar, cast
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(frozen=True, slots=True)
+class LruCacheStats:
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+    size: int
+
+
+class _Flight(Generic[V]):
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Optional[V] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlightLruCache(Generic[K, V]):
+    """Thread-safe bounded LRU cache with per-entry TTL.
+
+    ``get_or_load`` runs at most one loader per key at a time: callers that
+    ask for a key while its load is in flight wait for that load and share
+    its result (or its exception). Failed loads are not cached.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_s: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size <= 0:
+            raise ValueError("max_size must be > 0")
+        self._max_size = max_size
+        self._ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+        self._flights: Dict[K, _Flight[V]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            return self._get_locked(key)
+
+    def contains(self, key: K) -> bool:
+        """Whether ``key`` holds a fresh value; leaves the LRU order and the counters alone."""
+        with self._lock:
+            item = self._entries.get(key)
+            return item is not None and self._clock() < item[0]
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._put_locked(key, value)
+
+    def get_or_load(self, key: K, loader: Callable[[], V]) -> V:
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not None:
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return cast(V, flight.value)
+
+        try:
+            value = loader()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                self._put_locked(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> LruCacheStats:
+        with self._lock:
+            return LruCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                coalesced=self._coalesced,
+                evictions=self._evictions,
+                size=len(self._entries),
+            )
+
+    def _get_locked(self, key: K) -> Optional[V]:
+        item = self._entries.get(key)
+        if item is None:
+            self._misses += 1
+            return None
+        expires_at, value = item
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def _put_locked(self, key: K, value: V) -> None:
+        self._entries[key] = (self._clock() + self._ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
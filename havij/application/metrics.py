@@ -0,0 +1,265 @@
+"""Call counts, errors and latency histograms for the ports.
+
+``instrument_day_log_repository``, ``instrument_user_repository`` and
+``instrument_product_catalog`` wrap any implementation of the matching port
+and record every call in a ``MetricsRegistry``. Given ``registry=None`` they
+return the implementation itself, so disabled metrics cost nothing.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from havij.application.ports import (
+    BarcodeUsage,
+    DayLogRepository,
+    ProductCatalog,
+    QuickAddItem,
+    UserAuthRecord,
+    UserRepository,
+)
+from havij.domain.model.meal import DayLog, MealEntry
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.nutrients_batch import NutrientsBatch
+from havij.domain.model.product import Product
+from havij.domain.model.user import UserProfile
+
+T = TypeVar("T")
+
+# Upper bounds (seconds) of the latency histogram buckets, as in Prometheus.
+LATENCY_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass(frozen=True, slots=True)
+class CacheCounts:
+    hits: int
+    misses: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class MethodSnapshot:
+    calls: int
+    errors: Dict[str, int]
+    # Non-cumulative counts per LATENCY_BUCKETS_S bucket, plus one for +Inf.
+    buckets: List[int]
+    total_s: float
+
+
+class _MethodMetrics:
+    __slots__ = ("lock", "calls", "errors", "buckets", "total_s")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS_S) + 1)
+        self.total_s = 0.0
+
+
+class MetricsRegistry:
+    """Thread-safe store of per-(port, method) metrics and cache hit counters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._methods: Dict[Tuple[str, str], _MethodMetrics] = {}
+        self._caches: Dict[str, Callable[[], CacheCounts]] = {}
+
+    def observe(self, port: str, method: str, seconds: float, error: Optional[BaseException] = None) -> None:
+        metrics = self._methods.get((port, method))
+        if metrics is None:
+            with self._lock:
+                metrics = self._methods.setdefault((port, method), _MethodMetrics())
+        bucket = bisect_left(LATENCY_BUCKETS_S, seconds)
+        with metrics.lock:
+            metrics.calls += 1
+            metrics.buckets[bucket] += 1
+            metrics.total_s += seconds
+            if error is not None:
+                name = type(error).__name__
+                metrics.errors[name] = metrics.errors.get(name, 0) + 1
+
+    def register_cache(self, name: str, counts: Callable[[], CacheCounts]) -> None:
+        """Report ``counts()`` as the hit/miss counters of cache ``name`` on every export."""
+        with self._lock:
+            self._caches[name] = counts
+
+    def snapshot(self) -> Dict[Tuple[str, str], MethodSnapshot]:
+        with self._lock:
+            items = list(self._methods.items())
+        result: Dict[Tuple[str, str], MethodSnapshot] = {}
+        for key, m in sorted(items):
+            with m.lock:
+                result[key] = MethodSnapshot(m.calls, dict(m.errors), list(m.buckets), m.total_s)
+        return result
+
+    def cache_counts(self) -> Dict[str, CacheCounts]:
+        with self._lock:
+            caches = sorted(self._caches.items())
+        return {name: counts() for name, counts in caches}
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        methods = self.snapshot()
+        lines += [
+            "# HELP havij_port_calls_total Calls per port method.",
+            "# TYPE havij_port_calls_total counter",
+        ]
+        lines += [f"havij_port_calls_total{_labels(port=p, method=m)} {s.calls}" for (p, m), s in methods.items()]
+        lines += [
+            "# HELP havij_port_errors_total Calls that raised, per port method and exception type.",
+            "# TYPE havij_port_errors_total counter",
+        ]
+        for (p, m), s in methods.items():
+            for error, count in sorted(s.errors.items()):
+                lines.append(f"havij_port_errors_total{_labels(port=p, method=m, error=error)} {count}")
+        lines += [
+            "# HELP havij_port_latency_seconds Latency per port method.",
+            "# TYPE havij_port_latency_seconds histogram",
+        ]
+        for (p, m), s in methods.items():
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_S + (float("inf"),), s.buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"havij_port_latency_seconds_bucket{_labels(port=p, method=m, le=le)} {cumulative}")
+            lines.append(f"havij_port_latency_seconds_sum{_labels(port=p, method=m)} {s.total_s!r}")
+            lines.append(f"havij_port_latency_seconds_count{_labels(port=p, method=m)} {s.calls}")
+
+        caches = self.cache_counts()
+        if caches:
+            lines += ["# TYPE havij_cache_hits_total counter"]
+            lines += [f"havij_cache_hits_total{_labels(cache=n)} {c.hits}" for n, c in caches.items()]
+            lines += ["# TYPE havij_cache_misses_total counter"]
+            lines += [f"havij_cache_misses_total{_labels(cache=n)} {c.misses}" for n, c in caches.items()]
+            lines += ["# TYPE havij_cache_hit_ratio gauge"]
+            lines += [f"havij_cache_hit_ratio{_labels(cache=n)} {c.hit_ratio!r}" for n, c in caches.items()]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Instrumented:
+    def __init__(self, registry: MetricsRegistry, port: str):
+        self._registry = registry
+        self._port = port
+
+    def _call(self, method: str, fn: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._registry.observe(self._port, method, time.perf_counter() - started, exc)
+            raise
+        self._registry.observe(self._port, method, time.perf_counter() - started)
+        return result
+
+
+class InstrumentedDayLogRepository(_Instrumented):
+    def __init__(self, inner: DayLogRepository, registry: MetricsRegistry, port: str = "day_log_repository"):
+        super().__init__(registry, port)
+        self._inner = inner
+
+    def load_day(self, day: date, user_id: str) -> DayLog:
+        return self._call("load_day", lambda: self._inner.load_day(day, user_id))
+
+    def save_day(self, log: DayLog, user_id: str) -> None:
+        self._call("save_day", lambda: self._inner.save_day(log, user_id))
+
+    def append_entry(self, day: date, entry: MealEntry, user_id: str) -> None:
+        self._call("append_entry", lambda: self._inner.append_entry(day, entry, user_id))
+
+    def append_entries(self, entries_by_day: Mapping[date, Sequence[MealEntry]], user_id: str) -> None:
+        self._call("append_entries", lambda: self._inner.append_entries(entries_by_day, user_id))
+
+    def delete_entry(self, day: date, entry_id: str, user_id: str) -> Optional[MealEntry]:
+        return self._call("delete_entry", lambda: self._inner.delete_entry(day, entry_id, user_id))
+
+    def totals_between(self, user_id: str, start: date, end: date) -> List[Tuple[date, Nutrients]]:
+        return self._call("totals_between", lambda: self._inner.totals_between(user_id, start, end))
+
+    def iter_entries(self, user_id: str, start: date, end: date) -> Iterator[Tuple[date, MealEntry]]:
+        # Times the query setup only; the caller decides how long iteration takes.
+        return self._call("iter_entries", lambda: self._inner.iter_entries(user_id, start, end))
+
+    def nutrients_between(self, user_id: str, start: date, end: date) -> NutrientsBatch:
+        return self._call("nutrients_between", lambda: self._inner.nutrients_between(user_id, start, end))
+
+    def assign_unowned_entries(self, user_id: str) -> int:
+        return self._call("assign_unowned_entries", lambda: self._inner.assign_unowned_entries(user_id))
+
+    def barcode_usage(self, user_id: str, since: date, limit: int) -> List[BarcodeUsage]:
+        return self._call("barcode_usage", lambda: self._inner.barcode_usage(user_id, since, limit))
+
+    def quick_add_candidates(self, user_id: str, limit: int) -> List[QuickAddItem]:
+        return self._call("quick_add_candidates", lambda: self._inner.quick_add_candidates(user_id, limit))
+
+
+class InstrumentedUserRepository(_Instrumented):
+    def __init__(self, inner: UserRepository, registry: MetricsRegistry, port: str = "user_repository"):
+        super().__init__(registry, port)
+        self._inner = inner
+
+    def create_user(
+        self,
+        user_id: str,
+        username: str,
+        password_hash: str,
+        salt: str,
+        created_at: datetime,
+    ) -> UserProfile:
+        return self._call(
+            "create_user",
+            lambda: self._inner.create_user(user_id, username, password_hash, salt, created_at),
+        )
+
+    def get_auth_by_username(self, username: str) -> Optional[UserAuthRecord]:
+        return self._call("get_auth_by_username", lambda: self._inner.get_auth_by_username(username))
+
+    def get_profile(self, user_id: str) -> Optional[UserProfile]:
+        return self._call("get_profile", lambda: self._inner.get_profile(user_id))
+
+    def count_users(self) -> int:
+        return self._call("count_users", self._inner.count_users)
+
+
+class InstrumentedProductCatalog(_Instrumented):
+    def __init__(self, inner: ProductCatalog, registry: MetricsRegistry, port: str = "product_catalog"):
+        super().__init__(registry, port)
+        self._inner = inner
+
+    def get_by_barcode(self, barcode: str) -> Product:
+        return self._call("get_by_barcode", lambda: self._inner.get_by_barcode(barcode))
+
+
+def instrument_day_log_repository(
+    repo: DayLogRepository, registry: Optional[MetricsRegistry], port: str = "day_log_repository"
+) -> DayLogRepository:
+    return repo if registry is None else InstrumentedDayLogRepository(repo, registry, port)
+
+
+def instrument_user_repository(
+    repo: UserRepository, registry: Optional[MetricsRegistry], port: str = "user_repository"
+) -> UserRepository:
+    return repo if registry is None else InstrumentedUserRepository(repo, registry, port)
+
+
+def instrument_product_catalog(
+    catalog: ProductCatalog, registry: Optional[MetricsRegistry], port: str = "product_catalog"
+) -> ProductCatalog:
+    return catalog if registry is None else InstrumentedProductCatalog(catalog, registry, port)
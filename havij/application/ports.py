@@ -2,19 +2,51 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import List, Optional, Protocol
+from typing import Iterator, List, Mapping, Optional, Protocol, Sequence, Tuple
 
 from havij.domain.model.product import Product
-from havij.domain.model.meal import DayLog
+from havij.domain.model.meal import DayLog, MealEntry
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.nutrients_batch import NutrientsBatch
 from havij.domain.model.user import UserProfile
 
 class ProductCatalog(Protocol):
     def get_by_barcode(self, barcode: str) -> Product: ...
 
+class AsyncProductCatalog(Protocol):
+    async def get_by_barcode(self, barcode: str) -> Product: ...
+
+class ProductSearch(Protocol):
+    def search(self, query: str, limit: int) -> List[Product]: ...
+
+@dataclass(frozen=True, slots=True)
+class BarcodeUsage:
+    barcode: str
+    entries: int
+    last_day: date
+
+@dataclass(frozen=True, slots=True)
+class QuickAddItem:
+    """A food the user logs often or lately, with the grams of its last entry."""
+    barcode: str
+    product_name: str
+    grams: float
+    nutrients_per_100g: Nutrients
+    uses: int
+    last_used: datetime
+
 class DayLogRepository(Protocol):
     def load_day(self, day: date, user_id: str) -> DayLog: ...
     def save_day(self, log: DayLog, user_id: str) -> None: ...
+    def append_entry(self, day: date, entry: MealEntry, user_id: str) -> None: ...
+    def append_entries(self, entries_by_day: Mapping[date, Sequence[MealEntry]], user_id: str) -> None: ...
+    def delete_entry(self, day: date, entry_id: str, user_id: str) -> Optional[MealEntry]: ...
+    def totals_between(self, user_id: str, start: date, end: date) -> List[Tuple[date, Nutrients]]: ...
+    def iter_entries(self, user_id: str, start: date, end: date) -> Iterator[Tuple[date, MealEntry]]: ...
+    def nutrients_between(self, user_id: str, start: date, end: date) -> NutrientsBatch: ...
     def assign_unowned_entries(self, user_id: str) -> int: ...
+    def barcode_usage(self, user_id: str, since: date, limit: int) -> List[BarcodeUsage]: ...
+    def quick_add_candidates(self, user_id: str, limit: int) -> List[QuickAddItem]: ...
 
 @dataclass(frozen=True, slots=True)
 class UserAuthRecord:
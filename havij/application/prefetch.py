@@ -0,0 +1,188 @@
+"""Warm the product cache with a user's usual products when they log in.
+
+Most entries are repeat products, so right after a login ``ProductPrefetcher``
+looks up the barcodes the user logged most often and most recently, in the
+background, until ``max_products`` are loaded or ``budget_s`` has passed. Its
+stats count how many prefetched products were then actually looked up.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from havij.application.caching import SingleFlightLruCache
+from havij.application.ports import BarcodeUsage, DayLogRepository, ProductCatalog
+from havij.domain.model.product import Product
+from havij.domain.rules import normalize_barcode, validate_barcode
+
+# Barcodes read per run, per product to prefetch.
+_USAGE_ROWS_PER_PRODUCT = 10
+
+
+@dataclass(frozen=True, slots=True)
+class PrefetchStats:
+    # Runs started, and logins skipped because a run for the user was pending.
+    runs: int
+    skipped: int
+    # Products loaded into the cache, lookups that failed, and candidates left
+    # over when a run hit its time budget.
+    prefetched: int
+    failed: int
+    over_budget: int
+    # Prefetched products looked up before their cache entry expired.
+    used: int
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.used / self.prefetched if self.prefetched else 0.0
+
+
+class ProductPrefetcher:
+    """Background product-cache warming after login.
+
+    Candidates come from the last ``lookback_days`` of the user's log: the most
+    frequent and the most recent barcodes, alternately. Products already in
+    ``cache`` are skipped; the rest are loaded through ``catalog`` one at a
+    time on a single worker thread, so prefetching never has more than one
+    request of its own in flight. ``budget_s`` is checked before each lookup.
+    Call ``note_lookup`` for every product lookup to count prefetch hits.
+    """
+
+    def __init__(
+        self,
+        repo: DayLogRepository,
+        catalog: ProductCatalog,
+        cache: SingleFlightLruCache[str, Product],
+        max_products: int = 20,
+        budget_s: float = 2.0,
+        lookback_days: int = 90,
+        track_ttl_s: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        today: Callable[[], date] = date.today,
+    ):
+        if max_products <= 0:
+            raise ValueError("max_products must be > 0")
+        if lookback_days <= 0:
+            raise ValueError("lookback_days must be > 0")
+        self._repo = repo
+        self._catalog = catalog
+        self._cache = cache
+        self._max_products = max_products
+        self._budget_s = budget_s
+        self._lookback_days = lookback_days
+        self._track_ttl_s = track_ttl_s
+        self._clock = clock
+        self._today = today
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="product-prefetch")
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        # Prefetched barcodes not looked up yet, with when to stop waiting for one.
+        self._unused: Dict[str, float] = {}
+        self._runs = 0
+        self._skipped = 0
+        self._prefetched = 0
+        self._failed = 0
+        self._over_budget = 0
+        self._used = 0
+
+    def schedule(self, user_id: str) -> Optional[Future[int]]:
+        """Prefetch for ``user_id`` in the background; None if a run is already pending."""
+        with self._lock:
+            if user_id in self._pending:
+                self._skipped += 1
+                return None
+            self._pending.add(user_id)
+        try:
+            return self._executor.submit(self._run, user_id)
+        except RuntimeError:
+            # Shut down: the app is closing.
+            with self._lock:
+                self._pending.discard(user_id)
+            return None
+
+    def prefetch(self, user_id: str) -> int:
+        """Prefetch on the calling thread; returns how many products were loaded."""
+        deadline = self._clock() + self._budget_s
+        since = self._today() - timedelta(days=self._lookback_days - 1)
+        usage = self._repo.barcode_usage(user_id, since, self._max_products * _USAGE_ROWS_PER_PRODUCT)
+        candidates = [b for b in pick_candidates(usage, len(usage)) if not self._cache.contains(b)]
+        candidates = candidates[: self._max_products]
+        loaded = failed = 0
+        for index, barcode in enumerate(candidates):
+            if self._clock() >= deadline:
+                with self._lock:
+                    self._over_budget += len(candidates) - index
+                break
+            try:
+                self._cache.get_or_load(barcode, lambda: self._catalog.get_by_barcode(barcode))
+            except Exception:
+                failed += 1
+                continue
+            loaded += 1
+            with self._lock:
+                self._unused[barcode] = self._clock() + self._track_ttl_s
+        with self._lock:
+            self._runs += 1
+            self._prefetched += loaded
+            self._failed += failed
+            self._forget_expired_locked()
+        return loaded
+
+    def note_lookup(self, barcode: str) -> None:
+        with self._lock:
+            expires_at = self._unused.pop(barcode, None)
+            if expires_at is not None and self._clock() < expires_at:
+                self._used += 1
+
+    def stats(self) -> PrefetchStats:
+        with self._lock:
+            self._forget_expired_locked()
+            return PrefetchStats(
+                runs=self._runs,
+                skipped=self._skipped,
+                prefetched=self._prefetched,
+                failed=self._failed,
+                over_budget=self._over_budget,
+                used=self._used,
+            )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _forget_expired_locked(self) -> None:
+        now = self._clock()
+        for barcode in [b for b, expires_at in self._unused.items() if now >= expires_at]:
+            del self._unused[barcode]
+
+    def _run(self, user_id: str) -> int:
+        try:
+            return self.prefetch(user_id)
+        finally:
+            with self._lock:
+                self._pending.discard(user_id)
+
+
+def pick_candidates(usage: Sequence[BarcodeUsage], n: int) -> List[str]:
+    """Up to ``n`` normalized barcodes, alternating most frequent and most recent."""
+    by_frequency = sorted(usage, key=lambda u: (-u.entries, -u.last_day.toordinal()))
+    by_recency = sorted(usage, key=lambda u: -u.last_day.toordinal())
+    picked: List[str] = []
+    seen: Set[str] = set()
+    for frequent, recent in zip(by_frequency, by_recency):
+        for u in (frequent, recent):
+            key = normalize_barcode(u.barcode)
+            if key in seen:
+                continue
+            seen.add(key)
+            try:
+                validate_barcode(key)
+            except ValueError:
+                continue
+            picked.append(key)
+            if len(picked) >= n:
+                return picked
+    return picked
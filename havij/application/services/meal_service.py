@@ -1,18 +1,41 @@
 from __future__ import annotations
 
 import uuid
+from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-from havij.application.ports import DayLogRepository, ProductCatalog
+from havij.application.ports import DayLogRepository, ProductCatalog, QuickAddItem
 from havij.domain.model.meal import DayLog, MealEntry
 from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.nutrients_batch import NutrientsBatch
 from havij.domain.rules import (
     validate_grams,
+    validate_kcal_per_100g,
     validate_macros_per_100g,
     validate_product_name,
 )
 
+@dataclass(frozen=True, slots=True)
+class MealEntryDraft:
+    """One entry to log through ``MealService.add_entries``."""
+    day: date
+    product_name: str
+    grams: float
+    nutrients_per_100g: Nutrients
+    when: Optional[datetime] = None
+    barcode: str = ""
+
+@dataclass(frozen=True, slots=True)
+class BulkAddError:
+    index: int
+    message: str
+
+@dataclass(frozen=True, slots=True)
+class BulkAddResult:
+    added: List[MealEntry] = field(default_factory=list)
+    errors: List[BulkAddError] = field(default_factory=list)
+
 class MealService:
     def __init__(self, repo: DayLogRepository, catalog: ProductCatalog | None = None):
         self._repo = repo
@@ -27,52 +50,109 @@ class MealService:
         when: Optional[datetime] = None,
         barcode: str = "",
     ) -> MealEntry:
-        validate_grams(grams)
-        validate_product_name(product_name)
-        validate_macros_per_100g(
-            nutrients_per_100g.protein_g,
-            nutrients_per_100g.carbs_g,
-            nutrients_per_100g.fat_g,
-        )
-        when = when or datetime.now()
-
-        nutrients = nutrients_per_100g.scale(grams / 100.0)
-
-        entry = MealEntry(
-            entry_id=str(uuid.uuid4()),
-            timestamp=when,
-            barcode=barcode,
-            product_name=product_name,
-            grams=grams,
-            nutrients=nutrients,
-        )
-
-        log = self._repo.load_day(day, user_id)
-        log.add_entry(entry)
-        self._repo.save_day(log, user_id)
+        entry = _build_entry(product_name, grams, nutrients_per_100g, when, barcode)
+        self._repo.append_entry(day, entry, user_id)
         return entry
 
+    def add_entries(self, user_id: str, items: Iterable[MealEntryDraft]) -> BulkAddResult:
+        """Validate and store many entries in a single transaction.
+
+        Invalid items are reported by their position in ``items`` and skipped;
+        the valid ones are still written.
+        """
+        result = BulkAddResult()
+        by_day: Dict[date, List[MealEntry]] = {}
+        for index, item in enumerate(items):
+            try:
+                entry = _build_entry(
+                    item.product_name,
+                    item.grams,
+                    item.nutrients_per_100g,
+                    item.when,
+                    item.barcode,
+                )
+            except ValueError as exc:
+                result.errors.append(BulkAddError(index=index, message=str(exc)))
+                continue
+            by_day.setdefault(item.day, []).append(entry)
+            result.added.append(entry)
+        if by_day:
+            self._repo.append_entries(by_day, user_id)
+        return result
+
     def remove_entry(self, user_id: str, day: date, entry_id: str) -> bool:
-        log = self._repo.load_day(day, user_id)
-        removed = log.remove_entry(entry_id)
-        if removed:
-            self._repo.save_day(log, user_id)
-        return removed
+        return self._repo.delete_entry(day, entry_id, user_id) is not None
 
     def get_day_log(self, user_id: str, day: date) -> DayLog:
         return self._repo.load_day(day, user_id)
 
     def get_day_totals(self, user_id: str, day: date) -> Nutrients:
-        return self.get_day_log(user_id, day).total_nutrients()
+        [(_, totals)] = self._repo.totals_between(user_id, day, day)
+        return totals
 
     def get_last_days_totals(self, user_id: str, end_day: date, days: int = 7) -> List[Tuple[date, Nutrients]]:
         if days <= 0:
             raise ValueError("days must be > 0")
-        result: List[Tuple[date, Nutrients]] = []
-        for i in range(days-1, -1, -1):
-            d = end_day - timedelta(days=i)
-            result.append((d, self.get_day_totals(user_id, d)))
-        return result
+        start_day = end_day - timedelta(days=days - 1)
+        return self._repo.totals_between(user_id, start_day, end_day)
+
+    def get_rolling_averages(
+        self, user_id: str, end_day: date, days: int = 7, window: int = 7
+    ) -> List[Tuple[date, Nutrients]]:
+        """Average daily intake over the ``window`` days ending on each of the last ``days`` days."""
+        if days <= 0 or window <= 0:
+            raise ValueError("days and window must be > 0")
+        start_day = end_day - timedelta(days=days + window - 2)
+        totals = self._repo.totals_between(user_id, start_day, end_day)
+        batch = NutrientsBatch.from_nutrients((n for _, n in totals), (d for d, _ in totals))
+        return batch.rolling_mean(window).to_list()[-days:]
+
+    def get_nutrients_between(self, user_id: str, start: date, end: date) -> NutrientsBatch:
+        """Per-entry nutrients as columns, for summaries over long ranges."""
+        return self._repo.nutrients_between(user_id, start, end)
+
+    def iter_entries(self, user_id: str, start: date, end: date) -> Iterator[Tuple[date, MealEntry]]:
+        """Stream every entry logged between ``start`` and ``end`` (inclusive)."""
+        return self._repo.iter_entries(user_id, start, end)
+
+    def quick_add_candidates(self, user_id: str, n: int = 10) -> List[QuickAddItem]:
+        """Foods for one-tap logging, recent and frequent ones first, with their last-used grams.
+
+        Read from an index kept up to date by every entry write, so the cost
+        does not grow with the length of the user's history.
+        """
+        if n <= 0:
+            raise ValueError("n must be > 0")
+        return self._repo.quick_add_candidates(user_id, n)
 
     def assign_unowned_entries(self, user_id: str) -> int:
         return self._repo.assign_unowned_entries(user_id)
+
+
+def _build_entry(
+    product_name: str,
+    grams: float,
+    nutrients_per_100g: Nutrients,
+    when: Optional[datetime],
+    barcode: str,
+) -> MealEntry:
+    validate_grams(grams)
+    validate_product_name(product_name)
+    validate_kcal_per_100g(nutrients_per_100g.kcal)
+    validate_macros_per_100g(
+        nutrients_per_100g.protein_g,
+        nutrients_per_100g.carbs_g,
+        nutrients_per_100g.fat_g,
+    )
+    when = when or datetime.now()
+
+    nutrients = nutrients_per_100g.scale(grams / 100.0)
+
+    return MealEntry(
+        entry_id=str(uuid.uuid4()),
+        timestamp=when,
+        barcode=barcode,
+        product_name=product_name,
+        grams=grams,
+        nutrients=nutrients,
+    )
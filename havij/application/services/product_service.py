@@ -1,13 +1,171 @@
 from __future__ import annotations
 
-from havij.application.ports import ProductCatalog
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from havij.application.caching import SingleFlightLruCache
+from havij.application.ports import AsyncProductCatalog, ProductCatalog, ProductSearch
 from havij.domain.model.product import Product
-from havij.domain.rules import validate_barcode
+from havij.domain.rules import normalize_barcode, validate_barcode
+
+@dataclass(frozen=True, slots=True)
+class ProductLookupResult:
+    barcode: str
+    product: Optional[Product] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.product is not None
 
 class ProductService:
-    def __init__(self, catalog: ProductCatalog):
+    def __init__(
+        self,
+        catalog: ProductCatalog,
+        cache: SingleFlightLruCache[str, Product] | None = None,
+        max_concurrency: int = 8,
+        search: ProductSearch | None = None,
+        # Called with every valid, normalized barcode looked up.
+        on_lookup: Callable[[str], None] | None = None,
+    ):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be > 0")
         self._catalog = catalog
+        self._cache = cache
+        self._max_concurrency = max_concurrency
+        self._search = search
+        self._on_lookup = on_lookup
+
+    @property
+    def can_search(self) -> bool:
+        return self._search is not None
 
     def lookup_product(self, barcode: str) -> Product:
         validate_barcode(barcode)
-        return self._catalog.get_by_barcode(barcode)
+        key = normalize_barcode(barcode)
+        if self._on_lookup is not None:
+            self._on_lookup(key)
+        if self._cache is None:
+            return self._catalog.get_by_barcode(key)
+        return self._cache.get_or_load(key, lambda: self._catalog.get_by_barcode(key))
+
+    def lookup_many(self, barcodes: Iterable[str]) -> List[ProductLookupResult]:
+        """Resolve several barcodes at once.
+
+        Duplicates are looked up once, cached products are served without a
+        fetch, and the remaining barcodes are fetched concurrently (at most
+        ``max_concurrency`` at a time). Results keep the input order.
+        """
+        keys: List[str] = []
+        results: Dict[str, ProductLookupResult] = {}
+        pending: List[str] = []
+        seen: Set[str] = set()
+        for barcode in barcodes:
+            key = normalize_barcode(barcode)
+            keys.append(key)
+            if key in seen:
+                continue
+            seen.add(key)
+            try:
+                validate_barcode(key)
+            except ValueError as exc:
+                results[key] = ProductLookupResult(barcode=key, error=exc)
+                continue
+            cached = self._cache.get(key) if self._cache is not None else None
+            if cached is not None:
+                if self._on_lookup is not None:
+                    self._on_lookup(key)
+                results[key] = ProductLookupResult(barcode=key, product=cached)
+            else:
+                pending.append(key)
+
+        if len(pending) == 1:
+            results[pending[0]] = self._lookup_one(pending[0])
+        elif pending:
+            workers = min(self._max_concurrency, len(pending))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="product-lookup") as pool:
+                for result in pool.map(self._lookup_one, pending):
+                    results[result.barcode] = result
+
+        return [results[key] for key in keys]
+
+    def search(self, query: str, limit: int = 10) -> List[Product]:
+        """Products whose name or brand matches ``query`` (the last word may be partial), best first."""
+        if self._search is None:
+            raise RuntimeError("product search requires a local catalog")
+        if limit <= 0:
+            raise ValueError("limit must be > 0")
+        query = query.strip()
+        if not query:
+            return []
+        return self._search.search(query, limit)
+
+    def _lookup_one(self, key: str) -> ProductLookupResult:
+        try:
+            return ProductLookupResult(barcode=key, product=self.lookup_product(key))
+        except Exception as exc:
+            return ProductLookupResult(barcode=key, error=exc)
+
+
+class AsyncProductService:
+    """``ProductService`` for asyncio front ends: lookups run on one event loop, no threads.
+
+    ``lookup_many`` fans hundreds of barcodes out at once; ``max_concurrency``
+    bounds how many are fetched at the same time. Lookups of a barcode already
+    being fetched on the loop wait for that fetch instead of starting another.
+    The cache may be shared with a threaded ``ProductService``.
+    """
+
+    def __init__(
+        self,
+        catalog: AsyncProductCatalog,
+        cache: SingleFlightLruCache[str, Product] | None = None,
+        max_concurrency: int = 64,
+    ):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be > 0")
+        self._catalog = catalog
+        self._cache = cache
+        self._max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, asyncio.Future[Product]] = {}
+
+    async def lookup_product(self, barcode: str) -> Product:
+        validate_barcode(barcode)
+        key = normalize_barcode(barcode)
+        cached = self._cache.get(key) if self._cache is not None else None
+        if cached is not None:
+            return cached
+        pending = self._in_flight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(key))
+            self._in_flight[key] = pending
+            pending.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded so that one cancelled caller does not cancel the others' fetch.
+        return await asyncio.shield(pending)
+
+    async def lookup_many(self, barcodes: Iterable[str]) -> List[ProductLookupResult]:
+        """Resolve several barcodes concurrently; results keep the input order."""
+        keys = [normalize_barcode(b) for b in barcodes]
+        unique = list(dict.fromkeys(keys))
+        outcomes = await asyncio.gather(*(self.lookup_product(k) for k in unique), return_exceptions=True)
+        results: Dict[str, ProductLookupResult] = {}
+        for key, outcome in zip(unique, outcomes):
+            if isinstance(outcome, Product):
+                results[key] = ProductLookupResult(barcode=key, product=outcome)
+            elif isinstance(outcome, Exception):
+                results[key] = ProductLookupResult(barcode=key, error=outcome)
+            else:
+                raise outcome
+        return [results[key] for key in keys]
+
+    async def _fetch(self, key: str) -> Product:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_concurrency)
+        async with self._slots:
+            product = await self._catalog.get_by_barcode(key)
+        if self._cache is not None:
+            self._cache.put(key, product)
+        return product
@@ -1,20 +1,93 @@
 from __future__ import annotations
 
+import base64
 import hashlib
 import hmac
+import multiprocessing
 import secrets
+import threading
+import time
 import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Callable, Dict, Optional, Protocol
 
-from havij.application.ports import UserRepository
+from havij.application.ports import UserAuthRecord, UserRepository
 from havij.domain.model.user import UserProfile
 
 _PBKDF2_ITERATIONS = 120_000
 
 
+class LoginThrottledError(RuntimeError):
+    pass
+
+
+class PasswordHasher(Protocol):
+    def submit(self, password: str, salt: bytes) -> Future[str]: ...
+
+
+class InlinePasswordHasher:
+    """Hashes on the calling thread; the returned future is already resolved."""
+
+    def submit(self, password: str, salt: bytes) -> Future[str]:
+        future: Future[str] = Future()
+        try:
+            future.set_result(_hash_password(password, salt))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+class ProcessPoolPasswordHasher:
+    """Hashes in worker processes, so PBKDF2 never holds up request threads.
+
+    ``max_workers`` also caps how many CPU cores password hashing can use.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def submit(self, password: str, salt: bytes) -> Future[str]:
+        return self._pool.submit(_hash_password, password, salt)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass
+class _LoginAttempts:
+    failures: int = 0
+    in_flight: int = 0
+    window_start: float = 0.0
+
+
 class UserService:
-    def __init__(self, repo: UserRepository):
+    def __init__(
+        self,
+        repo: UserRepository,
+        hasher: PasswordHasher | None = None,
+        session_secret: bytes | None = None,
+        session_ttl_s: float = 12 * 3600.0,
+        max_failed_logins: int = 5,
+        login_lockout_s: float = 300.0,
+        clock: Callable[[], float] = time.time,
+        # Called with the profile after every successful authenticate.
+        on_login: Callable[[UserProfile], object] | None = None,
+    ):
         self._repo = repo
+        self._hasher = hasher or InlinePasswordHasher()
+        self._session_secret = session_secret or secrets.token_bytes(32)
+        self._session_ttl_s = session_ttl_s
+        self._max_failed_logins = max_failed_logins
+        self._login_lockout_s = login_lockout_s
+        self._clock = clock
+        self._on_login = on_login
+        self._attempts_lock = threading.Lock()
+        self._attempts: Dict[str, _LoginAttempts] = {}
 
     def signup(self, username: str, password: str) -> UserProfile:
         username = username.strip()
@@ -26,34 +99,64 @@ class UserService:
             raise ValueError("Username already exists")
 
         salt = secrets.token_bytes(16)
-        password_hash = _hash_password(password, salt)
-        user_id = str(uuid.uuid4())
-        created_at = datetime.utcnow()
+        # Only the hash is computed by the hasher; the repository is used on
+        # this thread, which may be the only one its connection accepts.
+        password_hash = self._hasher.submit(password, salt).result()
         return self._repo.create_user(
-            user_id=user_id,
+            user_id=str(uuid.uuid4()),
             username=username,
             password_hash=password_hash,
             salt=salt.hex(),
-            created_at=created_at,
+            created_at=datetime.utcnow(),
         )
 
     def authenticate(self, username: str, password: str) -> UserProfile | None:
+        """Verify credentials; only the hash leaves the calling thread.
+
+        Raises ``LoginThrottledError`` (without hashing) once a username has
+        ``max_failed_logins`` recent failures or attempts still in flight.
+        """
         username = username.strip()
         if not username or not password:
             return None
         record = self._repo.get_auth_by_username(username)
         if not record:
             return None
-        salt = bytes.fromhex(record.salt)
-        expected = record.password_hash
-        candidate = _hash_password(password, salt)
-        if not hmac.compare_digest(expected, candidate):
+
+        self._begin_attempt(username)
+        ok = False
+        try:
+            candidate = self._hasher.submit(password, bytes.fromhex(record.salt)).result()
+            ok = hmac.compare_digest(record.password_hash, candidate)
+        finally:
+            self._end_attempt(username, success=ok)
+        if not ok:
             return None
-        return UserProfile(
-            user_id=record.user_id,
-            username=record.username,
-            created_at=record.created_at,
-        )
+        profile = _to_profile(record)
+        if self._on_login is not None:
+            self._on_login(profile)
+        return profile
+
+    def issue_session_token(self, user_id: str) -> str:
+        """Signed, expiring token that proves a completed login without rehashing."""
+        expires_at = int(self._clock() + self._session_ttl_s)
+        payload = f"{user_id}:{expires_at}".encode("utf-8")
+        return f"{_b64(payload)}.{_b64(self._sign(payload))}"
+
+    def verify_session_token(self, token: str) -> str | None:
+        """Return the token's user id, or None if it is malformed, forged or expired."""
+        try:
+            payload_b64, signature_b64 = token.split(".")
+            payload = _unb64(payload_b64)
+            signature = _unb64(signature_b64)
+        except ValueError:
+            return None
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        user_id, _, expires_at = payload.decode("utf-8").rpartition(":")
+        if not user_id or not expires_at.isdigit() or int(expires_at) < self._clock():
+            return None
+        return user_id
 
     def get_profile(self, user_id: str) -> UserProfile | None:
         return self._repo.get_profile(user_id)
@@ -61,6 +164,35 @@ class UserService:
     def count_users(self) -> int:
         return self._repo.count_users()
 
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._session_secret, payload, hashlib.sha256).digest()
+
+    def _begin_attempt(self, username: str) -> None:
+        now = self._clock()
+        with self._attempts_lock:
+            attempts = self._attempts.get(username)
+            if attempts is None:
+                attempts = self._attempts[username] = _LoginAttempts(window_start=now)
+            elif attempts.in_flight == 0 and now - attempts.window_start >= self._login_lockout_s:
+                attempts.failures = 0
+                attempts.window_start = now
+            if attempts.failures + attempts.in_flight >= self._max_failed_logins:
+                raise LoginThrottledError("Too many login attempts; try again later")
+            attempts.in_flight += 1
+
+    def _end_attempt(self, username: str, success: bool) -> None:
+        with self._attempts_lock:
+            attempts = self._attempts.get(username)
+            if attempts is None or attempts.in_flight == 0:
+                return
+            attempts.in_flight -= 1
+            if success:
+                del self._attempts[username]
+            else:
+                if attempts.failures == 0:
+                    attempts.window_start = self._clock()
+                attempts.failures += 1
+
 
 def _hash_password(password: str, salt: bytes) -> str:
     digest = hashlib.pbkdf2_hmac(
@@ -70,3 +202,19 @@ def _hash_password(password: str, salt: bytes) -> str:
         _PBKDF2_ITERATIONS,
     )
     return digest.hex()
+
+
+def _to_profile(record: UserAuthRecord) -> UserProfile:
+    return UserProfile(
+        user_id=record.user_id,
+        username=record.username,
+        created_at=record.created_at,
+    )
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
@@ -32,7 +32,10 @@ class DayLog:
         return len(self.entries) != before
 
     def total_nutrients(self) -> Nutrients:
-        total = Nutrients.zero()
-        for e in self.entries:
-            total = total + e.nutrients
-        return total
+        # Summing each field directly avoids allocating a Nutrients per entry.
+        return Nutrients(
+            kcal=sum((e.nutrients.kcal for e in self.entries), 0.0),
+            protein_g=sum((e.nutrients.protein_g for e in self.entries), 0.0),
+            carbs_g=sum((e.nutrients.carbs_g for e in self.entries), 0.0),
+            fat_g=sum((e.nutrients.fat_g for e in self.entries), 0.0),
+        )
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .nutrients import Nutrients
+
+# Row order of ``NutrientsBatch.columns``.
+COLUMNS = ("kcal", "protein_g", "carbs_g", "fat_g")
+
+
+class NutrientsBatch:
+    """Many ``Nutrients`` stored column-wise: one contiguous float array per nutrient.
+
+    ``columns`` has shape ``(4, n)`` in ``COLUMNS`` order. ``days`` optionally
+    holds one date ordinal (``date.toordinal()``) per row, which enables the
+    per-day operations. Every operation returns a new batch.
+    """
+    __slots__ = ("columns", "days")
+
+    def __init__(self, columns: np.ndarray, days: Optional[np.ndarray] = None):
+        columns = np.ascontiguousarray(columns, dtype=np.float64).reshape(len(COLUMNS), -1)
+        if days is not None:
+            days = np.asarray(days, dtype=np.int64)
+            if days.shape != (columns.shape[1],):
+                raise ValueError("days must have one entry per row")
+        self.columns = columns
+        self.days = days
+
+    @staticmethod
+    def empty(with_days: bool = True) -> "NutrientsBatch":
+        return NutrientsBatch(np.empty((len(COLUMNS), 0)), np.empty(0, dtype=np.int64) if with_days else None)
+
+    @staticmethod
+    def from_nutrients(items: Iterable[Nutrients], days: Optional[Iterable[date]] = None) -> "NutrientsBatch":
+        rows = [(n.kcal, n.protein_g, n.carbs_g, n.fat_g) for n in items]
+        columns = np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS)).T
+        ordinals = None if days is None else np.array([d.toordinal() for d in days], dtype=np.int64)
+        return NutrientsBatch(columns, ordinals)
+
+    @staticmethod
+    def from_rows(rows: Sequence[Sequence[float]]) -> "NutrientsBatch":
+        """Build from ``(day_ordinal, kcal, protein_g, carbs_g, fat_g)`` rows, e.g. a query result."""
+        if not rows:
+            return NutrientsBatch.empty()
+        table = np.array(rows, dtype=np.float64).T
+        return NutrientsBatch(table[1:], table[0].astype(np.int64))
+
+    @staticmethod
+    def concat(batches: Sequence["NutrientsBatch"]) -> "NutrientsBatch":
+        if not batches:
+            return NutrientsBatch.empty()
+        columns = np.concatenate([b.columns for b in batches], axis=1)
+        day_arrays = [b.days for b in batches if b.days is not None]
+        if len(day_arrays) != len(batches):
+            return NutrientsBatch(columns)
+        return NutrientsBatch(columns, np.concatenate(day_arrays))
+
+    def __len__(self) -> int:
+        return int(self.columns.shape[1])
+
+    @property
+    def kcal(self) -> np.ndarray:
+        return self.columns[0]
+
+    @property
+    def protein_g(self) -> np.ndarray:
+        return self.columns[1]
+
+    @property
+    def carbs_g(self) -> np.ndarray:
+        return self.columns[2]
+
+    @property
+    def fat_g(self) -> np.ndarray:
+        return self.columns[3]
+
+    def row(self, index: int) -> Nutrients:
+        kcal, protein_g, carbs_g, fat_g = (float(v) for v in self.columns[:, index])
+        return Nutrients(kcal, protein_g, carbs_g, fat_g)
+
+    def scale(self, factor: Union[float, np.ndarray]) -> "NutrientsBatch":
+        """Multiply every row by ``factor``, a scalar or one factor per row (e.g. grams / 100)."""
+        return NutrientsBatch(self.columns * np.asarray(factor, dtype=np.float64), self.days)
+
+    def sum(self) -> Nutrients:
+        kcal, protein_g, carbs_g, fat_g = (float(v) for v in self.columns.sum(axis=1))
+        return Nutrients(kcal, protein_g, carbs_g, fat_g)
+
+    def sum_by_day(self) -> "NutrientsBatch":
+        """One row per distinct day, in day order."""
+        days = self._require_days()
+        if not len(days):
+            return NutrientsBatch.empty()
+        first = int(days.min())
+        offsets = days - first
+        present = np.bincount(offsets) > 0
+        totals = self._bin(offsets, len(present))
+        return NutrientsBatch(totals[:, present], np.flatnonzero(present) + first)
+
+    def daily(self, start: date, end: date) -> "NutrientsBatch":
+        """One row per day from ``start`` to ``end``; days without rows are zero."""
+        if end < start:
+            raise ValueError("end must be >= start")
+        days = self._require_days()
+        first = start.toordinal()
+        count = end.toordinal() - first + 1
+        offsets = days - first
+        # Rows outside the range land in one extra bin that is dropped.
+        offsets = np.where((offsets >= 0) & (offsets < count), offsets, count)
+        totals = self._bin(offsets, count + 1)[:, :count]
+        return NutrientsBatch(totals, np.arange(first, first + count, dtype=np.int64))
+
+    def rolling_sum(self, window: int) -> "NutrientsBatch":
+        """Sum of each row and the ``window - 1`` rows before it.
+
+        Meant for the output of ``daily``, where rows are consecutive days; the
+        first rows sum over the shorter history available.
+        """
+        if window <= 0:
+            raise ValueError("window must be > 0")
+        cumulative = np.cumsum(self.columns, axis=1)
+        shifted = np.zeros_like(cumulative)
+        if window < len(self):
+            shifted[:, window:] = cumulative[:, :-window]
+        return NutrientsBatch(cumulative - shifted, self.days)
+
+    def rolling_mean(self, window: int) -> "NutrientsBatch":
+        """``rolling_sum`` divided by the number of rows actually in each window."""
+        counts = np.minimum(np.arange(1, len(self) + 1), window)
+        return self.rolling_sum(window).scale(1.0 / counts)
+
+    def to_list(self) -> List[Tuple[date, Nutrients]]:
+        days = self._require_days()
+        return [(date.fromordinal(int(d)), self.row(i)) for i, d in enumerate(days)]
+
+    def _bin(self, bins: np.ndarray, count: int) -> np.ndarray:
+        return np.stack([np.bincount(bins, weights=c, minlength=count) for c in self.columns])
+
+    def _require_days(self) -> np.ndarray:
+        if self.days is None:
+            raise ValueError("this batch has no days")
+        return self.days
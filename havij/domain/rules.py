@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import math
+
 MAX_GRAMS = 3000.0
 
 
+def _validate_finite(label: str, value: float) -> None:
+    # NaN slips through every comparison below, and inf would reach the totals.
+    if not math.isfinite(value):
+        raise ValueError(f"{label} must be a finite number")
+
+
 def validate_grams(grams: float) -> None:
+    _validate_finite("grams", grams)
     if grams <= 0:
         raise ValueError("grams must be > 0")
     if grams > MAX_GRAMS:
@@ -24,15 +33,26 @@ def validate_barcode(barcode: str) -> None:
         raise ValueError("barcode must contain only digits")
 
 
+def normalize_barcode(barcode: str) -> str:
+    return barcode.strip()
+
+
 def validate_macros_per_100g(
     protein_g: float,
     carbs_g: float,
     fat_g: float,
 ) -> None:
     for label, value in (("protein", protein_g), ("carbs", carbs_g), ("fat", fat_g)):
+        _validate_finite(label, value)
         if value < 0:
             raise ValueError(f"{label} must be >= 0")
         if value > 100:
             raise ValueError(f"{label} must be <= 100")
     if protein_g + carbs_g + fat_g > 100:
         raise ValueError("protein + carbs + fat must be <= 100")
+
+
+def validate_kcal_per_100g(kcal: float) -> None:
+    _validate_finite("kcal", kcal)
+    if kcal < 0:
+        raise ValueError("kcal must be >= 0")
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Optional
+
+from havij.domain.model.product import Product
+from havij.infrastructure.api.circuit_breaker import CircuitBreaker
+from havij.infrastructure.api.openfoodfacts_client import (
+    RETRY_STATUSES,
+    CircuitOpenError,
+    OpenFoodFactsClient,
+    OpenFoodFactsError,
+    ProductNotFoundError,
+    UpstreamUnavailableError,
+    backoff_delay,
+    product_from_response,
+    product_url,
+)
+
+
+class AsyncOpenFoodFactsClient:
+    """asyncio counterpart of ``OpenFoodFactsClient``. Needs aiohttp.
+
+    One pooled ``aiohttp`` session serves every lookup; at most
+    ``max_concurrency`` requests are in flight at once, and further lookups
+    wait for a slot. Field projection, compression, retries and the circuit
+    breaker behave as in the threaded client. The session belongs to the event
+    loop of the first lookup; ``close`` it (or use ``async with``) before that
+    loop ends.
+    """
+
+    BASE_URL = OpenFoodFactsClient.BASE_URL
+
+    def __init__(
+        self,
+        timeout_s: float = 10.0,
+        max_concurrency: int = 32,
+        max_retries: int = 2,
+        backoff_s: float = 0.25,
+        max_backoff_s: float = 4.0,
+        breaker: Optional[CircuitBreaker] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        rng: Optional[random.Random] = None,
+    ):
+        try:
+            import aiohttp
+        except ImportError as exc:
+            raise RuntimeError("the async client needs aiohttp (pip install aiohttp)") from exc
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be > 0")
+        if max_retries < 0:
+            raise ValueError("max_retries must be >= 0")
+        self._aiohttp = aiohttp
+        self._timeout_s = timeout_s
+        self._max_concurrency = max_concurrency
+        self._max_retries = max_retries
+        self._backoff_s = backoff_s
+        self._max_backoff_s = max_backoff_s
+        self._breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._session: Optional[Any] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self._breaker
+
+    async def __aenter__(self) -> "AsyncOpenFoodFactsClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_product_by_barcode(self, barcode: str) -> Product:
+        if not self._breaker.allow():
+            raise CircuitOpenError("Open Food Facts is unavailable; not retrying yet")
+        try:
+            status, data = await self._get_with_retries(product_url(self.BASE_URL, barcode))
+        except UpstreamUnavailableError:
+            self._breaker.record_failure()
+            raise
+        except BaseException:
+            self._breaker.cancel()
+            raise
+        self._breaker.record_success()
+        if status == 404:
+            raise ProductNotFoundError(f"Product not found for barcode={barcode}")
+        if status >= 400:
+            raise OpenFoodFactsError(f"API error {status}: {str(data)[:200]}")
+        return product_from_response(barcode, data)
+
+    async def _get_with_retries(self, url: str) -> tuple[int, Any]:
+        aiohttp = self._aiohttp
+        session = self._get_session()
+        assert self._slots is not None
+        attempt = 0
+        while True:
+            try:
+                async with self._slots:
+                    async with session.get(url) as r:
+                        if r.status not in RETRY_STATUSES:
+                            data = await r.json(content_type=None) if r.status < 400 else await r.text()
+                            return r.status, data
+                        status = r.status
+                if attempt >= self._max_retries:
+                    raise UpstreamUnavailableError(f"API error {status} after {attempt + 1} attempts")
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as exc:
+                if attempt >= self._max_retries:
+                    raise UpstreamUnavailableError(f"Open Food Facts request failed: {exc!r}") from exc
+            # The slot is released while backing off.
+            await self._sleep(backoff_delay(attempt, self._backoff_s, self._max_backoff_s, self._rng))
+            attempt += 1
+
+    def _get_session(self) -> Any:
+        if self._session is None:
+            aiohttp = self._aiohttp
+            self._slots = asyncio.Semaphore(self._max_concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self._timeout_s),
+                headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"},
+            )
+        return self._session
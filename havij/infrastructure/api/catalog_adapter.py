@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from havij.application.ports import ProductCatalog
+from havij.application.ports import AsyncProductCatalog, ProductCatalog
 from havij.domain.model.product import Product
+from havij.infrastructure.api.async_openfoodfacts_client import AsyncOpenFoodFactsClient
 from havij.infrastructure.api.openfoodfacts_client import OpenFoodFactsClient
 
 class OpenFoodFactsCatalog(ProductCatalog):
@@ -10,3 +11,10 @@ class OpenFoodFactsCatalog(ProductCatalog):
 
     def get_by_barcode(self, barcode: str) -> Product:
         return self._client.get_product_by_barcode(barcode)
+
+class AsyncOpenFoodFactsCatalog(AsyncProductCatalog):
+    def __init__(self, client: AsyncOpenFoodFactsClient):
+        self._client = client
+
+    async def get_by_barcode(self, barcode: str) -> Product:
+        return await self._client.get_product_by_barcode(barcode)
@@ -1,47 +1,142 @@
 from __future__ import annotations
 
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
 import requests
-from typing import Any, Dict
+from requests.adapters import HTTPAdapter
 
 from havij.domain.model.nutrients import Nutrients
 from havij.domain.model.product import Product
+from havij.infrastructure.api.circuit_breaker import CircuitBreaker
 
 class OpenFoodFactsError(RuntimeError):
     pass
 
+class ProductNotFoundError(OpenFoodFactsError):
+    pass
+
+class UpstreamUnavailableError(OpenFoodFactsError):
+    """Open Food Facts did not answer usefully (timeouts, 5xx, rate limiting)."""
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
 class OpenFoodFactsClient:
-    """Very small client for Open Food Facts API v2."""
+    """Very small client for Open Food Facts API v2.
+
+    Only ``FIELDS`` are requested, compressed responses are accepted, and the
+    connection pool holds ``pool_size`` connections so that concurrent
+    lookups reuse them. Timeouts, connection errors and ``RETRY_STATUSES``
+    are retried up to ``max_retries`` times with full-jitter exponential
+    backoff; once ``breaker`` sees repeated failed lookups, calls fail fast
+    with ``CircuitOpenError`` until the upstream gets a new trial call.
+    """
 
     BASE_URL = "https://world.openfoodfacts.net/api/v2"
 
-    def __init__(self, timeout_s: float = 10.0):
+    def __init__(
+        self,
+        timeout_s: float = 10.0,
+        pool_size: int = 8,
+        max_retries: int = 2,
+        backoff_s: float = 0.25,
+        max_backoff_s: float = 4.0,
+        breaker: Optional[CircuitBreaker] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+    ):
+        if max_retries < 0:
+            raise ValueError("max_retries must be >= 0")
         self._timeout_s = timeout_s
+        self._max_retries = max_retries
+        self._backoff_s = backoff_s
+        self._max_backoff_s = max_backoff_s
+        self._breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self._rng = rng or random.Random()
         self._session = requests.Session()
         self._session.headers.update({
             "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
         })
+        # Retries are done here, with jitter, rather than by urllib3.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self._breaker
+
+    def close(self) -> None:
+        self._session.close()
 
     def get_product_by_barcode(self, barcode: str) -> Product:
-        url = f"{self.BASE_URL}/product/{barcode}"
-        r = self._session.get(url, timeout=self._timeout_s)
+        if not self._breaker.allow():
+            raise CircuitOpenError("Open Food Facts is unavailable; not retrying yet")
+        try:
+            r = self._get_with_retries(product_url(self.BASE_URL, barcode))
+        except UpstreamUnavailableError:
+            self._breaker.record_failure()
+            raise
+        except BaseException:
+            # Not the upstream's fault: neither a success nor a failure.
+            self._breaker.cancel()
+            raise
+        self._breaker.record_success()
         if r.status_code == 404:
-            raise OpenFoodFactsError(f"Product not found for barcode={barcode}")
+            raise ProductNotFoundError(f"Product not found for barcode={barcode}")
         if r.status_code >= 400:
             raise OpenFoodFactsError(f"API error {r.status_code}: {r.text[:200]}")
 
-        data = r.json()
-        product = data.get("product")
-        if not isinstance(product, dict):
-            raise OpenFoodFactsError("Unexpected API response: missing 'product'")
+        return product_from_response(barcode, r.json())
+
+    def _get_with_retries(self, url: str) -> Any:
+        attempt = 0
+        while True:
+            try:
+                r = self._session.get(url, timeout=self._timeout_s)
+            except (requests.Timeout, requests.ConnectionError) as exc:
+                if attempt >= self._max_retries:
+                    raise UpstreamUnavailableError(f"Open Food Facts request failed: {exc}") from exc
+            else:
+                if r.status_code not in RETRY_STATUSES:
+                    return r
+                if attempt >= self._max_retries:
+                    raise UpstreamUnavailableError(f"API error {r.status_code} after {attempt + 1} attempts")
+            self._sleep(backoff_delay(attempt, self._backoff_s, self._max_backoff_s, self._rng))
+            attempt += 1
+
+# Shared with AsyncOpenFoodFactsClient.
+
+FIELDS = ("product_name", "product_name_en", "nutriments")
+
+# Statuses worth retrying: rate limiting and server-side failures.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def product_url(base_url: str, barcode: str) -> str:
+    # Only the fields parsed below; a full product document can be hundreds of KB.
+    return f"{base_url}/product/{barcode}?fields={','.join(FIELDS)}"
+
+def backoff_delay(attempt: int, backoff_s: float, max_backoff_s: float, rng: random.Random) -> float:
+    # Full jitter: spreads the retries of concurrent callers apart.
+    return rng.uniform(0, min(max_backoff_s, backoff_s * 2 ** attempt))
+
+def product_from_response(barcode: str, data: Any) -> Product:
+    product = data.get("product") if isinstance(data, dict) else None
+    if not isinstance(product, dict):
+        raise OpenFoodFactsError("Unexpected API response: missing 'product'")
 
-        name = (product.get("product_name") or product.get("product_name_en") or "").strip()
-        if not name:
-            name = f"Product {barcode}"
+    name = (product.get("product_name") or product.get("product_name_en") or "").strip()
+    if not name:
+        name = f"Product {barcode}"
 
-        nutr = product.get("nutriments") or {}
-        nutrients_100g = _parse_nutrients_per_100g(nutr)
+    nutr = product.get("nutriments") or {}
+    nutrients_100g = _parse_nutrients_per_100g(nutr)
 
-        return Product(barcode=barcode, name=name, nutrients_per_100g=nutrients_100g)
+    return Product(barcode=barcode, name=name, nutrients_per_100g=nutrients_100g)
 
 def _num(x: Any) -> float:
     try:
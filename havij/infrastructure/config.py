@@ -1,13 +1,162 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from pathlib import Path
+from typing import Optional
+
+_JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+_SYNCHRONOUS = ("off", "normal", "full", "extra")
+_TEMP_STORES = ("default", "file", "memory")
+
+@dataclass(frozen=True, slots=True)
+class StorageProfile:
+    """SQLite connection settings applied by ``sqlite_db.connect``.
+
+    ``mmap_size`` is in bytes; ``cache_size`` follows the pragma (negative
+    values are KiB, positive values are pages).
+    """
+    journal_mode: str = "wal"
+    synchronous: str = "normal"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -64_000
+    temp_store: str = "memory"
+    busy_timeout_ms: int = 5_000
+
+    def __post_init__(self) -> None:
+        if self.journal_mode not in _JOURNAL_MODES:
+            raise ValueError(f"journal_mode must be one of {', '.join(_JOURNAL_MODES)}")
+        if self.synchronous not in _SYNCHRONOUS:
+            raise ValueError(f"synchronous must be one of {', '.join(_SYNCHRONOUS)}")
+        if self.temp_store not in _TEMP_STORES:
+            raise ValueError(f"temp_store must be one of {', '.join(_TEMP_STORES)}")
+        if self.mmap_size < 0:
+            raise ValueError("mmap_size must be >= 0")
+        if self.busy_timeout_ms < 0:
+            raise ValueError("busy_timeout_ms must be >= 0")
+
+STORAGE_PROFILES = {
+    # The default. SQLite's own settings: rollback journal, fsync on every
+    # commit, no mmap; a commit that returned survives a power loss.
+    "safe": StorageProfile(
+        journal_mode="delete",
+        synchronous="full",
+        mmap_size=0,
+        cache_size=-2_000,
+        temp_store="default",
+    ),
+    # Opt-in. WAL lets readers run alongside the writer; NORMAL syncs at
+    # checkpoints only, so a power loss may drop the last commits but never
+    # corrupts.
+    "balanced": StorageProfile(),
+    # For bulk imports and benchmarks: no fsync at all.
+    "fast": StorageProfile(
+        synchronous="off",
+        mmap_size=1024 * 1024 * 1024,
+        cache_size=-256_000,
+    ),
+}
 
 @dataclass(frozen=True, slots=True)
 class AppConfig:
     db_path: Path
+    product_cache_ttl_s: float = 7 * 24 * 3600.0
+    product_cache_negative_ttl_s: float = 3600.0
+    product_lru_size: int = 2048
+    product_lru_ttl_s: float = 600.0
+    product_lookup_concurrency: int = 8
+    # After a login, warm the product cache with up to this many of the
+    # user's usual products from the last prefetch_lookback_days (0: off),
+    # spending at most prefetch_budget_s.
+    prefetch_max_products: int = 20
+    prefetch_budget_s: float = 2.0
+    prefetch_lookback_days: int = 90
+    # Open Food Facts requests: per-attempt timeout, retries of timeouts and
+    # 5xx, and how many failed lookups open the circuit breaker for how long.
+    off_timeout_s: float = 10.0
+    off_max_retries: int = 2
+    off_breaker_failures: int = 5
+    off_breaker_reset_s: float = 30.0
+    # "off": Open Food Facts only; "remote-fallback": local catalog first, then
+    # Open Food Facts; "only": local catalog only.
+    local_catalog: str = "off"
+    storage: StorageProfile = field(default_factory=lambda: STORAGE_PROFILES["safe"])
+    # Hand meal and user writes to one writer thread, which commits up to
+    # group_commit_max_batch queued writes in one transaction, after waiting
+    # group_commit_window_s for more (0: every write commits on its own).
+    group_commit_max_batch: int = 0
+    group_commit_window_s: float = 0.0
+    # "off": one database file; "hash": users spread over shard_count files by
+    # user id; "per-user": a file per user. Shard files go to shard_dir
+    # (default: "shards" next to db_path); db_path keeps the shared tables.
+    sharding: str = "off"
+    shard_count: int = 8
+    shard_dir: Optional[Path] = None
+    # 0 hashes passwords on the calling thread instead of in worker processes.
+    password_hash_workers: int = max(1, (os.cpu_count() or 2) // 2)
+    # Empty: a random secret per process (sessions end when the app restarts).
+    session_secret: str = ""
+    session_ttl_s: float = 12 * 3600.0
+    login_max_failures: int = 5
+    login_lockout_s: float = 300.0
+    # Port metrics are collected only when exported: on an HTTP port (0: no
+    # endpoint) and/or to a file rewritten every metrics_file_interval_s.
+    metrics_port: int = 0
+    metrics_host: str = "127.0.0.1"
+    metrics_file: str = ""
+    metrics_file_interval_s: float = 15.0
+
+    @property
+    def metrics_enabled(self) -> bool:
+        return self.metrics_port > 0 or bool(self.metrics_file)
+
+def load_storage_profile() -> StorageProfile:
+    name = os.getenv("DB_PROFILE", "safe").lower()
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"DB_PROFILE must be one of {', '.join(STORAGE_PROFILES)}")
+    profile = STORAGE_PROFILES[name]
+    return replace(
+        profile,
+        journal_mode=os.getenv("DB_JOURNAL_MODE", profile.journal_mode).lower(),
+        synchronous=os.getenv("DB_SYNCHRONOUS", profile.synchronous).lower(),
+        mmap_size=int(os.getenv("DB_MMAP_SIZE", str(profile.mmap_size))),
+        cache_size=int(os.getenv("DB_CACHE_SIZE", str(profile.cache_size))),
+        temp_store=os.getenv("DB_TEMP_STORE", profile.temp_store).lower(),
+        busy_timeout_ms=int(os.getenv("DB_BUSY_TIMEOUT_MS", str(profile.busy_timeout_ms))),
+    )
 
 def load_config() -> AppConfig:
     db_path = Path(os.getenv("DB_PATH", "data/app.sqlite"))
-    return AppConfig(db_path=db_path)
+    return AppConfig(
+        db_path=db_path,
+        product_cache_ttl_s=float(os.getenv("PRODUCT_CACHE_TTL_S", "604800")),
+        product_cache_negative_ttl_s=float(os.getenv("PRODUCT_CACHE_NEGATIVE_TTL_S", "3600")),
+        product_lru_size=int(os.getenv("PRODUCT_LRU_SIZE", "2048")),
+        product_lru_ttl_s=float(os.getenv("PRODUCT_LRU_TTL_S", "600")),
+        product_lookup_concurrency=int(os.getenv("PRODUCT_LOOKUP_CONCURRENCY", "8")),
+        prefetch_max_products=int(os.getenv("PREFETCH_MAX_PRODUCTS", "20")),
+        prefetch_budget_s=float(os.getenv("PREFETCH_BUDGET_S", "2")),
+        prefetch_lookback_days=int(os.getenv("PREFETCH_LOOKBACK_DAYS", "90")),
+        off_timeout_s=float(os.getenv("OFF_TIMEOUT_S", "10")),
+        off_max_retries=int(os.getenv("OFF_MAX_RETRIES", "2")),
+        off_breaker_failures=int(os.getenv("OFF_BREAKER_FAILURES", "5")),
+        off_breaker_reset_s=float(os.getenv("OFF_BREAKER_RESET_S", "30")),
+        local_catalog=os.getenv("LOCAL_CATALOG", "off"),
+        storage=load_storage_profile(),
+        group_commit_max_batch=int(os.getenv("GROUP_COMMIT_MAX_BATCH", "0")),
+        group_commit_window_s=float(os.getenv("GROUP_COMMIT_WINDOW_S", "0")),
+        sharding=os.getenv("DB_SHARDING", "off").lower(),
+        shard_count=int(os.getenv("DB_SHARDS", "8")),
+        shard_dir=Path(os.environ["DB_SHARD_DIR"]) if os.getenv("DB_SHARD_DIR") else None,
+        password_hash_workers=int(
+            os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))
+        ),
+        session_secret=os.getenv("SESSION_SECRET", ""),
+        session_ttl_s=float(os.getenv("SESSION_TTL_S", "43200")),
+        login_max_failures=int(os.getenv("LOGIN_MAX_FAILURES", "5")),
+        login_lockout_s=float(os.getenv("LOGIN_LOCKOUT_S", "300")),
+        metrics_port=int(os.getenv("METRICS_PORT", "0")),
+        metrics_host=os.getenv("METRICS_HOST", "127.0.0.1"),
+        metrics_file=os.getenv("METRICS_FILE", ""),
+        metrics_file_interval_s=float(os.getenv("METRICS_FILE_INTERVAL_S", "15")),
+    )
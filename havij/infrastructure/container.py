@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+from havij.application.caching import SingleFlightLruCache
+from havij.application.metrics import (
+    CacheCounts,
+    MetricsRegistry,
+    instrument_day_log_repository,
+    instrument_product_catalog,
+    instrument_user_repository,
+)
+from havij.application.ports import DayLogRepository, ProductCatalog, UserRepository
+from havij.application.prefetch import ProductPrefetcher
+from havij.application.services.meal_service import MealService
+from havij.application.services.product_service import ProductService
+from havij.application.services.user_service import (
+    InlinePasswordHasher,
+    PasswordHasher,
+    ProcessPoolPasswordHasher,
+    UserService,
+)
+from havij.domain.model.product import Product
+from havij.infrastructure.api.catalog_adapter import OpenFoodFactsCatalog
+from havij.infrastructure.api.circuit_breaker import CircuitBreaker
+from havij.infrastructure.api.openfoodfacts_client import OpenFoodFactsClient
+from havij.infrastructure.config import AppConfig, load_config
+from havij.infrastructure.metrics_exporter import MetricsFileWriter, MetricsServer
+from havij.infrastructure.persistence.local_catalog import LocalProductCatalog
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.product_cache import SqliteProductCache
+from havij.infrastructure.persistence.sharding import (
+    ShardConnections,
+    ShardedDayLogRepository,
+    ShardedUserRepository,
+    shard_layout,
+)
+from havij.infrastructure.persistence.sqlite_db import ThreadLocalConnections, init_schema
+from havij.infrastructure.persistence.user_repository import SqliteUserRepository
+from havij.infrastructure.persistence.write_queue import GroupCommitWriter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ServiceContainer:
+    """Everything the app needs, built once per process and shared by all sessions."""
+
+    config: AppConfig
+    connections: ThreadLocalConnections
+    client: OpenFoodFactsClient
+    product_cache: SqliteProductCache
+    product_lru: SingleFlightLruCache[str, Product]
+    password_hasher: PasswordHasher
+    meal_service: MealService
+    product_service: ProductService
+    user_service: UserService
+    # None unless writes are group-committed.
+    writer: Optional[GroupCommitWriter] = None
+    # None unless users are sharded.
+    shards: Optional[ShardConnections] = None
+    # None when prefetching is off.
+    prefetcher: Optional[ProductPrefetcher] = None
+    # None unless the config exports metrics.
+    metrics: Optional[MetricsRegistry] = None
+    metrics_exporters: tuple[Union[MetricsServer, MetricsFileWriter], ...] = ()
+
+    def close(self) -> None:
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        for exporter in self.metrics_exporters:
+            exporter.close()
+        if isinstance(self.password_hasher, ProcessPoolPasswordHasher):
+            self.password_hasher.close()
+        self.client.close()
+        if self.writer is not None:
+            self.writer.close()
+        if self.shards is not None:
+            self.shards.close_all()
+        self.connections.close_all()
+
+
+def build_container(cfg: AppConfig) -> ServiceContainer:
+    layout = shard_layout(cfg)
+    if layout is not None and cfg.group_commit_max_batch > 0:
+        raise ValueError("group commit needs a single database file; turn sharding off")
+    if not cfg.session_secret:
+        logger.warning(
+            "SESSION_SECRET is not set: session tokens are signed with a random per-process key, "
+            "so a restart logs everyone out and other replicas reject them"
+        )
+    connections = ThreadLocalConnections(cfg.db_path, profile=cfg.storage)
+    init_schema(connections.get())
+    metrics = MetricsRegistry() if cfg.metrics_enabled else None
+    shards = ShardConnections(layout, profile=cfg.storage) if layout is not None else None
+    writer: GroupCommitWriter | None = None
+    if cfg.group_commit_max_batch > 0:
+        writer = GroupCommitWriter(
+            cfg.db_path,
+            profile=cfg.storage,
+            max_batch=cfg.group_commit_max_batch,
+            window_s=cfg.group_commit_window_s,
+        )
+
+    client = OpenFoodFactsClient(
+        timeout_s=cfg.off_timeout_s,
+        pool_size=cfg.product_lookup_concurrency,
+        max_retries=cfg.off_max_retries,
+        breaker=CircuitBreaker(cfg.off_breaker_failures, cfg.off_breaker_reset_s),
+    )
+    product_cache = SqliteProductCache(
+        instrument_product_catalog(OpenFoodFactsCatalog(client), metrics, "openfoodfacts"),
+        connections,
+        ttl_s=cfg.product_cache_ttl_s,
+        negative_ttl_s=cfg.product_cache_negative_ttl_s,
+    )
+    catalog: ProductCatalog = product_cache
+    local_catalog: LocalProductCatalog | None = None
+    if cfg.local_catalog == "only":
+        local_catalog = LocalProductCatalog(connections)
+        catalog = local_catalog
+    elif cfg.local_catalog == "remote-fallback":
+        local_catalog = LocalProductCatalog(connections, fallback=product_cache)
+        catalog = local_catalog
+
+    product_lru: SingleFlightLruCache[str, Product] = SingleFlightLruCache(
+        max_size=cfg.product_lru_size,
+        ttl_s=cfg.product_lru_ttl_s,
+    )
+    catalog = instrument_product_catalog(catalog, metrics)
+    day_logs: DayLogRepository = (
+        ShardedDayLogRepository(shards) if shards is not None else SqliteDayLogRepository(connections, writer)
+    )
+    users: UserRepository = (
+        ShardedUserRepository(connections, shards)
+        if shards is not None
+        else SqliteUserRepository(connections, writer)
+    )
+    meal_repo = instrument_day_log_repository(day_logs, metrics)
+    prefetcher: ProductPrefetcher | None = None
+    if cfg.prefetch_max_products > 0:
+        prefetcher = ProductPrefetcher(
+            meal_repo,
+            catalog,
+            product_lru,
+            max_products=cfg.prefetch_max_products,
+            budget_s=cfg.prefetch_budget_s,
+            lookback_days=cfg.prefetch_lookback_days,
+            track_ttl_s=cfg.product_lru_ttl_s,
+        )
+    password_hasher: PasswordHasher = (
+        ProcessPoolPasswordHasher(max_workers=cfg.password_hash_workers)
+        if cfg.password_hash_workers > 0
+        else InlinePasswordHasher()
+    )
+    exporters: List[Union[MetricsServer, MetricsFileWriter]] = []
+    if metrics is not None:
+        metrics.register_cache("product_lru", lambda: _lru_counts(product_lru))
+        metrics.register_cache("product_cache", lambda: _product_cache_counts(product_cache))
+        if prefetcher is not None:
+            metrics.register_cache("product_prefetch", lambda: _prefetch_counts(prefetcher))
+        if cfg.metrics_port > 0:
+            exporters.append(MetricsServer(metrics, cfg.metrics_port, cfg.metrics_host))
+        if cfg.metrics_file:
+            exporters.append(MetricsFileWriter(metrics, Path(cfg.metrics_file), cfg.metrics_file_interval_s))
+    return ServiceContainer(
+        config=cfg,
+        connections=connections,
+        client=client,
+        product_cache=product_cache,
+        product_lru=product_lru,
+        password_hasher=password_hasher,
+        meal_service=MealService(repo=meal_repo),
+        product_service=ProductService(
+            catalog=catalog,
+            cache=product_lru,
+            max_concurrency=cfg.product_lookup_concurrency,
+            search=local_catalog,
+            on_lookup=prefetcher.note_lookup if prefetcher is not None else None,
+        ),
+        user_service=UserService(
+            repo=instrument_user_repository(users, metrics),
+            hasher=password_hasher,
+            session_secret=cfg.session_secret.encode("utf-8") or None,
+            session_ttl_s=cfg.session_ttl_s,
+            max_failed_logins=cfg.login_max_failures,
+            login_lockout_s=cfg.login_lockout_s,
+            on_login=(lambda profile: prefetcher.schedule(profile.user_id)) if prefetcher is not None else None,
+        ),
+        writer=writer,
+        shards=shards,
+        prefetcher=prefetcher,
+        metrics=metrics,
+        metrics_exporters=tuple(exporters),
+    )
+
+
+def _lru_counts(cache: SingleFlightLruCache[str, Product]) -> CacheCounts:
+    stats = cache.stats()
+    return CacheCounts(hits=stats.hits, misses=stats.misses)
+
+
+def _product_cache_counts(cache: SqliteProductCache) -> CacheCounts:
+    stats = cache.stats()
+    # A stale hit is first counted as a miss, then served from the cache.
+    return CacheCounts(
+        hits=stats.hits + stats.negative_hits + stats.stale_hits,
+        misses=stats.misses - stats.stale_hits,
+    )
+
+
+def _prefetch_counts(prefetcher: ProductPrefetcher) -> CacheCounts:
+    # A hit is a prefetched product that was then looked up.
+    stats = prefetcher.stats()
+    return CacheCounts(hits=stats.used, misses=stats.prefetched - stats.used)
+
+
+_container: Optional[ServiceContainer] = None
+_container_lock = threading.Lock()
+
+
+def get_container() -> ServiceContainer:
+    """Return the process-wide container, building it on first use."""
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                _container = build_container(load_config())
+    return _container
+
+
+def reset_container() -> None:
+    global _container
+    with _container_lock:
+        if _container is not None:
+            _container.close()
+        _container = None
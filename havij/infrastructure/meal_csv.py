@@ -0,0 +1,126 @@
+"""Bulk meal-log import from CSV.
+
+Expected header (``time`` and ``barcode`` may be omitted)::
+
+    day,time,product_name,grams,kcal_per_100g,protein_per_100g,carbs_per_100g,fat_per_100g,barcode
+
+``day`` is ``YYYY-MM-DD``; ``time`` is ``HH:MM[:SS]`` and defaults to midnight.
+"""
+from __future__ import annotations
+
+import csv
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as time_of_day
+from functools import lru_cache
+from typing import Dict, List, TextIO
+
+from havij.application.services.meal_service import MealEntryDraft, MealService
+from havij.domain.model.nutrients import Nutrients
+
+REQUIRED_COLUMNS = (
+    "day",
+    "product_name",
+    "grams",
+    "kcal_per_100g",
+    "protein_per_100g",
+    "carbs_per_100g",
+    "fat_per_100g",
+)
+
+@dataclass(frozen=True, slots=True)
+class MealImportError:
+    line: int
+    message: str
+
+@dataclass(frozen=True, slots=True)
+class MealImportStats:
+    rows: int
+    seconds: float
+    errors: List[MealImportError] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+
+def import_meal_csv(
+    service: MealService,
+    user_id: str,
+    stream: TextIO,
+    chunk_size: int = 10_000,
+) -> MealImportStats:
+    """Add every valid row of ``stream`` to ``user_id``'s log.
+
+    Rows are read and written ``chunk_size`` at a time (one transaction per
+    chunk), so memory stays flat regardless of the file size. Bad rows are
+    reported with their line number and do not stop the import.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be > 0")
+    reader = csv.DictReader(stream)
+    missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"missing CSV columns: {', '.join(missing)}")
+
+    started = time.perf_counter()
+    imported = 0
+    errors: List[MealImportError] = []
+    drafts: List[MealEntryDraft] = []
+    lines: List[int] = []
+
+    def flush() -> int:
+        result = service.add_entries(user_id, drafts)
+        errors.extend(MealImportError(lines[e.index], e.message) for e in result.errors)
+        drafts.clear()
+        lines.clear()
+        return len(result.added)
+
+    for row in reader:
+        try:
+            drafts.append(_to_draft(row))
+        except ValueError as exc:
+            errors.append(MealImportError(reader.line_num, str(exc)))
+            continue
+        lines.append(reader.line_num)
+        if len(drafts) >= chunk_size:
+            imported += flush()
+    if drafts:
+        imported += flush()
+    errors.sort(key=lambda e: e.line)
+    return MealImportStats(rows=imported, seconds=time.perf_counter() - started, errors=errors)
+
+
+# Exports log the same days and times over and over; parsing each distinct
+# value once is a measurable share of the per-row cost.
+_parse_day = lru_cache(maxsize=4096)(date.fromisoformat)
+_parse_time = lru_cache(maxsize=4096)(time_of_day.fromisoformat)
+
+def _to_draft(row: Dict[str, str]) -> MealEntryDraft:
+    day = _parse_day(row["day"] or "")
+    return MealEntryDraft(
+        day=day,
+        product_name=(row["product_name"] or "").strip(),
+        grams=_number(row, "grams"),
+        nutrients_per_100g=Nutrients(
+            kcal=_number(row, "kcal_per_100g"),
+            protein_g=_number(row, "protein_per_100g"),
+            carbs_g=_number(row, "carbs_per_100g"),
+            fat_g=_number(row, "fat_per_100g"),
+        ),
+        when=datetime.combine(day, _parse_time(row.get("time") or "00:00")),
+        barcode=(row.get("barcode") or "").strip(),
+    )
+
+def _number(row: Dict[str, str], column: str) -> float:
+    raw = row[column]
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{column} must be a number, got {raw!r}") from None
+    # float() also accepts "nan" and "inf", which the database would refuse
+    # for the whole chunk.
+    if not math.isfinite(value):
+        raise ValueError(f"{column} must be a finite number, got {raw!r}")
+    return value
@@ -0,0 +1,133 @@
+"""Meal-log export to CSV, JSONL and Parquet.
+
+The exporters consume ``(day, entry)`` pairs as produced by
+``MealService.iter_entries`` and write them out as they arrive, so memory use
+does not depend on the size of the history.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from datetime import date
+from itertools import islice
+from typing import IO, Any, Iterable, Iterator, Tuple
+
+from havij.domain.model.meal import MealEntry
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+EXPORT_COLUMNS = (
+    "entry_id",
+    "day",
+    "timestamp",
+    "product_name",
+    "barcode",
+    "grams",
+    "kcal",
+    "protein_g",
+    "carbs_g",
+    "fat_g",
+)
+
+DayEntry = Tuple[date, MealEntry]
+
+
+def export_entries(fmt: str, entries: Iterable[DayEntry], stream: IO[Any]) -> int:
+    """Write ``entries`` to ``stream`` in ``fmt``; returns the number of rows.
+
+    ``csv`` and ``jsonl`` need a text stream, ``parquet`` a binary one.
+    """
+    if fmt == "csv":
+        return export_csv(entries, stream)
+    if fmt == "jsonl":
+        return export_jsonl(entries, stream)
+    if fmt == "parquet":
+        return export_parquet(entries, stream)
+    raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+
+def export_csv(entries: Iterable[DayEntry], stream: IO[str]) -> int:
+    writer = csv.writer(stream)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for day, e in entries:
+        writer.writerow(_values(day, e))
+        count += 1
+    return count
+
+
+def export_jsonl(entries: Iterable[DayEntry], stream: IO[str]) -> int:
+    count = 0
+    for day, e in entries:
+        stream.write(json.dumps(dict(zip(EXPORT_COLUMNS, _values(day, e))), ensure_ascii=False))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+def export_parquet(entries: Iterable[DayEntry], stream: IO[bytes], row_group_size: int = 65_536) -> int:
+    """Write one Parquet row group per ``row_group_size`` entries. Needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from exc
+    if row_group_size <= 0:
+        raise ValueError("row_group_size must be > 0")
+
+    schema = pa.schema([
+        ("entry_id", pa.string()),
+        ("day", pa.date32()),
+        ("timestamp", pa.timestamp("us")),
+        ("product_name", pa.string()),
+        ("barcode", pa.string()),
+        ("grams", pa.float64()),
+        ("kcal", pa.float64()),
+        ("protein_g", pa.float64()),
+        ("carbs_g", pa.float64()),
+        ("fat_g", pa.float64()),
+    ])
+    count = 0
+    with pq.ParquetWriter(stream, schema) as writer:
+        for chunk in _chunks(iter(entries), row_group_size):
+            columns: list[list[Any]] = [[] for _ in EXPORT_COLUMNS]
+            for day, e in chunk:
+                for column, value in zip(columns, (
+                    e.entry_id,
+                    day,
+                    e.timestamp,
+                    e.product_name,
+                    e.barcode,
+                    e.grams,
+                    e.nutrients.kcal,
+                    e.nutrients.protein_g,
+                    e.nutrients.carbs_g,
+                    e.nutrients.fat_g,
+                )):
+                    column.append(value)
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(values, type=f.type) for values, f in zip(columns, schema)],
+                schema=schema,
+            ))
+            count += len(chunk)
+    return count
+
+
+def _values(day: date, e: MealEntry) -> Tuple[Any, ...]:
+    return (
+        e.entry_id,
+        day.isoformat(),
+        e.timestamp.isoformat(),
+        e.product_name,
+        e.barcode,
+        e.grams,
+        e.nutrients.kcal,
+        e.nutrients.protein_g,
+        e.nutrients.carbs_g,
+        e.nutrients.fat_g,
+    )
+
+
+def _chunks(it: Iterator[DayEntry], size: int) -> Iterator[list[DayEntry]]:
+    while chunk := list(islice(it, size)):
+        yield chunk
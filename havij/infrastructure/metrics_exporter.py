@@ -0,0 +1,81 @@
+"""Prometheus text export of a ``MetricsRegistry``: an HTTP endpoint or a file."""
+from __future__ import annotations
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+
+from havij.application.metrics import MetricsRegistry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def write_metrics_file(registry: MetricsRegistry, path: Path) -> None:
+    """Write the current metrics to ``path``, replacing it atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(registry.render_prometheus(), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class MetricsServer:
+    """Serves ``GET /metrics`` from a background thread."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        handler = type("_Handler", (_MetricsHandler,), {"registry": registry})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self) -> int:
+        return int(self._server.server_address[1])
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class MetricsFileWriter:
+    """Rewrites a metrics file every ``interval_s`` seconds, and once more on ``close``."""
+
+    def __init__(self, registry: MetricsRegistry, path: Path, interval_s: float = 15.0):
+        if interval_s <= 0:
+            raise ValueError("interval_s must be > 0")
+        self._registry = registry
+        self._path = path
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file-writer", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        write_metrics_file(self._registry, self._path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_s):
+            write_metrics_file(self._registry, self._path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Optional[MetricsRegistry] = None
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics" or self.registry is None:
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import math
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from havij.application.ports import ProductCatalog
+from havij.domain.model.product import Product
+from havij.infrastructure.api.openfoodfacts_client import (
+    ProductNotFoundError,
+    _parse_nutrients_per_100g,
+)
+from havij.infrastructure.persistence.product_cache import _row_to_product
+from havij.infrastructure.persistence.sqlite_db import (
+    ConnectionSource,
+    _has_table,
+    rebuild_catalog_search_index,
+    resolve_connection,
+    suspend_catalog_search_index,
+)
+
+DUMP_FORMATS = ("jsonl", "csv")
+
+_UPSERT_SQL = """
+    INSERT INTO catalog_products(barcode, name, brands, kcal, protein_g, carbs_g, fat_g)
+    VALUES(?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(barcode) DO UPDATE SET
+        name = excluded.name,
+        brands = excluded.brands,
+        kcal = excluded.kcal,
+        protein_g = excluded.protein_g,
+        carbs_g = excluded.carbs_g,
+        fat_g = excluded.fat_g
+"""
+
+CatalogRow = Tuple[str, str, str, float, float, float, float]
+
+_SEARCH_TOKEN_RE = re.compile(r"\w+")
+
+# Every match is scored and only the best ``limit`` are joined to their
+# products; capping the matches before ranking would rank an arbitrary subset
+# of a broad prefix ("gr"). Name matches weigh more than brand matches.
+_FTS_SEARCH_SQL = """
+    SELECT p.*
+    FROM (
+        SELECT rowid, bm25(catalog_products_fts, 10.0, 1.0) AS score
+        FROM catalog_products_fts
+        WHERE catalog_products_fts MATCH ?
+        ORDER BY score
+        LIMIT ?
+    ) f
+    JOIN catalog_products p ON p.rowid = f.rowid
+    ORDER BY f.score
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class ImportStats:
+    rows: int
+    skipped: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+
+class LocalProductCatalog(ProductCatalog):
+    """Serves products from the ``catalog_products`` table.
+
+    Barcodes missing from the local catalog are passed to ``fallback`` when
+    one is given; otherwise ``ProductNotFoundError`` is raised.
+    """
+
+    def __init__(self, conn: ConnectionSource, fallback: Optional[ProductCatalog] = None):
+        self._source = conn
+        self._fallback = fallback
+        self._has_fts = _has_table(self._conn, "catalog_products_fts")
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return resolve_connection(self._source)
+
+    def search(self, query: str, limit: int) -> List[Product]:
+        """Rank catalog products whose name or brand words start with every query word.
+
+        Single-character words are ignored: they are too unselective to narrow
+        a typeahead and are not covered by the prefix indexes.
+        """
+        tokens = [t for t in _SEARCH_TOKEN_RE.findall(query.lower()) if len(t) > 1]
+        if not tokens or limit <= 0:
+            return []
+        if self._has_fts:
+            match = " ".join(f'"{t}"*' for t in tokens)
+            rows = self._conn.execute(_FTS_SEARCH_SQL, (match, limit)).fetchall()
+        else:
+            where = " AND ".join("(name || ' ' || brands) LIKE ?" for _ in tokens)
+            rows = self._conn.execute(
+                f"SELECT * FROM catalog_products WHERE {where} ORDER BY length(name) LIMIT ?",
+                (*(f"%{t}%" for t in tokens), limit),
+            ).fetchall()
+        return [_row_to_product(r) for r in rows]
+
+    def get_by_barcode(self, barcode: str) -> Product:
+        row = self._conn.execute(
+            "SELECT * FROM catalog_products WHERE barcode = ?",
+            (barcode,),
+        ).fetchone()
+        if row is not None:
+            return _row_to_product(row)
+        if self._fallback is not None:
+            return self._fallback.get_by_barcode(barcode)
+        raise ProductNotFoundError(f"Product not found for barcode={barcode}")
+
+
+def open_dump(path: Path) -> TextIO:
+    """Open a (possibly gzip-compressed) dump for streaming text reads."""
+    if path.suffix == ".gz":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def guess_format(path: Path) -> str:
+    suffixes = [s.lower() for s in path.suffixes if s.lower() != ".gz"]
+    if suffixes and suffixes[-1] in (".csv", ".tsv"):
+        return "csv"
+    return "jsonl"
+
+
+def iter_dump_rows(stream: TextIO, fmt: str, delimiter: str = "\t") -> Iterator[Optional[CatalogRow]]:
+    """Yield one catalog row per dump record, or None for unusable records.
+
+    ``jsonl`` expects one product document per line (the ``openfoodfacts-products.jsonl``
+    export); ``csv`` expects the column layout of the tab-separated CSV export.
+    """
+    if fmt == "jsonl":
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                doc = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            # A valid JSON line is not necessarily a product document.
+            if not isinstance(doc, dict):
+                yield None
+                continue
+            nutriments = doc.get("nutriments")
+            yield _to_row(doc, nutriments if isinstance(nutriments, dict) else {})
+    elif fmt == "csv":
+        # Dump cells can exceed the 128 KB default. The limit is a C long,
+        # which is 32-bit on Windows, and global, so it is put back afterwards.
+        previous_limit = csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+        try:
+            for record in csv.DictReader(stream, delimiter=delimiter, quoting=csv.QUOTE_NONE):
+                # CSV columns use the same names as the API's nutriments keys.
+                yield _to_row(record, record)
+        finally:
+            csv.field_size_limit(previous_limit)
+    else:
+        raise ValueError(f"format must be one of {', '.join(DUMP_FORMATS)}")
+
+
+def import_rows(
+    conn: sqlite3.Connection,
+    rows: Iterable[Optional[CatalogRow]],
+    batch_size: int = 20_000,
+) -> ImportStats:
+    """Upsert rows into ``catalog_products``, one transaction per batch.
+
+    The search index is rebuilt once at the end instead of being updated row
+    by row, which is several times faster for dump-sized imports.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be > 0")
+    started = time.perf_counter()
+    imported = 0
+    skipped = 0
+    it = iter(rows)
+    suspend_catalog_search_index(conn)
+    try:
+        while True:
+            chunk = list(islice(it, batch_size))
+            if not chunk:
+                break
+            valid = [r for r in chunk if r is not None]
+            skipped += len(chunk) - len(valid)
+            with conn:
+                conn.executemany(_UPSERT_SQL, valid)
+            imported += len(valid)
+    finally:
+        rebuild_catalog_search_index(conn)
+    return ImportStats(rows=imported, skipped=skipped, seconds=time.perf_counter() - started)
+
+
+def import_dump(
+    conn: sqlite3.Connection,
+    stream: TextIO,
+    fmt: str,
+    batch_size: int = 20_000,
+    delimiter: str = "\t",
+) -> ImportStats:
+    return import_rows(conn, iter_dump_rows(stream, fmt, delimiter), batch_size)
+
+
+def _to_row(doc: Dict[str, Any], nutriments: Dict[str, Any]) -> Optional[CatalogRow]:
+    barcode = str(doc.get("code") or "").strip()
+    if not barcode.isdigit():
+        return None
+    name = doc.get("product_name") or doc.get("product_name_en") or ""
+    if not isinstance(name, str) or not name.strip():
+        return None
+    name = name.strip()
+    brands = str(doc.get("brands") or "").strip()
+    n = _parse_nutrients_per_100g(nutriments)
+    values = (n.kcal, n.protein_g, n.carbs_g, n.fat_g)
+    # float() accepts "nan", "inf" and negatives, none of which is a usable nutrient value.
+    if not all(math.isfinite(v) and v >= 0 for v in values):
+        return None
+    return (barcode, name, brands, *values)
+
@@ -0,0 +1,193 @@
+"""Database maintenance commands.
+
+Usage: ``python -m havij.infrastructure.persistence.maintenance [--db PATH] <command> ...``
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from dataclasses import replace
+from datetime import date
+from pathlib import Path
+from typing import List, Optional
+
+from havij.application.ports import UserRepository
+from havij.application.services.meal_service import MealService
+from havij.infrastructure.config import StorageProfile, load_config
+from havij.infrastructure.meal_csv import import_meal_csv
+from havij.infrastructure.meal_export import EXPORT_FORMATS, export_entries
+from havij.infrastructure.persistence.local_catalog import (
+    DUMP_FORMATS,
+    guess_format,
+    import_dump,
+    open_dump,
+)
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.migrations import (
+    has_legacy_meal_entries,
+    migrate_meal_entries_to_compact,
+    schema_version,
+)
+from havij.infrastructure.persistence.quick_add import rebuild_quick_add
+from havij.infrastructure.persistence.reshard import reshard
+from havij.infrastructure.persistence.sharding import (
+    ShardConnections,
+    ShardedDayLogRepository,
+    ShardedUserRepository,
+    ShardLayout,
+    shard_layout,
+)
+from havij.infrastructure.persistence.sqlite_db import connect, init_schema, rebuild_daily_totals
+from havij.infrastructure.persistence.user_repository import SqliteUserRepository
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="havij-maintenance", description=__doc__)
+    parser.add_argument("--db", type=Path, default=None, help="SQLite file (default: $DB_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-totals", help="Recompute the daily_totals rollup from meal_entries")
+    commands.add_parser("rebuild-quick-add", help="Recompute the quick-add foods of every user from meal_entries")
+    migrate_storage = commands.add_parser(
+        "migrate-storage", help="Convert meal_entries to the compact layout in batches (safe while the app runs)"
+    )
+    migrate_storage.add_argument("--batch-size", type=int, default=50_000)
+    import_catalog = commands.add_parser(
+        "import-catalog", help="Load an Open Food Facts JSONL/CSV export (optionally .gz) into the local catalog"
+    )
+    import_catalog.add_argument("dump", type=Path)
+    import_catalog.add_argument("--format", choices=DUMP_FORMATS, default=None)
+    import_catalog.add_argument("--batch-size", type=int, default=20_000)
+    import_meals = commands.add_parser("import-meals", help="Add the meal entries of a CSV file to a user's log")
+    import_meals.add_argument("csv", type=Path)
+    import_meals.add_argument("--user", required=True, help="Username that owns the imported entries")
+    import_meals.add_argument("--chunk-size", type=int, default=10_000)
+    reshard_cmd = commands.add_parser(
+        "reshard", help="Copy every user into the shard files of a new layout (stop the app first)"
+    )
+    target = reshard_cmd.add_mutually_exclusive_group()
+    target.add_argument("--shards", type=int, default=None, help="Hash users into N files (default: $DB_SHARDS)")
+    target.add_argument("--per-user", action="store_true", help="Give every user a file")
+    reshard_cmd.add_argument(
+        "--to-dir", type=Path, default=None, help="Shard directory (default: $DB_SHARD_DIR, or shards/ next to --db)"
+    )
+    reshard_cmd.add_argument(
+        "--from-dir", type=Path, default=None, help="Reshard the shard files in this directory instead of --db"
+    )
+    export_meals = commands.add_parser("export-meals", help="Write a user's meal history to CSV, JSONL or Parquet")
+    export_meals.add_argument("out", type=Path)
+    export_meals.add_argument("--user", required=True, help="Username whose entries are exported")
+    export_meals.add_argument("--format", choices=EXPORT_FORMATS, default=None)
+    export_meals.add_argument("--start", type=date.fromisoformat, default=date.min)
+    export_meals.add_argument("--end", type=date.fromisoformat, default=date.max)
+    args = parser.parse_args(argv)
+
+    cfg = load_config()
+    db_path = args.db or cfg.db_path
+    layout = shard_layout(replace(cfg, db_path=db_path))
+    # Per-user tables live in the shards when sharding is on.
+    shards = ShardConnections(layout, profile=cfg.storage) if layout is not None else None
+    conn = connect(db_path, profile=cfg.storage)
+    try:
+        if args.command == "migrate-storage":
+            # Before init_schema, which would otherwise migrate with the default batch size.
+            if has_legacy_meal_entries(conn):
+                rows = migrate_meal_entries_to_compact(
+                    conn, batch_size=args.batch_size, on_batch=lambda n: print(f"  {n} rows copied", flush=True)
+                )
+                print(f"Migrated meal_entries: {rows} rows")
+            else:
+                print("meal_entries already uses the compact layout")
+        init_schema(conn)
+        if args.command == "migrate-storage":
+            print(f"Schema version {schema_version(conn)}")
+        elif args.command == "rebuild-totals":
+            rows = sum(shards.fan_out(rebuild_daily_totals)) if shards else rebuild_daily_totals(conn)
+            print(f"Rebuilt daily_totals: {rows} rows")
+        elif args.command == "rebuild-quick-add":
+            rows = sum(shards.fan_out(_rebuild_quick_add)) if shards else _rebuild_quick_add(conn)
+            print(f"Rebuilt quick_add: {rows} rows")
+        elif args.command == "reshard":
+            _reshard(conn, db_path, cfg.storage, args, layout)
+        elif args.command == "import-catalog":
+            fmt = args.format or guess_format(args.dump)
+            with open_dump(args.dump) as stream:
+                stats = import_dump(conn, stream, fmt, batch_size=args.batch_size)
+            print(
+                f"Imported {stats.rows} products ({stats.skipped} skipped) "
+                f"in {stats.seconds:.1f}s, {stats.rows_per_second:,.0f} rows/s"
+            )
+        elif args.command in ("import-meals", "export-meals"):
+            users: UserRepository = ShardedUserRepository(conn, shards) if shards else SqliteUserRepository(conn)
+            auth = users.get_auth_by_username(args.user)
+            if auth is None:
+                print(f"Unknown user: {args.user}")
+                return 1
+            service = MealService(ShardedDayLogRepository(shards) if shards else SqliteDayLogRepository(conn))
+            if args.command == "import-meals":
+                _import_meals(service, auth.user_id, args)
+            else:
+                _export_meals(service, auth.user_id, args)
+    finally:
+        conn.close()
+        if shards is not None:
+            shards.close_all()
+    return 0
+
+
+def _rebuild_quick_add(conn: sqlite3.Connection) -> int:
+    with conn:
+        return rebuild_quick_add(conn)
+
+
+def _reshard(
+    home: sqlite3.Connection,
+    db_path: Path,
+    profile: StorageProfile,
+    args: argparse.Namespace,
+    configured: Optional[ShardLayout],
+) -> None:
+    root = args.to_dir or (configured.root if configured is not None else db_path.parent / "shards")
+    count = args.shards or (configured.count if configured is not None else 8)
+    target = ShardLayout(root, count=count, per_user=args.per_user)
+    if args.from_dir is not None:
+        sources = sorted(args.from_dir.glob("shard-*.sqlite")) + sorted(args.from_dir.glob("user-*.sqlite"))
+    else:
+        sources = [db_path]
+    stats = reshard(
+        sources, home, target, profile=profile, on_shard=lambda shard, users: print(f"  {shard}: {users} users")
+    )
+    print(
+        f"Resharded {stats.users} users and {stats.entries} entries into {stats.shards} shards "
+        f"under {root} in {stats.seconds:.1f}s"
+    )
+    if stats.unowned_entries:
+        print(f"Left behind {stats.unowned_entries} entries without a user; claim them before resharding")
+
+
+def _import_meals(service: MealService, user_id: str, args: argparse.Namespace) -> None:
+    with args.csv.open(newline="", encoding="utf-8") as stream:
+        result = import_meal_csv(service, user_id, stream, chunk_size=args.chunk_size)
+    for error in result.errors:
+        print(f"line {error.line}: {error.message}")
+    print(
+        f"Imported {result.rows} entries ({len(result.errors)} rejected) "
+        f"in {result.seconds:.1f}s, {result.rows_per_second:,.0f} rows/s"
+    )
+
+
+def _export_meals(service: MealService, user_id: str, args: argparse.Namespace) -> None:
+    fmt = args.format or args.out.suffix.lstrip(".")
+    if fmt not in EXPORT_FORMATS:
+        raise SystemExit(f"Cannot tell the export format from {args.out}; pass --format")
+    entries = service.iter_entries(user_id, args.start, args.end)
+    if fmt == "parquet":
+        with args.out.open("wb") as binary:
+            count = export_entries(fmt, entries, binary)
+    else:
+        with args.out.open("w", newline="", encoding="utf-8") as text:
+            count = export_entries(fmt, entries, text)
+    print(f"Exported {count} entries to {args.out}")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
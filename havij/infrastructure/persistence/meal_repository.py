@@ -1,75 +1,398 @@
 from __future__ import annotations
 
 import sqlite3
-from datetime import date, datetime
-from typing import List
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
+from havij.application.ports import BarcodeUsage, QuickAddItem
 from havij.domain.model.meal import DayLog, MealEntry
 from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.nutrients_batch import NutrientsBatch
+from havij.infrastructure.persistence.quick_add import (
+    EntryRow,
+    entry_row,
+    forget_entries,
+    rebuild_quick_add,
+    record_entries,
+)
+from havij.infrastructure.persistence.sqlite_db import ConnectionSource, resolve_connection
+from havij.infrastructure.persistence.write_queue import GroupCommitWriter, run_write
+
+# Storage encoding (see persistence.migrations): day is a date ordinal, ts is
+# microseconds since 1970-01-01, barcode and product name live in meal_products.
+_INSERT_PRODUCT_SQL = """
+    INSERT INTO meal_products(barcode, name) VALUES(?, ?)
+    ON CONFLICT(barcode, name) DO NOTHING
+"""
+
+_INSERT_ENTRY_SQL = """
+    INSERT INTO meal_entries(entry_id, user_id, day, ts, product_id, grams, kcal, protein_g, carbs_g, fat_g)
+    VALUES(?, ?, ?, ?, (SELECT product_id FROM meal_products WHERE barcode = ? AND name = ?), ?, ?, ?, ?, ?)
+"""
+
+_SELECT_ENTRY_SQL = """
+    SELECT e.entry_id, e.day, e.ts, p.barcode, p.name AS product_name, e.grams, e.kcal, e.protein_g, e.carbs_g, e.fat_g
+    FROM meal_entries e
+    JOIN meal_products p ON p.product_id = e.product_id
+"""
+
+_BUMP_TOTALS_SQL = """
+    INSERT INTO daily_totals(user_id, day, kcal, protein_g, carbs_g, fat_g, entry_count)
+    VALUES(?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, day) DO UPDATE SET
+        kcal = kcal + excluded.kcal,
+        protein_g = protein_g + excluded.protein_g,
+        carbs_g = carbs_g + excluded.carbs_g,
+        fat_g = fat_g + excluded.fat_g,
+        entry_count = entry_count + excluded.entry_count
+"""
+
+# Deleted rows in the shape _row_to_entry reads.
+_RETURNING_ENTRY_SQL = """
+    RETURNING ts,
+        (SELECT barcode FROM meal_products p WHERE p.product_id = meal_entries.product_id) AS barcode,
+        (SELECT name FROM meal_products p WHERE p.product_id = meal_entries.product_id) AS product_name,
+        grams, kcal, protein_g, carbs_g, fat_g, entry_id
+"""
+
+_BATCH_FETCH_ROWS = 65_536
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
 
 class SqliteDayLogRepository:
-    def __init__(self, conn: sqlite3.Connection):
-        self._conn = conn
+    """Meal log storage.
+
+    Reads use ``conn``. Writes commit on their own, or go through ``writer``
+    when one is given, which commits many of them together.
+    """
+
+    def __init__(self, conn: ConnectionSource, writer: Optional[GroupCommitWriter] = None):
+        self._source = conn
+        self._writer = writer
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return resolve_connection(self._source)
 
     def load_day(self, day: date, user_id: str) -> DayLog:
-        day_str = day.isoformat()
         rows = self._conn.execute(
-            "SELECT * FROM meal_entries WHERE day = ? AND user_id = ? ORDER BY ts ASC",
-            (day_str, user_id),
+            _SELECT_ENTRY_SQL + " WHERE e.user_id = ? AND e.day = ? ORDER BY e.ts ASC",
+            (user_id, day.toordinal()),
         ).fetchall()
 
-        entries: List[MealEntry] = []
-        for r in rows:
-            entries.append(
-                MealEntry(
-                    entry_id=r["entry_id"],
-                    timestamp=datetime.fromisoformat(r["ts"]),
-                    barcode=r["barcode"],
-                    product_name=r["product_name"],
-                    grams=float(r["grams"]),
-                    nutrients=Nutrients(
-                        kcal=float(r["kcal"]),
-                        protein_g=float(r["protein_g"]),
-                        carbs_g=float(r["carbs_g"]),
-                        fat_g=float(r["fat_g"]),
-                    ),
-                )
-            )
+        entries: List[MealEntry] = [_row_to_entry(r) for r in rows]
         return DayLog(day=day, entries=entries)
 
     def save_day(self, log: DayLog, user_id: str) -> None:
         # Simple approach: delete day and re-insert (ok for small local app)
-        day_str = log.day.isoformat()
-        self._conn.execute(
-            "DELETE FROM meal_entries WHERE day = ? AND user_id = ?",
-            (day_str, user_id),
-        )
-        for e in log.entries:
-            self._conn.execute(
-                """
-                INSERT INTO meal_entries(entry_id, user_id, day, ts, barcode, product_name, grams, kcal, protein_g, carbs_g, fat_g)
-                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    e.entry_id,
-                    user_id,
-                    day_str,
-                    e.timestamp.isoformat(),
-                    e.barcode,
-                    e.product_name,
-                    float(e.grams),
-                    float(e.nutrients.kcal),
-                    float(e.nutrients.protein_g),
-                    float(e.nutrients.carbs_g),
-                    float(e.nutrients.fat_g),
-                ),
+        day_num = log.day.toordinal()
+
+        def write(conn: sqlite3.Connection) -> None:
+            removed = conn.execute(
+                "DELETE FROM meal_entries WHERE day = ? AND user_id = ?" + _RETURNING_ENTRY_SQL,
+                (day_num, user_id),
+            ).fetchall()
+            _insert_products(conn, log.entries)
+            conn.executemany(
+                _INSERT_ENTRY_SQL,
+                [_entry_params(e, day_num, user_id) for e in log.entries],
             )
-        self._conn.commit()
+            _recompute_totals(conn, "user_id = ? AND day = ?", (user_id, day_num))
+            # Only what the rewrite changed; an edited day keeps most entries.
+            before = Counter(entry_row(r[:8]) for r in removed)
+            after = Counter(map(_quick_add_row, log.entries))
+            if before != after:
+                forget_entries(conn, user_id, (before - after).elements())
+                record_entries(conn, user_id, (after - before).elements())
 
-    def assign_unowned_entries(self, user_id: str) -> int:
-        cur = self._conn.execute(
-            "UPDATE meal_entries SET user_id = ? WHERE user_id IS NULL OR user_id = ''",
-            (user_id,),
+        run_write(self._source, self._writer, write)
+
+    def append_entry(self, day: date, entry: MealEntry, user_id: str) -> None:
+        day_num = day.toordinal()
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(_INSERT_PRODUCT_SQL, (entry.barcode, entry.product_name))
+            conn.execute(_INSERT_ENTRY_SQL, _entry_params(entry, day_num, user_id))
+            _bump_totals(conn, user_id, day_num, entry.nutrients, 1)
+            record_entries(conn, user_id, [_quick_add_row(entry)])
+
+        run_write(self._source, self._writer, write)
+
+    def append_entries(self, entries_by_day: Mapping[date, Sequence[MealEntry]], user_id: str) -> None:
+        rows: List[Tuple[object, ...]] = []
+        totals: List[Tuple[object, ...]] = []
+        for day, entries in entries_by_day.items():
+            if not entries:
+                continue
+            day_num = day.toordinal()
+            rows.extend(_entry_params(e, day_num, user_id) for e in entries)
+            totals.append((
+                user_id,
+                day_num,
+                sum(e.nutrients.kcal for e in entries),
+                sum(e.nutrients.protein_g for e in entries),
+                sum(e.nutrients.carbs_g for e in entries),
+                sum(e.nutrients.fat_g for e in entries),
+                len(entries),
+            ))
+
+        def write(conn: sqlite3.Connection) -> None:
+            _insert_products(conn, (e for entries in entries_by_day.values() for e in entries))
+            conn.executemany(_INSERT_ENTRY_SQL, rows)
+            conn.executemany(_BUMP_TOTALS_SQL, totals)
+            record_entries(
+                conn, user_id, (_quick_add_row(e) for entries in entries_by_day.values() for e in entries)
+            )
+
+        run_write(self._source, self._writer, write)
+
+    def delete_entry(self, day: date, entry_id: str, user_id: str) -> Optional[MealEntry]:
+        day_num = day.toordinal()
+
+        def write(conn: sqlite3.Connection) -> Optional[MealEntry]:
+            rows = conn.execute(
+                "DELETE FROM meal_entries WHERE entry_id = ? AND day = ? AND user_id = ?" + _RETURNING_ENTRY_SQL,
+                (entry_id, day_num, user_id),
+            ).fetchall()
+            if not rows:
+                return None
+            entry = _row_to_entry(rows[0])
+            _bump_totals(conn, user_id, day_num, entry.nutrients.scale(-1.0), -1)
+            conn.execute(
+                "DELETE FROM daily_totals WHERE user_id = ? AND day = ? AND entry_count <= 0",
+                (user_id, day_num),
+            )
+            forget_entries(conn, user_id, [_quick_add_row(entry)])
+            return entry
+
+        return run_write(self._source, self._writer, write)
+
+    def totals_between(self, user_id: str, start: date, end: date) -> List[Tuple[date, Nutrients]]:
+        if end < start:
+            raise ValueError("end must be >= start")
+        rows = self._conn.execute(
+            """
+            SELECT day, kcal, protein_g, carbs_g, fat_g
+            FROM daily_totals
+            WHERE user_id = ? AND day BETWEEN ? AND ?
+            """,
+            (user_id, start.toordinal(), end.toordinal()),
+        ).fetchall()
+        by_day: Dict[int, Nutrients] = {
+            r["day"]: Nutrients(
+                kcal=float(r["kcal"]),
+                protein_g=float(r["protein_g"]),
+                carbs_g=float(r["carbs_g"]),
+                fat_g=float(r["fat_g"]),
+            )
+            for r in rows
+        }
+        zero = Nutrients.zero()
+        first = start.toordinal()
+        return [
+            (start + timedelta(days=i), by_day.get(first + i, zero))
+            for i in range((end - start).days + 1)
+        ]
+
+    def nutrients_between(self, user_id: str, start: date, end: date) -> NutrientsBatch:
+        """Per-entry nutrients and days, read straight into columns (no MealEntry objects)."""
+        if end < start:
+            raise ValueError("end must be >= start")
+        cursor = self._conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            """
+            SELECT day, kcal, protein_g, carbs_g, fat_g
+            FROM meal_entries
+            WHERE user_id = ? AND day BETWEEN ? AND ?
+            """,
+            (user_id, start.toordinal(), end.toordinal()),
+        )
+        try:
+            batches = []
+            while rows := cursor.fetchmany(_BATCH_FETCH_ROWS):
+                batches.append(NutrientsBatch.from_rows(rows))
+        finally:
+            cursor.close()
+        return NutrientsBatch.concat(batches)
+
+    def iter_entries(
+        self, user_id: str, start: date, end: date, chunk_size: int = 1000
+    ) -> Iterator[Tuple[date, MealEntry]]:
+        """Yield ``(day, entry)`` in day and time order, ``chunk_size`` rows at a time.
+
+        Only one chunk is held in memory. The cursor keeps a read snapshot open
+        until the iterator is exhausted or closed.
+        """
+        if end < start:
+            raise ValueError("end must be >= start")
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be > 0")
+        cursor = self._conn.execute(
+            _SELECT_ENTRY_SQL + " WHERE e.user_id = ? AND e.day BETWEEN ? AND ? ORDER BY e.day, e.ts",
+            (user_id, start.toordinal(), end.toordinal()),
         )
-        self._conn.commit()
-        return cur.rowcount
+        return _iter_cursor(cursor, chunk_size)
+
+    def assign_unowned_entries(self, user_id: str) -> int:
+        def write(conn: sqlite3.Connection) -> int:
+            cur = conn.execute(
+                "UPDATE meal_entries SET user_id = ? WHERE user_id IS NULL OR user_id = ''",
+                (user_id,),
+            )
+            if cur.rowcount > 0:
+                conn.execute("DELETE FROM daily_totals WHERE user_id = ''")
+                _recompute_totals(conn, "user_id = ?", (user_id,))
+                rebuild_quick_add(conn, user_id)
+            return cur.rowcount
+
+        return run_write(self._source, self._writer, write)
+
+    def barcode_usage(self, user_id: str, since: date, limit: int) -> List[BarcodeUsage]:
+        """The ``limit`` barcodes logged most recently since ``since``, with their entry counts.
+
+        Most recently logged first; entries without a barcode are left out.
+        """
+        if limit <= 0:
+            return []
+        rows = self._conn.execute(
+            """
+            SELECT p.barcode, COUNT(*) AS entries, MAX(e.day) AS last_day, MAX(e.ts) AS last_ts
+            FROM meal_entries e
+            JOIN meal_products p ON p.product_id = e.product_id
+            WHERE e.user_id = ? AND e.day >= ? AND p.barcode != ''
+            GROUP BY p.barcode
+            ORDER BY last_ts DESC
+            LIMIT ?
+            """,
+            (user_id, since.toordinal(), limit),
+        ).fetchall()
+        return [
+            BarcodeUsage(barcode=r["barcode"], entries=r["entries"], last_day=_day_from_ordinal(r["last_day"]))
+            for r in rows
+        ]
+
+    def quick_add_candidates(self, user_id: str, limit: int) -> List[QuickAddItem]:
+        """The user's ``limit`` best quick-add foods, read from the quick_add index."""
+        if limit <= 0:
+            return []
+        rows = self._conn.execute(
+            """
+            SELECT barcode, product_name, grams, kcal, protein_g, carbs_g, fat_g, uses, last_ts
+            FROM quick_add
+            WHERE user_id = ?
+            ORDER BY score DESC
+            LIMIT ?
+            """,
+            (user_id, limit),
+        ).fetchall()
+        return [
+            QuickAddItem(
+                barcode=r["barcode"],
+                product_name=r["product_name"],
+                grams=float(r["grams"]),
+                nutrients_per_100g=Nutrients(
+                    kcal=float(r["kcal"]),
+                    protein_g=float(r["protein_g"]),
+                    carbs_g=float(r["carbs_g"]),
+                    fat_g=float(r["fat_g"]),
+                ).scale(100.0 / float(r["grams"])),
+                uses=r["uses"],
+                last_used=_EPOCH + timedelta(microseconds=r["last_ts"]),
+            )
+            for r in rows
+        ]
+
+
+def _recompute_totals(conn: sqlite3.Connection, where: str, params: Tuple[object, ...]) -> None:
+    conn.execute(f"DELETE FROM daily_totals WHERE {where}", params)
+    conn.execute(
+        f"""
+        INSERT INTO daily_totals(user_id, day, kcal, protein_g, carbs_g, fat_g, entry_count)
+        SELECT user_id, day, SUM(kcal), SUM(protein_g), SUM(carbs_g), SUM(fat_g), COUNT(*)
+        FROM meal_entries
+        WHERE {where}
+        GROUP BY user_id, day
+        """,
+        params,
+    )
+
+
+def _bump_totals(conn: sqlite3.Connection, user_id: str, day_num: int, delta: Nutrients, count: int) -> None:
+    conn.execute(
+        _BUMP_TOTALS_SQL,
+        (user_id, day_num, delta.kcal, delta.protein_g, delta.carbs_g, delta.fat_g, count),
+    )
+
+
+def _insert_products(conn: sqlite3.Connection, entries: Iterable[MealEntry]) -> None:
+    conn.executemany(_INSERT_PRODUCT_SQL, {(e.barcode, e.product_name) for e in entries})
+
+
+def _iter_cursor(cursor: sqlite3.Cursor, chunk_size: int) -> Iterator[Tuple[date, MealEntry]]:
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for r in rows:
+                yield _day_from_ordinal(r["day"]), _row_to_entry(r)
+    finally:
+        cursor.close()
+
+
+def _row_to_entry(r: sqlite3.Row) -> MealEntry:
+    return MealEntry(
+        entry_id=r["entry_id"],
+        timestamp=_EPOCH + timedelta(microseconds=r["ts"]),
+        barcode=r["barcode"],
+        product_name=r["product_name"],
+        grams=float(r["grams"]),
+        nutrients=Nutrients(
+            kcal=float(r["kcal"]),
+            protein_g=float(r["protein_g"]),
+            carbs_g=float(r["carbs_g"]),
+            fat_g=float(r["fat_g"]),
+        ),
+    )
+
+
+def _entry_params(e: MealEntry, day_num: int, user_id: str) -> Tuple[object, ...]:
+    return (
+        e.entry_id,
+        user_id,
+        day_num,
+        _timestamp_to_micros(e.timestamp),
+        e.barcode,
+        e.product_name,
+        float(e.grams),
+        float(e.nutrients.kcal),
+        float(e.nutrients.protein_g),
+        float(e.nutrients.carbs_g),
+        float(e.nutrients.fat_g),
+    )
+
+
+def _quick_add_row(e: MealEntry) -> EntryRow:
+    return (
+        _timestamp_to_micros(e.timestamp),
+        e.barcode,
+        e.product_name,
+        float(e.grams),
+        float(e.nutrients.kcal),
+        float(e.nutrients.protein_g),
+        float(e.nutrients.carbs_g),
+        float(e.nutrients.fat_g),
+    )
+
+
+def _timestamp_to_micros(ts: datetime) -> int:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - _EPOCH) // _MICROSECOND
+
+
+# Entries of a range share few distinct days.
+_day_from_ordinal = lru_cache(maxsize=4096)(date.fromordinal)
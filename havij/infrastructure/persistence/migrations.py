@@ -0,0 +1,439 @@
+"""Versioned schema migrations.
+
+The schema version lives in ``PRAGMA user_version``. ``migrate`` applies the
+``MIGRATIONS`` newer than it in order; a database that is already current
+costs a single pragma read.
+
+The meal log uses a compact layout: ``day`` is a date ordinal
+(``date.toordinal()``), ``ts`` is microseconds since 1970-01-01 of the entry's
+wall-clock time (aware timestamps are stored in UTC), and each distinct
+barcode/product name pair is stored once in ``meal_products``.
+"""
+from __future__ import annotations
+
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from havij.infrastructure.persistence.quick_add import create_quick_add_table, rebuild_quick_add
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+    # Batched migrations commit in steps of their own (for large rewrites) and
+    # must be safe to re-run; the others run in one transaction together with
+    # the version bump.
+    batched: bool = False
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version;").fetchone()[0])
+
+
+def migrate(conn: sqlite3.Connection, migrations: Optional[Tuple[Migration, ...]] = None) -> List[int]:
+    """Bring the database up to the last migration; returns the versions applied."""
+    migrations = MIGRATIONS if migrations is None else migrations
+    target = migrations[-1].version if migrations else 0
+    current = schema_version(conn)
+    if current == target:
+        return []
+    if current > target:
+        raise SchemaVersionError(f"database schema version {current} is newer than this app supports ({target})")
+    applied: List[int] = []
+    for migration in migrations:
+        if migration.version <= current:
+            continue
+        if migration.batched:
+            migration.apply(conn)
+        with _immediate(conn):
+            # Another process may have applied it while this one was waiting.
+            current = schema_version(conn)
+            if current >= migration.version:
+                continue
+            if not migration.batched:
+                migration.apply(conn)
+            conn.execute(f"PRAGMA user_version = {int(migration.version)};")
+        current = migration.version
+        applied.append(migration.version)
+    return applied
+
+MEAL_PRODUCTS_DDL = """
+    CREATE TABLE IF NOT EXISTS meal_products (
+        product_id INTEGER PRIMARY KEY,
+        barcode TEXT NOT NULL,
+        name TEXT NOT NULL,
+        UNIQUE (barcode, name)
+    );
+"""
+
+# Every meal_entries query filters on user_id and day.
+MEAL_ENTRIES_INDEX = "idx_meal_entries_by_user_day"
+
+
+def meal_entries_ddl(table: str) -> str:
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            entry_id TEXT PRIMARY KEY,
+            user_id TEXT,
+            day INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            product_id INTEGER NOT NULL REFERENCES meal_products(product_id),
+            grams REAL NOT NULL,
+            kcal REAL NOT NULL,
+            protein_g REAL NOT NULL,
+            carbs_g REAL NOT NULL,
+            fat_g REAL NOT NULL
+        );
+    """
+
+
+def daily_totals_ddl(table: str) -> str:
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            user_id TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            kcal REAL NOT NULL,
+            protein_g REAL NOT NULL,
+            carbs_g REAL NOT NULL,
+            fat_g REAL NOT NULL,
+            entry_count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day)
+        );
+    """
+
+
+# Conversions from the legacy ISO text columns. Only built-in SQL functions
+# are used so the mirror triggers keep working for connections opened by an
+# older version of the app while the migration runs.
+def _day_sql(column: str) -> str:
+    # julianday('0001-01-01') is 1721425.5 and date(1, 1, 1).toordinal() is 1.
+    return f"CAST(julianday({column}) - 1721424.5 AS INTEGER)"
+
+
+def _ts_sql(column: str) -> str:
+    # isoformat() writes either no fraction or exactly six digits after the seconds.
+    return (
+        f"(CAST(strftime('%s', {column}) AS INTEGER) * 1000000"
+        f" + CASE WHEN substr({column}, 20, 1) = '.' THEN CAST(substr({column}, 21, 6) AS INTEGER) ELSE 0 END)"
+    )
+
+
+_COMPACT_TABLE = "meal_entries_compact"
+_COMPACT_COLUMNS = "entry_id, user_id, day, ts, product_id, grams, kcal, protein_g, carbs_g, fat_g"
+
+
+REBUILD_DAILY_TOTALS_SQL = """
+    INSERT INTO daily_totals(user_id, day, kcal, protein_g, carbs_g, fat_g, entry_count)
+    SELECT COALESCE(user_id, ''), day, SUM(kcal), SUM(protein_g), SUM(carbs_g), SUM(fat_g), COUNT(*)
+    FROM meal_entries
+    GROUP BY COALESCE(user_id, ''), day
+"""
+
+
+def _create_base_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        """
+    )
+    # Cached Open Food Facts lookups; found = 0 marks a remembered 404.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            barcode TEXT PRIMARY KEY,
+            found INTEGER NOT NULL,
+            name TEXT,
+            kcal REAL,
+            protein_g REAL,
+            carbs_g REAL,
+            fat_g REAL,
+            fetched_at REAL NOT NULL
+        );
+        """
+    )
+    # Offline product catalog imported from an Open Food Facts dump.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS catalog_products (
+            barcode TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            brands TEXT NOT NULL,
+            kcal REAL NOT NULL,
+            protein_g REAL NOT NULL,
+            carbs_g REAL NOT NULL,
+            fat_g REAL NOT NULL
+        );
+        """
+    )
+    had_search_index = _has_table(conn, "catalog_products_fts")
+    create_catalog_search_index(conn)
+    if not had_search_index and _has_table(conn, "catalog_products_fts"):
+        conn.execute("INSERT INTO catalog_products_fts(catalog_products_fts) VALUES('rebuild');")
+
+
+def _create_meal_log(conn: sqlite3.Connection) -> None:
+    if has_legacy_meal_entries(conn):
+        migrate_meal_entries_to_compact(conn)
+    with _immediate(conn):
+        had_daily_totals = _has_table(conn, "daily_totals")
+        conn.execute(MEAL_PRODUCTS_DDL)
+        conn.execute(meal_entries_ddl("meal_entries"))
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {MEAL_ENTRIES_INDEX} ON meal_entries(user_id, day);")
+        # Per-(user, day) rollup of meal_entries, kept in sync by the meal
+        # repository in the same transaction as every entry write.
+        conn.execute(daily_totals_ddl("daily_totals"))
+        if not had_daily_totals:
+            conn.execute(REBUILD_DAILY_TOTALS_SQL)
+
+
+def _create_quick_add(conn: sqlite3.Connection) -> None:
+    # Per-user recent and frequent foods, kept in sync by the meal repository
+    # like daily_totals.
+    create_quick_add_table(conn)
+    rebuild_quick_add(conn)
+
+
+def _create_user_directory(conn: sqlite3.Connection) -> None:
+    # Which user owns a username, for sharded storage (see persistence.sharding),
+    # where user rows live in the shard of their user_id. Only the main
+    # database fills it.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_directory (
+            username TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL
+        );
+        """
+    )
+    # Users created before the upgrade, so the directory (and the user count
+    # read from it) is complete from the start.
+    conn.execute(
+        """
+        INSERT INTO user_directory(username, user_id)
+        SELECT username, user_id FROM users
+        WHERE true
+        ON CONFLICT(username) DO NOTHING
+        """
+    )
+
+
+def create_catalog_search_index(conn: sqlite3.Connection) -> None:
+    # Full-text index over catalog product names and brands. The prefix indexes
+    # keep typeahead queries ("greek yo") from scanning the whole term list.
+    try:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS catalog_products_fts USING fts5(
+                name,
+                brands,
+                content='catalog_products',
+                content_rowid='rowid',
+                prefix='2 3 4',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            """
+        )
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5; catalog search falls back to LIKE.
+        return
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS catalog_products_fts_ai AFTER INSERT ON catalog_products BEGIN
+            INSERT INTO catalog_products_fts(rowid, name, brands) VALUES (new.rowid, new.name, new.brands);
+        END;
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS catalog_products_fts_ad AFTER DELETE ON catalog_products BEGIN
+            INSERT INTO catalog_products_fts(catalog_products_fts, rowid, name, brands)
+            VALUES ('delete', old.rowid, old.name, old.brands);
+        END;
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS catalog_products_fts_au AFTER UPDATE ON catalog_products BEGIN
+            INSERT INTO catalog_products_fts(catalog_products_fts, rowid, name, brands)
+            VALUES ('delete', old.rowid, old.name, old.brands);
+            INSERT INTO catalog_products_fts(rowid, name, brands) VALUES (new.rowid, new.name, new.brands);
+        END;
+        """
+    )
+
+
+def has_legacy_meal_entries(conn: sqlite3.Connection) -> bool:
+    return "product_name" in _columns(conn, "meal_entries")
+
+
+def migrate_meal_entries_to_compact(
+    conn: sqlite3.Connection,
+    batch_size: int = 50_000,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Rewrite a legacy ``meal_entries`` table into the compact layout.
+
+    Rows are copied ``batch_size`` at a time, one short transaction each, so
+    other connections can keep reading and writing in between. Their writes
+    to the legacy table are mirrored into the new one by triggers until the
+    final swap. ``on_batch`` is called with the running row count after every
+    batch. Returns the number of rows copied; the migration can be resumed
+    after an interruption.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be > 0")
+    with _immediate(conn):
+        if not has_legacy_meal_entries(conn):
+            return 0
+        if "user_id" not in _columns(conn, "meal_entries"):
+            # Databases from before accounts existed.
+            conn.execute("ALTER TABLE meal_entries ADD COLUMN user_id TEXT;")
+        conn.execute(MEAL_PRODUCTS_DDL)
+        conn.execute(meal_entries_ddl(_COMPACT_TABLE))
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {MEAL_ENTRIES_INDEX} ON {_COMPACT_TABLE}(user_id, day);"
+        )
+        for sql in _mirror_triggers():
+            conn.execute(sql)
+
+    copied = 0
+    last_rowid = 0
+    while True:
+        with _immediate(conn):
+            if not has_legacy_meal_entries(conn):
+                # Finished by another process in the meantime.
+                return copied
+            upper = conn.execute(
+                "SELECT MAX(rowid) FROM (SELECT rowid FROM meal_entries WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+                (last_rowid, batch_size),
+            ).fetchone()[0]
+            if upper is None:
+                break
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO meal_products(barcode, name)
+                SELECT DISTINCT barcode, product_name FROM meal_entries WHERE rowid > ? AND rowid <= ?
+                """,
+                (last_rowid, upper),
+            )
+            # Rows already mirrored by the triggers hold newer data; keep them.
+            cur = conn.execute(
+                f"""
+                INSERT OR IGNORE INTO {_COMPACT_TABLE}({_COMPACT_COLUMNS})
+                SELECT m.entry_id, m.user_id, {_day_sql("m.day")}, {_ts_sql("m.ts")}, p.product_id,
+                       m.grams, m.kcal, m.protein_g, m.carbs_g, m.fat_g
+                FROM meal_entries m
+                JOIN meal_products p ON p.barcode = m.barcode AND p.name = m.product_name
+                WHERE m.rowid > ? AND m.rowid <= ?
+                """,
+                (last_rowid, upper),
+            )
+        copied += cur.rowcount
+        last_rowid = upper
+        if on_batch is not None:
+            on_batch(copied)
+
+    with _immediate(conn):
+        if not has_legacy_meal_entries(conn):
+            return copied
+        for suffix in ("ai", "au", "ad"):
+            conn.execute(f"DROP TRIGGER IF EXISTS meal_entries_compact_{suffix};")
+        conn.execute("DROP TABLE meal_entries;")
+        conn.execute(f"ALTER TABLE {_COMPACT_TABLE} RENAME TO meal_entries;")
+        if "day" in _columns(conn, "daily_totals") and _column_type(conn, "daily_totals", "day") == "TEXT":
+            conn.execute(daily_totals_ddl("daily_totals_compact"))
+            conn.execute(
+                f"""
+                INSERT INTO daily_totals_compact(user_id, day, kcal, protein_g, carbs_g, fat_g, entry_count)
+                SELECT user_id, {_day_sql("day")}, kcal, protein_g, carbs_g, fat_g, entry_count
+                FROM daily_totals
+                """
+            )
+            conn.execute("DROP TABLE daily_totals;")
+            conn.execute("ALTER TABLE daily_totals_compact RENAME TO daily_totals;")
+    return copied
+
+
+def _mirror_triggers() -> List[str]:
+    upsert = f"""
+        INSERT OR IGNORE INTO meal_products(barcode, name) VALUES (new.barcode, new.product_name);
+        INSERT OR REPLACE INTO {_COMPACT_TABLE}({_COMPACT_COLUMNS})
+        SELECT new.entry_id, new.user_id, {_day_sql("new.day")}, {_ts_sql("new.ts")}, product_id,
+               new.grams, new.kcal, new.protein_g, new.carbs_g, new.fat_g
+        FROM meal_products WHERE barcode = new.barcode AND name = new.product_name;
+    """
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS meal_entries_compact_ai AFTER INSERT ON meal_entries BEGIN
+            {upsert}
+        END;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS meal_entries_compact_au AFTER UPDATE ON meal_entries BEGIN
+            DELETE FROM {_COMPACT_TABLE} WHERE entry_id = old.entry_id;
+            {upsert}
+        END;
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS meal_entries_compact_ad AFTER DELETE ON meal_entries BEGIN
+            DELETE FROM {_COMPACT_TABLE} WHERE entry_id = old.entry_id;
+        END;
+        """,
+    ]
+
+
+@contextmanager
+def _immediate(conn: sqlite3.Connection) -> Iterator[None]:
+    # DDL does not open an implicit transaction in sqlite3, so start one
+    # explicitly to make the schema changes atomic.
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table});")]
+
+
+def _has_table(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (table,),
+    ).fetchone()
+    return row is not None
+
+
+def _column_type(conn: sqlite3.Connection, table: str, column: str) -> str:
+    for r in conn.execute(f"PRAGMA table_info({table});"):
+        if r[1] == column:
+            return str(r[2]).upper()
+    return ""
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(1, "users, product cache and catalog tables", _create_base_tables),
+    Migration(2, "compact meal log and daily totals", _create_meal_log, batched=True),
+    Migration(3, "quick-add foods", _create_quick_add),
+    Migration(4, "user directory for sharded storage", _create_user_directory),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from havij.application.ports import ProductCatalog
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.product import Product
+from havij.infrastructure.api.openfoodfacts_client import ProductNotFoundError, UpstreamUnavailableError
+from havij.infrastructure.persistence.sqlite_db import ConnectionSource, resolve_connection
+
+
+@dataclass(frozen=True, slots=True)
+class ProductCacheStats:
+    hits: int
+    negative_hits: int
+    misses: int
+    # Expired entries served because the upstream catalog was unavailable.
+    stale_hits: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.negative_hits + self.misses
+        return (self.hits + self.negative_hits) / total if total else 0.0
+
+
+class SqliteProductCache(ProductCatalog):
+    """ProductCatalog decorator that persists lookups in the ``products`` table.
+
+    Found products are reused for ``ttl_s`` seconds; products the upstream
+    catalog reported as missing are remembered for ``negative_ttl_s`` seconds.
+    While the upstream catalog is unavailable, expired entries are served
+    instead of the error.
+    """
+
+    def __init__(
+        self,
+        inner: ProductCatalog,
+        conn: ConnectionSource,
+        ttl_s: float = 7 * 24 * 3600.0,
+        negative_ttl_s: float = 3600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._inner = inner
+        self._source = conn
+        self._ttl_s = ttl_s
+        self._negative_ttl_s = negative_ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._stale_hits = 0
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return resolve_connection(self._source)
+
+    def get_by_barcode(self, barcode: str) -> Product:
+        now = self._clock()
+        row = self._conn.execute(
+            "SELECT * FROM products WHERE barcode = ?",
+            (barcode,),
+        ).fetchone()
+        if row is not None:
+            age = now - float(row["fetched_at"])
+            if row["found"] and age < self._ttl_s:
+                with self._lock:
+                    self._hits += 1
+                return _row_to_product(row)
+            if not row["found"] and age < self._negative_ttl_s:
+                with self._lock:
+                    self._negative_hits += 1
+                raise ProductNotFoundError(f"Product not found for barcode={barcode}")
+
+        with self._lock:
+            self._misses += 1
+        try:
+            product = self._inner.get_by_barcode(barcode)
+        except ProductNotFoundError:
+            self._store_missing(barcode, now)
+            raise
+        except UpstreamUnavailableError:
+            if row is None:
+                raise
+            with self._lock:
+                self._stale_hits += 1
+            if not row["found"]:
+                raise ProductNotFoundError(f"Product not found for barcode={barcode}") from None
+            return _row_to_product(row)
+        self._store(product, now)
+        return product
+
+    def stats(self) -> ProductCacheStats:
+        with self._lock:
+            return ProductCacheStats(
+                hits=self._hits,
+                negative_hits=self._negative_hits,
+                misses=self._misses,
+                stale_hits=self._stale_hits,
+            )
+
+    def _store(self, product: Product, now: float) -> None:
+        n = product.nutrients_per_100g
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO products(barcode, found, name, kcal, protein_g, carbs_g, fat_g, fetched_at)
+                VALUES(?, 1, ?, ?, ?, ?, ?, ?)
+                """,
+                (product.barcode, product.name, n.kcal, n.protein_g, n.carbs_g, n.fat_g, now),
+            )
+
+    def _store_missing(self, barcode: str, now: float) -> None:
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO products(barcode, found, name, kcal, protein_g, carbs_g, fat_g, fetched_at)
+                VALUES(?, 0, NULL, NULL, NULL, NULL, NULL, ?)
+                """,
+                (barcode, now),
+            )
+
+
+def _row_to_product(r: sqlite3.Row) -> Product:
+    return Product(
+        barcode=r["barcode"],
+        name=r["name"],
+        nutrients_per_100g=Nutrients(
+            kcal=float(r["kcal"]),
+            protein_g=float(r["protein_g"]),
+            carbs_g=float(r["carbs_g"]),
+            fat_g=float(r["fat_g"]),
+        ),
+    )
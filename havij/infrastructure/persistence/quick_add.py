@@ -0,0 +1,265 @@
+"""Per-user "recent and frequent foods" rollup of meal_entries.
+
+One ``quick_add`` row per user and item, where an item is a barcode or, for
+entries without one, a product name. Each row keeps the use count, the last
+entry's product, grams and nutrients, and a time-decayed score: every entry
+weighs ``2 ** (-age / QUICK_ADD_HALF_LIFE_DAYS)``, so an entry from two weeks
+ago counts half as much as one logged today.
+
+All of a user's scores decay at the same rate, so their order never changes
+with time. The score column therefore stores
+``log2(sum(2 ** (entry_day / half_life)))``, with ``entry_day`` counted from
+1970: it ranks like the decayed score at any moment, never needs updating as
+time passes, and lets the index on ``(user_id, score)`` return a user's top
+items without reading their history.
+"""
+from __future__ import annotations
+
+import math
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+QUICK_ADD_HALF_LIFE_DAYS = 14.0
+
+QUICK_ADD_INDEX = "idx_quick_add_by_user_score"
+
+# (ts, barcode, product_name, grams, kcal, protein_g, carbs_g, fat_g) of one entry.
+EntryRow = Tuple[int, str, str, float, float, float, float, float]
+
+_SELECT_ENTRIES_SQL = """
+    SELECT e.user_id, e.ts, p.barcode, p.name, e.grams, e.kcal, e.protein_g, e.carbs_g, e.fat_g
+    FROM meal_entries e
+    JOIN meal_products p ON p.product_id = e.product_id
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO quick_add(
+        user_id, item_key, barcode, product_name, grams, kcal, protein_g, carbs_g, fat_g, uses, last_ts, score
+    )
+    VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, item_key) DO UPDATE SET
+        barcode = excluded.barcode,
+        product_name = excluded.product_name,
+        grams = excluded.grams,
+        kcal = excluded.kcal,
+        protein_g = excluded.protein_g,
+        carbs_g = excluded.carbs_g,
+        fat_g = excluded.fat_g,
+        uses = excluded.uses,
+        last_ts = excluded.last_ts,
+        score = excluded.score
+"""
+
+_MICROS_PER_DAY = 86_400_000_000
+_FETCH_ROWS = 65_536
+# Bound parameters per IN list, well under SQLite's limit.
+_KEYS_PER_QUERY = 500
+# Smallest share of a score that may be left after subtracting an entry.
+_MIN_REMAINING = 1e-6
+
+
+def create_quick_add_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS quick_add (
+            user_id TEXT NOT NULL,
+            item_key TEXT NOT NULL,
+            barcode TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            grams REAL NOT NULL,
+            kcal REAL NOT NULL,
+            protein_g REAL NOT NULL,
+            carbs_g REAL NOT NULL,
+            fat_g REAL NOT NULL,
+            uses INTEGER NOT NULL,
+            last_ts INTEGER NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (user_id, item_key)
+        );
+        """
+    )
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {QUICK_ADD_INDEX} ON quick_add(user_id, score DESC);")
+
+
+def item_key(barcode: str, product_name: str) -> str:
+    if barcode:
+        return barcode
+    # Prefixed so that a product name made of digits cannot collide with a barcode.
+    return "name:" + " ".join(product_name.split()).casefold()
+
+
+def score_of(ts: int) -> float:
+    """Score of a single entry logged at ``ts`` (microseconds since 1970)."""
+    return ts / _MICROS_PER_DAY / QUICK_ADD_HALF_LIFE_DAYS
+
+
+def add_scores(a: float, b: float) -> float:
+    # log2(2**a + 2**b) without overflowing.
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log2(1.0 + 2.0 ** (low - high))
+
+
+@dataclass(slots=True)
+class _Item:
+    last: EntryRow
+    uses: int
+    score: float
+
+    def add(self, other: "_Item") -> None:
+        if other.last[0] >= self.last[0]:
+            self.last = other.last
+        self.uses += other.uses
+        self.score = add_scores(self.score, other.score)
+
+
+def record_entries(conn: sqlite3.Connection, user_id: str, entries: Iterable[EntryRow]) -> None:
+    """Fold newly logged entries into the user's rows; run it in the transaction that inserts them."""
+    if not user_id:
+        return
+    added: Dict[str, _Item] = {}
+    for row in entries:
+        _fold(added, row)
+    keys = list(added)
+    for start in range(0, len(keys), _KEYS_PER_QUERY):
+        chunk = keys[start:start + _KEYS_PER_QUERY]
+        rows = conn.execute(
+            f"""
+            SELECT item_key, last_ts, barcode, product_name, grams, kcal, protein_g, carbs_g, fat_g, uses, score
+            FROM quick_add WHERE user_id = ? AND item_key IN ({",".join("?" * len(chunk))})
+            """,
+            (user_id, *chunk),
+        ).fetchall()
+        for r in rows:
+            stored = _Item(last=entry_row(r[1:9]), uses=r[9], score=r[10])
+            stored.add(added[r[0]])
+            added[r[0]] = stored
+    _upsert(conn, user_id, added)
+
+
+def forget_entries(conn: sqlite3.Connection, user_id: str, entries: Iterable[EntryRow]) -> None:
+    """Take deleted entries out of the user's rows; run it in the deleting transaction."""
+    if not user_id:
+        return
+    removed: Dict[str, _Item] = {}
+    for row in entries:
+        _fold(removed, row)
+    refresh: Set[str] = set()
+    for key, gone in removed.items():
+        r = conn.execute(
+            """
+            SELECT last_ts, barcode, product_name, grams, kcal, protein_g, carbs_g, fat_g, uses, score
+            FROM quick_add WHERE user_id = ? AND item_key = ?
+            """,
+            (user_id, key),
+        ).fetchone()
+        if r is None:
+            continue
+        if r[8] <= gone.uses:
+            conn.execute("DELETE FROM quick_add WHERE user_id = ? AND item_key = ?", (user_id, key))
+            continue
+        remaining = 1.0 - 2.0 ** (gone.score - r[9])
+        last: Optional[EntryRow] = entry_row(r[0:8])
+        if gone.last[0] >= r[0]:
+            last = _latest_entry(conn, user_id, key)
+        if remaining < _MIN_REMAINING or last is None:
+            # The deleted entries outweighed all the others put together;
+            # subtracting them would leave mostly rounding error.
+            refresh.add(key)
+            continue
+        _upsert(conn, user_id, {key: _Item(last=last, uses=r[8] - gone.uses, score=r[9] + math.log2(remaining))})
+    refresh_items(conn, user_id, refresh)
+
+
+def refresh_items(conn: sqlite3.Connection, user_id: str, keys: Set[str]) -> None:
+    """Recompute the user's rows for ``keys`` from meal_entries, e.g. after deletes."""
+    if not user_id or not keys:
+        return
+    barcodes = [k for k in keys if not k.startswith("name:")]
+    clauses = []
+    if barcodes:
+        clauses.append(f"p.barcode IN ({','.join('?' * len(barcodes))})")
+    if len(barcodes) < len(keys):
+        clauses.append("p.barcode = ''")
+    cursor = conn.execute(
+        _SELECT_ENTRIES_SQL + f" WHERE e.user_id = ? AND ({' OR '.join(clauses)})",
+        (user_id, *barcodes),
+    )
+    items: Dict[str, _Item] = {}
+    for r in _fetch_all(cursor):
+        if item_key(r[2], r[3]) in keys:
+            _fold(items, entry_row(r[1:]))
+    conn.executemany(
+        "DELETE FROM quick_add WHERE user_id = ? AND item_key = ?",
+        [(user_id, key) for key in keys if key not in items],
+    )
+    _upsert(conn, user_id, items)
+
+
+def rebuild_quick_add(conn: sqlite3.Connection, user_id: Optional[str] = None) -> int:
+    """Recompute quick_add from meal_entries for one user, or everyone; returns the number of rows.
+
+    Runs in the caller's transaction.
+    """
+    if user_id is None:
+        conn.execute("DELETE FROM quick_add;")
+        cursor = conn.execute(_SELECT_ENTRIES_SQL + " WHERE e.user_id IS NOT NULL AND e.user_id != ''")
+    else:
+        conn.execute("DELETE FROM quick_add WHERE user_id = ?", (user_id,))
+        cursor = conn.execute(_SELECT_ENTRIES_SQL + " WHERE e.user_id = ?", (user_id,))
+    by_user: Dict[str, Dict[str, _Item]] = {}
+    for r in _fetch_all(cursor):
+        _fold(by_user.setdefault(r[0], {}), entry_row(r[1:]))
+    for owner, items in by_user.items():
+        _upsert(conn, owner, items)
+    return sum(len(items) for items in by_user.values())
+
+
+def _latest_entry(conn: sqlite3.Connection, user_id: str, key: str) -> Optional[EntryRow]:
+    # Walks the (user_id, day) index backwards and stops at the first match,
+    # which for a food worth quick-adding is close to the end.
+    barcode = "" if key.startswith("name:") else key
+    cursor = conn.execute(
+        _SELECT_ENTRIES_SQL + " WHERE e.user_id = ? AND p.barcode = ? ORDER BY e.day DESC, e.ts DESC",
+        (user_id, barcode),
+    )
+    try:
+        for r in cursor:
+            if item_key(r[2], r[3]) == key:
+                return entry_row(r[1:])
+    finally:
+        cursor.close()
+    return None
+
+
+def entry_row(values: Any) -> EntryRow:
+    ts, barcode, product_name, grams, kcal, protein_g, carbs_g, fat_g = values
+    return (ts, barcode, product_name, grams, kcal, protein_g, carbs_g, fat_g)
+
+
+def _fold(items: Dict[str, _Item], row: EntryRow) -> None:
+    item = _Item(last=row, uses=1, score=score_of(row[0]))
+    key = item_key(row[1], row[2])
+    current = items.get(key)
+    if current is None:
+        items[key] = item
+    else:
+        current.add(item)
+
+
+def _upsert(conn: sqlite3.Connection, user_id: str, items: Dict[str, _Item]) -> None:
+    conn.executemany(
+        _UPSERT_SQL,
+        [
+            (user_id, key, *i.last[1:], i.uses, i.last[0], i.score)
+            for key, i in items.items()
+        ],
+    )
+
+
+def _fetch_all(cursor: sqlite3.Cursor) -> Iterable[Any]:
+    try:
+        while rows := cursor.fetchmany(_FETCH_ROWS):
+            yield from rows
+    finally:
+        cursor.close()
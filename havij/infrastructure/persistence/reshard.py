@@ -0,0 +1,159 @@
+"""Copy users into the shards of a new storage layout.
+
+``reshard`` reads every user, with their meal log, from the source files (the
+single database, or the shards of another layout) and writes them into the
+shards of ``target``: one ``ATTACH`` and three ``INSERT ... SELECT`` per
+source and target shard, then one rollup rebuild per target shard. Usernames
+are recorded in ``user_directory`` of the main database. Sources are only
+read, so the old layout keeps working until the app is switched over; run it
+while the app is stopped, or writes made meanwhile are not copied.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from havij.infrastructure.config import StorageProfile
+from havij.infrastructure.persistence.quick_add import rebuild_quick_add
+from havij.infrastructure.persistence.sharding import ShardLayout
+from havij.infrastructure.persistence.sqlite_db import connect, init_schema, rebuild_daily_totals
+
+
+@dataclass(frozen=True, slots=True)
+class ReshardStats:
+    users: int
+    entries: int
+    shards: int
+    # Entries without a user are not copied; sign up once on the single
+    # database to claim them before resharding.
+    unowned_entries: int
+    seconds: float
+
+
+def reshard(
+    sources: Sequence[Path],
+    home: sqlite3.Connection,
+    target: ShardLayout,
+    profile: Optional[StorageProfile] = None,
+    on_shard: Optional[Callable[[str, int], None]] = None,
+) -> ReshardStats:
+    """Copy the users of ``sources`` into ``target``; ``on_shard(shard, users)`` reports progress.
+
+    The target shards must not hold users yet.
+    """
+    started = time.perf_counter()
+    for source in sources:
+        if target.holds(source):
+            raise ValueError(f"{source} is one of the target shards")
+    for shard in target.existing_shards():
+        if _count(target.path_of(shard), "SELECT COUNT(*) FROM users", profile):
+            raise ValueError(f"{target.path_of(shard)} already holds users; reshard into an empty layout")
+
+    users = entries = unowned = 0
+    touched: Dict[str, int] = {}
+    for source in sources:
+        conn = connect(source, profile=profile)
+        try:
+            init_schema(conn)
+            unowned += conn.execute(
+                "SELECT COUNT(*) FROM meal_entries WHERE user_id IS NULL OR user_id = ''"
+            ).fetchone()[0]
+            by_shard: Dict[str, List[Tuple[str, str]]] = {}
+            for r in conn.execute("SELECT user_id, username FROM users"):
+                by_shard.setdefault(target.shard_of(r["user_id"]), []).append((r["user_id"], r["username"]))
+        finally:
+            conn.close()
+        for shard, members in sorted(by_shard.items()):
+            entries += _copy_users(source, target.path_of(shard), [user_id for user_id, _ in members], profile)
+            users += len(members)
+            touched[shard] = touched.get(shard, 0) + len(members)
+            with home:
+                home.executemany(
+                    """
+                    INSERT INTO user_directory(username, user_id) VALUES(?, ?)
+                    ON CONFLICT(username) DO UPDATE SET user_id = excluded.user_id
+                    """,
+                    [(username, user_id) for user_id, username in members],
+                )
+
+    for shard, count in sorted(touched.items()):
+        conn = connect(target.path_of(shard), profile=profile)
+        try:
+            rebuild_daily_totals(conn)
+            with conn:
+                rebuild_quick_add(conn)
+        finally:
+            conn.close()
+        if on_shard is not None:
+            on_shard(shard, count)
+    return ReshardStats(
+        users=users,
+        entries=entries,
+        shards=len(touched),
+        unowned_entries=unowned,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def _copy_users(
+    source: Path, shard_path: Path, user_ids: List[str], profile: Optional[StorageProfile]
+) -> int:
+    conn = connect(shard_path, profile=profile)
+    try:
+        init_schema(conn)
+        conn.execute("ATTACH DATABASE ? AS src", (str(source),))
+        try:
+            with conn:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS moving(user_id TEXT PRIMARY KEY)")
+                conn.execute("DELETE FROM temp.moving")
+                conn.executemany("INSERT INTO temp.moving(user_id) VALUES(?)", [(u,) for u in user_ids])
+                conn.execute(
+                    """
+                    INSERT INTO users(user_id, username, password_hash, salt, created_at)
+                    SELECT user_id, username, password_hash, salt, created_at
+                    FROM src.users
+                    WHERE user_id IN (SELECT user_id FROM temp.moving)
+                    """
+                )
+                conn.execute(
+                    """
+                    INSERT INTO meal_products(barcode, name)
+                    SELECT DISTINCT p.barcode, p.name
+                    FROM src.meal_entries e
+                    JOIN src.meal_products p ON p.product_id = e.product_id
+                    WHERE e.user_id IN (SELECT user_id FROM temp.moving)
+                    ON CONFLICT(barcode, name) DO NOTHING
+                    """
+                )
+                # Product ids differ between files, so entries are re-linked
+                # through (barcode, name).
+                cur = conn.execute(
+                    """
+                    INSERT INTO meal_entries(
+                        entry_id, user_id, day, ts, product_id, grams, kcal, protein_g, carbs_g, fat_g
+                    )
+                    SELECT e.entry_id, e.user_id, e.day, e.ts, t.product_id,
+                        e.grams, e.kcal, e.protein_g, e.carbs_g, e.fat_g
+                    FROM src.meal_entries e
+                    JOIN src.meal_products p ON p.product_id = e.product_id
+                    JOIN main.meal_products t ON t.barcode = p.barcode AND t.name = p.name
+                    WHERE e.user_id IN (SELECT user_id FROM temp.moving)
+                    """
+                )
+                return cur.rowcount
+        finally:
+            conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+
+
+def _count(path: Path, sql: str, profile: Optional[StorageProfile]) -> int:
+    conn = connect(path, profile=profile)
+    try:
+        init_schema(conn)
+        return int(conn.execute(sql).fetchone()[0])
+    finally:
+        conn.close()
@@ -0,0 +1,302 @@
+"""Sharded storage: each user's rows in one of several SQLite files.
+
+SQLite lets one writer at a time into a file. With sharding, a user's profile
+and meal log live in the shard of their ``user_id``, so users on different
+shards never wait for each other's writes. A ``ShardLayout`` either hashes
+user ids into ``count`` files or gives every user a file of their own.
+
+The main database (``DB_PATH``) keeps what is not per user: the product
+cache, the local catalog and ``user_directory``, which maps usernames to
+user ids so that a login finds the right shard with one lookup. Every file
+gets the full schema, so migrations work the same on all of them.
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, TypeVar
+
+from havij.application.ports import BarcodeUsage, QuickAddItem, UserAuthRecord
+from havij.domain.model.meal import DayLog, MealEntry
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.nutrients_batch import NutrientsBatch
+from havij.domain.model.user import UserProfile
+from havij.infrastructure.config import AppConfig, StorageProfile
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.sqlite_db import (
+    ConnectionSource,
+    connect,
+    init_schema,
+    resolve_connection,
+)
+from havij.infrastructure.persistence.user_repository import SqliteUserRepository
+
+T = TypeVar("T")
+
+SHARDING_MODES = ("off", "hash", "per-user")
+
+# Shards scanned at once by a fan-out.
+_FAN_OUT_WORKERS = 8
+
+
+def shard_index(user_id: str, count: int) -> int:
+    """Stable across processes and Python versions, unlike ``hash``."""
+    digest = hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+@dataclass(frozen=True, slots=True)
+class ShardLayout:
+    """Where each user's shard file is.
+
+    Hashed shards are named ``shard-03-of-16.sqlite``, so layouts with
+    different counts can share a directory while resharding; per-user files
+    are named after a digest of the user id.
+    """
+
+    root: Path
+    count: int = 8
+    per_user: bool = False
+
+    def __post_init__(self) -> None:
+        if not self.per_user and self.count <= 0:
+            raise ValueError("count must be > 0")
+
+    def shard_of(self, user_id: str) -> str:
+        if self.per_user:
+            return "user-" + hashlib.blake2b(user_id.encode("utf-8"), digest_size=16).hexdigest()
+        return f"shard-{shard_index(user_id, self.count):02d}-of-{self.count:02d}"
+
+    def path_of(self, shard: str) -> Path:
+        return self.root / f"{shard}.sqlite"
+
+    def existing_shards(self) -> List[str]:
+        return sorted(p.stem for p in self.root.glob(self._pattern()))
+
+    def holds(self, path: Path) -> bool:
+        """Whether ``path`` is, or would be, one of this layout's shard files."""
+        return path.parent.resolve() == self.root.resolve() and fnmatch(path.name, self._pattern())
+
+    def _pattern(self) -> str:
+        return "user-*.sqlite" if self.per_user else f"shard-*-of-{self.count:02d}.sqlite"
+
+
+def shard_layout(cfg: AppConfig) -> Optional[ShardLayout]:
+    """The layout ``cfg`` asks for, or None for a single database file."""
+    if cfg.sharding not in SHARDING_MODES:
+        raise ValueError(f"sharding must be one of {', '.join(SHARDING_MODES)}")
+    if cfg.sharding == "off":
+        return None
+    root = cfg.shard_dir if cfg.shard_dir is not None else cfg.db_path.parent / "shards"
+    return ShardLayout(root, count=cfg.shard_count, per_user=cfg.sharding == "per-user")
+
+
+class ShardConnections:
+    """Per-thread connections to the shards of a layout.
+
+    Like ``ThreadLocalConnections``, but keyed by shard as well: each thread
+    keeps its ``max_per_thread`` most recently used shard connections open and
+    closes the least recently used one beyond that, which bounds open files
+    when every user has a shard. A shard's schema is brought up to date the
+    first time this process opens it.
+    """
+
+    def __init__(self, layout: ShardLayout, profile: Optional[StorageProfile] = None, max_per_thread: int = 32):
+        if max_per_thread <= 0:
+            raise ValueError("max_per_thread must be > 0")
+        self.layout = layout
+        self._profile = profile
+        self._max_per_thread = max_per_thread
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready: Set[str] = set()
+        self._by_thread: Dict[
+            int, Tuple["weakref.ref[threading.Thread]", "OrderedDict[str, sqlite3.Connection]"]
+        ] = {}
+
+    def for_user(self, user_id: str) -> sqlite3.Connection:
+        return self.get(self.layout.shard_of(user_id))
+
+    def get(self, shard: str) -> sqlite3.Connection:
+        conns: Optional["OrderedDict[str, sqlite3.Connection]"] = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = OrderedDict()
+            self._local.conns = conns
+            thread = threading.current_thread()
+            with self._lock:
+                self._prune_locked()
+                self._by_thread[id(thread)] = (weakref.ref(thread), conns)
+        conn = conns.get(shard)
+        if conn is not None:
+            conns.move_to_end(shard)
+            return conn
+        conn = self._open(shard)
+        with self._lock:
+            conns[shard] = conn
+            if len(conns) > self._max_per_thread:
+                _, evicted = conns.popitem(last=False)
+                evicted.close()
+        return conn
+
+    def fan_out(self, op: Callable[[sqlite3.Connection], T]) -> List[T]:
+        """Run ``op`` on every existing shard, a few at a time, on short-lived connections.
+
+        Results are in shard name order. The connections bypass the
+        per-thread cache, so a scan of many shards does not evict the
+        callers' hot ones.
+        """
+
+        def run(shard: str) -> T:
+            conn = self._open(shard)
+            try:
+                return op(conn)
+            finally:
+                conn.close()
+
+        shards = self.layout.existing_shards()
+        if len(shards) <= 1:
+            return [run(shard) for shard in shards]
+        with ThreadPoolExecutor(max_workers=min(_FAN_OUT_WORKERS, len(shards))) as executor:
+            return list(executor.map(run, shards))
+
+    def open_count(self) -> int:
+        with self._lock:
+            return sum(len(conns) for _, conns in self._by_thread.values())
+
+    def close_all(self) -> None:
+        with self._lock:
+            for _, conns in self._by_thread.values():
+                for conn in conns.values():
+                    conn.close()
+                conns.clear()
+            self._by_thread.clear()
+        self._local = threading.local()
+
+    def _open(self, shard: str) -> sqlite3.Connection:
+        # Closed by _prune_locked or close_all from other threads.
+        conn = connect(self.layout.path_of(shard), check_same_thread=False, profile=self._profile)
+        if shard not in self._ready:
+            init_schema(conn)
+            with self._lock:
+                self._ready.add(shard)
+        return conn
+
+    def _prune_locked(self) -> None:
+        for key, (ref, conns) in list(self._by_thread.items()):
+            thread = ref()
+            if thread is None or not thread.is_alive():
+                for conn in conns.values():
+                    conn.close()
+                del self._by_thread[key]
+
+
+class ShardedDayLogRepository:
+    """``DayLogRepository`` that sends each call to the shard of its user."""
+
+    def __init__(self, shards: ShardConnections):
+        self._shards = shards
+
+    def load_day(self, day: date, user_id: str) -> DayLog:
+        return self._repo(user_id).load_day(day, user_id)
+
+    def save_day(self, log: DayLog, user_id: str) -> None:
+        self._repo(user_id).save_day(log, user_id)
+
+    def append_entry(self, day: date, entry: MealEntry, user_id: str) -> None:
+        self._repo(user_id).append_entry(day, entry, user_id)
+
+    def append_entries(self, entries_by_day: Mapping[date, Sequence[MealEntry]], user_id: str) -> None:
+        self._repo(user_id).append_entries(entries_by_day, user_id)
+
+    def delete_entry(self, day: date, entry_id: str, user_id: str) -> Optional[MealEntry]:
+        return self._repo(user_id).delete_entry(day, entry_id, user_id)
+
+    def totals_between(self, user_id: str, start: date, end: date) -> List[Tuple[date, Nutrients]]:
+        return self._repo(user_id).totals_between(user_id, start, end)
+
+    def nutrients_between(self, user_id: str, start: date, end: date) -> NutrientsBatch:
+        return self._repo(user_id).nutrients_between(user_id, start, end)
+
+    def iter_entries(
+        self, user_id: str, start: date, end: date, chunk_size: int = 1000
+    ) -> Iterator[Tuple[date, MealEntry]]:
+        """As ``SqliteDayLogRepository.iter_entries``.
+
+        Finish the iterator before the same thread touches ``max_per_thread``
+        other shards, which would close its connection.
+        """
+        return self._repo(user_id).iter_entries(user_id, start, end, chunk_size)
+
+    def assign_unowned_entries(self, user_id: str) -> int:
+        # Entries without a user stay in the database they were resharded
+        # from (see reshard), so a shard only has the ones logged there.
+        return self._repo(user_id).assign_unowned_entries(user_id)
+
+    def barcode_usage(self, user_id: str, since: date, limit: int) -> List[BarcodeUsage]:
+        return self._repo(user_id).barcode_usage(user_id, since, limit)
+
+    def quick_add_candidates(self, user_id: str, limit: int) -> List[QuickAddItem]:
+        return self._repo(user_id).quick_add_candidates(user_id, limit)
+
+    def _repo(self, user_id: str) -> SqliteDayLogRepository:
+        return SqliteDayLogRepository(self._shards.for_user(user_id))
+
+
+class ShardedUserRepository:
+    """``UserRepository`` over shards, with the username directory in ``home``.
+
+    ``create_user`` claims the username in ``user_directory`` first, so two
+    sign-ups of one name on different shards cannot both succeed.
+    """
+
+    def __init__(self, home: ConnectionSource, shards: ShardConnections):
+        self._home = home
+        self._shards = shards
+
+    def create_user(
+        self,
+        user_id: str,
+        username: str,
+        password_hash: str,
+        salt: str,
+        created_at: datetime,
+    ) -> UserProfile:
+        home = resolve_connection(self._home)
+        with home:
+            home.execute("INSERT INTO user_directory(username, user_id) VALUES(?, ?)", (username, user_id))
+        try:
+            return self._repo(user_id).create_user(user_id, username, password_hash, salt, created_at)
+        except Exception:
+            with home:
+                home.execute(
+                    "DELETE FROM user_directory WHERE username = ? AND user_id = ?", (username, user_id)
+                )
+            raise
+
+    def get_auth_by_username(self, username: str) -> UserAuthRecord | None:
+        row = resolve_connection(self._home).execute(
+            "SELECT user_id FROM user_directory WHERE username = ?",
+            (username,),
+        ).fetchone()
+        if row is None:
+            return None
+        return self._repo(row["user_id"]).get_auth_by_username(username)
+
+    def get_profile(self, user_id: str) -> UserProfile | None:
+        return self._repo(user_id).get_profile(user_id)
+
+    def count_users(self) -> int:
+        # create_user and reshard keep the directory complete, so no shard is opened.
+        row = resolve_connection(self._home).execute("SELECT COUNT(*) FROM user_directory").fetchone()
+        return int(row[0])
+
+    def _repo(self, user_id: str) -> SqliteUserRepository:
+        return SqliteUserRepository(self._shards.for_user(user_id))
@@ -1,53 +1,126 @@
 from __future__ import annotations
 
 import sqlite3
+import threading
+import weakref
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import Dict, Iterator, Optional, Tuple, Union
 
-def connect(db_path: Path) -> sqlite3.Connection:
+from havij.infrastructure.config import StorageProfile
+from havij.infrastructure.persistence.migrations import (
+    REBUILD_DAILY_TOTALS_SQL,
+    SCHEMA_VERSION,
+    _has_table,
+    create_catalog_search_index,
+    migrate,
+    schema_version,
+)
+
+def connect(
+    db_path: Path,
+    check_same_thread: bool = True,
+    profile: Optional[StorageProfile] = None,
+) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
+    if profile is not None:
+        apply_storage_profile(conn, profile)
     return conn
 
+
+def apply_storage_profile(conn: sqlite3.Connection, profile: StorageProfile) -> None:
+    # Values are validated by StorageProfile, so they are safe to inline.
+    conn.execute(f"PRAGMA busy_timeout = {int(profile.busy_timeout_ms)};")
+    conn.execute(f"PRAGMA journal_mode = {profile.journal_mode};")
+    conn.execute(f"PRAGMA synchronous = {profile.synchronous};")
+    conn.execute(f"PRAGMA mmap_size = {int(profile.mmap_size)};")
+    conn.execute(f"PRAGMA cache_size = {int(profile.cache_size)};")
+    conn.execute(f"PRAGMA temp_store = {profile.temp_store};")
+
+
+class ThreadLocalConnections:
+    """Gives every thread its own connection to one database file.
+
+    Connections are opened lazily on a thread's first ``get`` and reused for
+    the thread's lifetime. Connections left behind by finished threads are
+    closed the next time a new one is opened.
+    """
+
+    def __init__(self, db_path: Path, profile: Optional[StorageProfile] = None):
+        self._db_path = db_path
+        self._profile = profile
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._by_thread: Dict[int, Tuple["weakref.ref[threading.Thread]", sqlite3.Connection]] = {}
+
+    def get(self) -> sqlite3.Connection:
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            # Closed by _prune from another thread once this one has finished,
+            # so the usual same-thread check has to be relaxed.
+            conn = connect(self._db_path, check_same_thread=False, profile=self._profile)
+            self._local.conn = conn
+            thread = threading.current_thread()
+            with self._lock:
+                self._prune_locked()
+                self._by_thread[id(thread)] = (weakref.ref(thread), conn)
+        return conn
+
+    def open_count(self) -> int:
+        with self._lock:
+            return len(self._by_thread)
+
+    def close_all(self) -> None:
+        with self._lock:
+            for _, conn in self._by_thread.values():
+                conn.close()
+            self._by_thread.clear()
+        self._local = threading.local()
+
+    def _prune_locked(self) -> None:
+        for key, (ref, conn) in list(self._by_thread.items()):
+            thread = ref()
+            if thread is None or not thread.is_alive():
+                conn.close()
+                del self._by_thread[key]
+
+
+ConnectionSource = Union[sqlite3.Connection, ThreadLocalConnections]
+
+
+def resolve_connection(source: ConnectionSource) -> sqlite3.Connection:
+    if isinstance(source, ThreadLocalConnections):
+        return source.get()
+    return source
+
 def init_schema(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            username TEXT NOT NULL UNIQUE,
-            password_hash TEXT NOT NULL,
-            salt TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        );
-        """
-    )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS meal_entries (
-            entry_id TEXT PRIMARY KEY,
-            user_id TEXT,
-            day TEXT NOT NULL,
-            ts TEXT NOT NULL,
-            barcode TEXT NOT NULL,
-            product_name TEXT NOT NULL,
-            grams REAL NOT NULL,
-            kcal REAL NOT NULL,
-            protein_g REAL NOT NULL,
-            carbs_g REAL NOT NULL,
-            fat_g REAL NOT NULL
-        );
-        """
-    )
-    if not _has_column(conn, "meal_entries", "user_id"):
-        conn.execute("ALTER TABLE meal_entries ADD COLUMN user_id TEXT;")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_meal_entries_day ON meal_entries(day);")
-    conn.execute(
-        "CREATE INDEX IF NOT EXISTS idx_meal_entries_day_user ON meal_entries(day, user_id);"
-    )
-    conn.commit()
-
-
-def _has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
-    rows = conn.execute(f"PRAGMA table_info({table});").fetchall()
-    return any(r["name"] == column for r in rows)
+    """Create or upgrade the schema; a current database costs one pragma read."""
+    if schema_version(conn) == SCHEMA_VERSION:
+        return
+    migrate(conn)
+
+
+def suspend_catalog_search_index(conn: sqlite3.Connection) -> None:
+    """Stop maintaining the catalog search index row by row (for bulk loads).
+
+    Call ``rebuild_catalog_search_index`` afterwards to resynchronise it.
+    """
+    with conn:
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS catalog_products_fts_{suffix};")
+
+
+def rebuild_catalog_search_index(conn: sqlite3.Connection) -> None:
+    with conn:
+        create_catalog_search_index(conn)
+        if _has_table(conn, "catalog_products_fts"):
+            conn.execute("INSERT INTO catalog_products_fts(catalog_products_fts) VALUES('rebuild');")
+
+
+def rebuild_daily_totals(conn: sqlite3.Connection) -> int:
+    """Recompute the daily_totals rollup from meal_entries; returns the number of rows."""
+    with conn:
+        conn.execute("DELETE FROM daily_totals;")
+        cur = conn.execute(REBUILD_DAILY_TOTALS_SQL)
+    return cur.rowcount
@@ -2,14 +2,22 @@ from __future__ import annotations
 
 import sqlite3
 from datetime import datetime
+from typing import Optional
 
 from havij.application.ports import UserAuthRecord
 from havij.domain.model.user import UserProfile
+from havij.infrastructure.persistence.sqlite_db import ConnectionSource, resolve_connection
+from havij.infrastructure.persistence.write_queue import GroupCommitWriter, run_write
 
 
 class SqliteUserRepository:
-    def __init__(self, conn: sqlite3.Connection):
-        self._conn = conn
+    def __init__(self, conn: ConnectionSource, writer: Optional[GroupCommitWriter] = None):
+        self._source = conn
+        self._writer = writer
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return resolve_connection(self._source)
 
     def create_user(
         self,
@@ -19,14 +27,16 @@ class SqliteUserRepository:
         salt: str,
         created_at: datetime,
     ) -> UserProfile:
-        self._conn.execute(
-            """
-            INSERT INTO users(user_id, username, password_hash, salt, created_at)
-            VALUES(?, ?, ?, ?, ?)
-            """,
-            (user_id, username, password_hash, salt, created_at.isoformat()),
-        )
-        self._conn.commit()
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                """
+                INSERT INTO users(user_id, username, password_hash, salt, created_at)
+                VALUES(?, ?, ?, ?, ?)
+                """,
+                (user_id, username, password_hash, salt, created_at.isoformat()),
+            )
+
+        run_write(self._source, self._writer, write)
         return UserProfile(user_id=user_id, username=username, created_at=created_at)
 
     def get_auth_by_username(self, username: str) -> UserAuthRecord | None:
@@ -0,0 +1,199 @@
+"""Group commit: one writer thread turns many small writes into few transactions.
+
+Every ``commit`` costs a lock round trip and, depending on the storage
+profile, an fsync. ``GroupCommitWriter`` owns the only writing connection of
+the process: callers hand it an operation and wait on a future, and the writer
+thread runs the operations that queued up while it was committing (at most
+``max_batch``, optionally waiting ``window_s`` for more) in one
+``BEGIN IMMEDIATE`` transaction, each under its own savepoint. It completes
+the futures once ``COMMIT`` has returned, so a caller never sees a write
+acknowledged before it is as durable as with a commit of its own, and an
+operation that raises is rolled back alone.
+"""
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from havij.infrastructure.config import StorageProfile
+from havij.infrastructure.persistence.sqlite_db import ConnectionSource, connect, resolve_connection
+
+T = TypeVar("T")
+
+WriteOp = Callable[[sqlite3.Connection], T]
+
+_Job = Tuple[Callable[[sqlite3.Connection], object], "Future[object]"]
+
+
+class WriterClosedError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class WriterStats:
+    # Transactions committed, and operations that ran in them.
+    batches: int
+    operations: int
+    # Operations that raised (rolled back alone) or were lost with a failed
+    # transaction.
+    failed: int
+    largest_batch: int
+
+    @property
+    def mean_batch(self) -> float:
+        return self.operations / self.batches if self.batches else 0.0
+
+
+class GroupCommitWriter:
+    """Runs write operations on a single thread, many per transaction.
+
+    An operation is a callable taking the writer's connection. It must not
+    commit or roll back itself; the writer does both. Operations submitted
+    from inside another operation run inline, in the same transaction.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        profile: Optional[StorageProfile] = None,
+        max_batch: int = 64,
+        window_s: float = 0.0,
+    ):
+        if max_batch <= 0:
+            raise ValueError("max_batch must be > 0")
+        if window_s < 0:
+            raise ValueError("window_s must be >= 0")
+        # Opened here so that a bad path fails the caller, then handed over to
+        # the writer thread for good.
+        self._conn = connect(db_path, check_same_thread=False, profile=profile)
+        self._conn.isolation_level = None
+        self._max_batch = max_batch
+        self._window_s = window_s
+        self._queue: "queue.SimpleQueue[Optional[_Job]]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batches = 0
+        self._operations = 0
+        self._failed = 0
+        self._largest_batch = 0
+        self._thread = threading.Thread(target=self._run, name="sqlite-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, op: WriteOp[T]) -> "Future[T]":
+        """Queue ``op``; the future resolves after the transaction holding it commits."""
+        future: Future[T] = Future()
+        if threading.current_thread() is self._thread:
+            try:
+                future.set_result(op(self._conn))
+            except BaseException as exc:
+                future.set_exception(exc)
+            return future
+        with self._lock:
+            if self._closed:
+                raise WriterClosedError("the writer is closed")
+            self._queue.put((op, future))  # type: ignore[arg-type]
+        return future
+
+    def run(self, op: WriteOp[T]) -> T:
+        """Submit ``op`` and wait for its commit."""
+        return self.submit(op).result()
+
+    def stats(self) -> WriterStats:
+        with self._lock:
+            return WriterStats(
+                batches=self._batches,
+                operations=self._operations,
+                failed=self._failed,
+                largest_batch=self._largest_batch,
+            )
+
+    def close(self) -> None:
+        """Commit what is already queued, then stop the thread and close the connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        self._conn.close()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self._window_s
+            while len(batch) < self._max_batch:
+                try:
+                    job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[_Job]) -> None:
+        done: List[Tuple["Future[object]", object]] = []
+        failed = 0
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for op, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._conn.execute("SAVEPOINT write_op")
+                try:
+                    result = op(self._conn)
+                # BaseException too: anything escaping would end the writer
+                # thread and leave every later submit waiting forever.
+                except BaseException as exc:
+                    failed += 1
+                    future.set_exception(exc)
+                    if not self._conn.in_transaction:
+                        # SQLite rolled the whole transaction back (I/O error,
+                        # disk full...), taking the earlier operations with it.
+                        raise
+                    self._conn.execute("ROLLBACK TO write_op")
+                    self._conn.execute("RELEASE write_op")
+                    continue
+                self._conn.execute("RELEASE write_op")
+                done.append((future, result))
+            self._conn.execute("COMMIT")
+        except BaseException as exc:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            # Includes the operations that had succeeded: their writes are gone.
+            for _, future in batch:
+                if not future.done():
+                    failed += 1
+                    future.set_exception(exc)
+            self._count(0, len(batch), failed)
+            return
+        for future, result in done:
+            future.set_result(result)
+        self._count(1, len(batch), failed)
+
+    def _count(self, batches: int, operations: int, failed: int) -> None:
+        with self._lock:
+            self._batches += batches
+            self._operations += operations
+            self._failed += failed
+            self._largest_batch = max(self._largest_batch, operations)
+
+
+def run_write(source: ConnectionSource, writer: Optional[GroupCommitWriter], op: WriteOp[T]) -> T:
+    """Run ``op`` through ``writer``, or in a transaction of its own on ``source`` without one."""
+    if writer is not None:
+        return writer.run(op)
+    conn = resolve_connection(source)
+    with conn:
+        return op(conn)
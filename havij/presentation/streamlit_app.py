@@ -12,26 +12,58 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from havij.infrastructure.config import load_config
-from havij.infrastructure.persistence.sqlite_db import connect, init_schema
-from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
-from havij.infrastructure.persistence.user_repository import SqliteUserRepository
-from havij.infrastructure.api.openfoodfacts_client import OpenFoodFactsClient, OpenFoodFactsError
-from havij.infrastructure.api.catalog_adapter import OpenFoodFactsCatalog
+from havij.infrastructure.api.openfoodfacts_client import OpenFoodFactsError
+from havij.infrastructure.container import get_container
 from havij.application.services.meal_service import MealService
 from havij.application.services.product_service import ProductService
-from havij.application.services.user_service import UserService
+from havij.application.services.user_service import LoginThrottledError, UserService
 from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.product import Product
+from havij.domain.model.user import UserProfile
 
 def _services() -> tuple[MealService, ProductService, UserService]:
-    cfg = load_config()
-    conn = connect(cfg.db_path)
-    init_schema(conn)
-    repo = SqliteDayLogRepository(conn)
-    user_repo = SqliteUserRepository(conn)
-    client = OpenFoodFactsClient()
-    catalog = OpenFoodFactsCatalog(client)
-    return MealService(repo=repo), ProductService(catalog=catalog), UserService(repo=user_repo)
+    # Built once per process: reruns reuse the schema setup, connections and HTTP session.
+    container = get_container()
+    return container.meal_service, container.product_service, container.user_service
+
+def _use_product(product: Product) -> None:
+    st.session_state["product_name"] = product.name
+    st.session_state["kcal_per_100g"] = float(product.nutrients_per_100g.kcal)
+    st.session_state["protein_per_100g"] = float(product.nutrients_per_100g.protein_g)
+    st.session_state["carbs_per_100g"] = float(product.nutrients_per_100g.carbs_g)
+    st.session_state["fat_per_100g"] = float(product.nutrients_per_100g.fat_g)
+    st.session_state["lookup_barcode"] = product.barcode
+
+def _start_session(user_svc: UserService, profile: UserProfile) -> None:
+    token = user_svc.issue_session_token(profile.user_id)
+    st.session_state["user_id"] = profile.user_id
+    st.session_state["username"] = profile.username
+    # Server-side only: a token in the URL would leak through history, logs and shared links.
+    st.session_state["session_token"] = token
+
+def _end_session() -> None:
+    st.session_state["user_id"] = None
+    st.session_state["username"] = ""
+    st.session_state["session_token"] = None
+
+def _restore_session(user_svc: UserService) -> None:
+    # Earlier versions put the token in the URL; drop it from links still around.
+    if "session" in st.query_params:
+        del st.query_params["session"]
+    token = st.session_state.get("session_token")
+    if not token:
+        return
+    user_id = user_svc.verify_session_token(token)
+    if user_id is None:
+        _end_session()
+    elif st.session_state["user_id"] != user_id:
+        profile = user_svc.get_profile(user_id)
+        if profile is None:
+            _end_session()
+        else:
+            st.session_state["user_id"] = profile.user_id
+            st.session_state["username"] = profile.username
+            st.session_state["session_token"] = token
 
 def main() -> None:
     st.set_page_config(page_title="Nutrition Scanner + Meal Logger", layout="wide")
@@ -41,6 +73,8 @@ def main() -> None:
 
     st.session_state.setdefault("user_id", None)
     st.session_state.setdefault("username", "")
+    st.session_state.setdefault("session_token", None)
+    _restore_session(user_svc)
 
     with st.sidebar:
         st.subheader("Account")
@@ -50,14 +84,17 @@ def main() -> None:
                 login_username = st.text_input("Username", key="login_username")
                 login_password = st.text_input("Password", type="password", key="login_password")
                 if st.button("Login"):
-                    profile = user_svc.authenticate(login_username, login_password)
-                    if profile:
-                        st.session_state["user_id"] = profile.user_id
-                        st.session_state["username"] = profile.username
-                        st.success("Logged in.")
-                        st.rerun()
+                    try:
+                        profile = user_svc.authenticate(login_username, login_password)
+                    except LoginThrottledError as exc:
+                        st.error(str(exc))
                     else:
-                        st.error("Invalid username or password.")
+                        if profile:
+                            _start_session(user_svc, profile)
+                            st.success("Logged in.")
+                            st.rerun()
+                        else:
+                            st.error("Invalid username or password.")
             else:
                 signup_username = st.text_input("Username", key="signup_username")
                 signup_password = st.text_input("Password", type="password", key="signup_password")
@@ -69,8 +106,7 @@ def main() -> None:
                         try:
                             had_users = user_svc.count_users() > 0
                             profile = user_svc.signup(signup_username, signup_password)
-                            st.session_state["user_id"] = profile.user_id
-                            st.session_state["username"] = profile.username
+                            _start_session(user_svc, profile)
                             if not had_users:
                                 meal_svc.assign_unowned_entries(profile.user_id)
                             st.success("Account created.")
@@ -80,8 +116,7 @@ def main() -> None:
         else:
             st.write(f"Signed in as **{st.session_state['username']}**")
             if st.button("Log out"):
-                st.session_state["user_id"] = None
-                st.session_state["username"] = ""
+                _end_session()
                 st.rerun()
 
     tabs = st.tabs(["Log Meal", "Today", "Last 7 Days", "Profile"])
@@ -99,16 +134,23 @@ def main() -> None:
             st.session_state.setdefault("fat_per_100g", 0.0)
             st.session_state.setdefault("lookup_barcode", "")
 
+            if product_svc.can_search:
+                query = st.text_input("Search products by name or brand", key="product_query")
+                matches = product_svc.search(query, limit=10) if len(query.strip()) >= 2 else []
+                if matches:
+                    labels = {f"{p.name} ({p.barcode})": p for p in matches}
+                    choice = st.selectbox("Matches", options=list(labels))
+                    if st.button("Use product"):
+                        _use_product(labels[choice])
+                        st.success(f"Selected: {labels[choice].name}")
+                elif query.strip():
+                    st.caption("No matching products in the local catalog.")
+
             barcode = st.text_input("Barcode (digits only)", value="", key="barcode_input")
             if st.button("Lookup barcode"):
                 try:
                     product = product_svc.lookup_product(barcode.strip())
-                    st.session_state["product_name"] = product.name
-                    st.session_state["kcal_per_100g"] = float(product.nutrients_per_100g.kcal)
-                    st.session_state["protein_per_100g"] = float(product.nutrients_per_100g.protein_g)
-                    st.session_state["carbs_per_100g"] = float(product.nutrients_per_100g.carbs_g)
-                    st.session_state["fat_per_100g"] = float(product.nutrients_per_100g.fat_g)
-                    st.session_state["lookup_barcode"] = product.barcode
+                    _use_product(product)
                     st.success(f"Found: {product.name}")
                 except OpenFoodFactsError as exc:
                     st.error(str(exc))
@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+
+from havij.application.caching import SingleFlightLruCache
+from tests.support import FakeClock
+
+
+class TestSingleFlightLruCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self) -> None:
+        cache: SingleFlightLruCache[str, int] = SingleFlightLruCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats().evictions, 1)
+
+    def test_entries_expire_after_ttl(self) -> None:
+        clock = FakeClock()
+        cache: SingleFlightLruCache[str, int] = SingleFlightLruCache(ttl_s=10, clock=clock)
+        cache.put("a", 1)
+
+        clock.now = 9.9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 10
+        self.assertIsNone(cache.get("a"))
+
+    def test_concurrent_loads_for_same_key_are_coalesced(self) -> None:
+        cache: SingleFlightLruCache[str, int] = SingleFlightLruCache()
+        release = threading.Event()
+        calls = []
+
+        def loader() -> int:
+            calls.append(1)
+            release.wait(5)
+            return 42
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        while cache.stats().coalesced < 7:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(cache.get_or_load("k", loader), 42)
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_load_is_shared_but_not_cached(self) -> None:
+        cache: SingleFlightLruCache[str, int] = SingleFlightLruCache()
+
+        def failing() -> int:
+            raise RuntimeError("upstream down")
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_load("k", failing)
+        self.assertEqual(cache.get_or_load("k", lambda: 7), 7)
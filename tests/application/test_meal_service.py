@@ -2,19 +2,17 @@ import unittest
 from datetime import date, datetime
 from unittest.mock import Mock, patch
 
-from havij.application.services.meal_service import MealService
+from havij.application.services.meal_service import MealEntryDraft, MealService
 from havij.domain.model.meal import DayLog, MealEntry
 from havij.domain.model.nutrients import Nutrients
 
 
 class TestMealService(unittest.TestCase):
-    def test_add_entry_adds_and_saves(self) -> None:
+    def test_add_entry_appends_single_entry(self) -> None:
         user_id = "user-1"
         day = date(2025, 1, 1)
         when = datetime(2025, 1, 1, 12, 0, 0)
-        log = DayLog(day=day, entries=[])
         repo = Mock()
-        repo.load_day.return_value = log
 
         service = MealService(repo=repo)
 
@@ -35,10 +33,9 @@ class TestMealService(unittest.TestCase):
         self.assertEqual(entry.product_name, "Test Snack")
         self.assertEqual(entry.grams, 50)
         self.assertEqual(entry.nutrients, Nutrients(50, 1, 2, 0.5))
-        self.assertEqual(len(log.entries), 1)
-        self.assertEqual(log.entries[0], entry)
-        repo.load_day.assert_called_once_with(day, user_id)
-        repo.save_day.assert_called_once_with(log, user_id)
+        repo.append_entry.assert_called_once_with(day, entry, user_id)
+        repo.load_day.assert_not_called()
+        repo.save_day.assert_not_called()
 
     def test_add_entry_invalid_grams_raises(self) -> None:
         repo = Mock()
@@ -53,8 +50,7 @@ class TestMealService(unittest.TestCase):
                 nutrients_per_100g=Nutrients(100, 2, 4, 1),
             )
 
-        repo.load_day.assert_not_called()
-        repo.save_day.assert_not_called()
+        repo.append_entry.assert_not_called()
 
     def test_add_entry_grams_above_limit_raises(self) -> None:
         repo = Mock()
@@ -69,8 +65,7 @@ class TestMealService(unittest.TestCase):
                 nutrients_per_100g=Nutrients(200, 40, 30, 30),
             )
 
-        repo.load_day.assert_not_called()
-        repo.save_day.assert_not_called()
+        repo.append_entry.assert_not_called()
 
     def test_add_entry_product_name_required(self) -> None:
         repo = Mock()
@@ -85,8 +80,7 @@ class TestMealService(unittest.TestCase):
                 nutrients_per_100g=Nutrients(200, 40, 30, 30),
             )
 
-        repo.load_day.assert_not_called()
-        repo.save_day.assert_not_called()
+        repo.append_entry.assert_not_called()
 
     def test_add_entry_macros_must_be_valid_per_100g(self) -> None:
         repo = Mock()
@@ -101,10 +95,66 @@ class TestMealService(unittest.TestCase):
                 nutrients_per_100g=Nutrients(200, 40, 40, 40),
             )
 
-        repo.load_day.assert_not_called()
-        repo.save_day.assert_not_called()
+        repo.append_entry.assert_not_called()
+
+    def test_add_entries_groups_valid_items_by_day_in_one_call(self) -> None:
+        d1, d2 = date(2025, 1, 1), date(2025, 1, 2)
+        per_100g = Nutrients(100, 2, 4, 1)
+        repo = Mock()
+        service = MealService(repo=repo)
+
+        result = service.add_entries(
+            "user-1",
+            [
+                MealEntryDraft(d1, "Apple", 100, per_100g, when=datetime(2025, 1, 1, 8)),
+                MealEntryDraft(d1, "Bad", 0, per_100g),
+                MealEntryDraft(d2, "Pear", 50, per_100g, when=datetime(2025, 1, 2, 9)),
+                MealEntryDraft(d2, " ", 50, per_100g),
+            ],
+        )
+
+        self.assertEqual([e.product_name for e in result.added], ["Apple", "Pear"])
+        self.assertEqual([e.index for e in result.errors], [1, 3])
+        self.assertEqual(result.errors[0].message, "grams must be > 0")
+        repo.append_entries.assert_called_once_with(
+            {d1: [result.added[0]], d2: [result.added[1]]}, "user-1"
+        )
+        repo.append_entry.assert_not_called()
+
+    def test_add_entries_reports_non_finite_numbers_per_item(self) -> None:
+        d = date(2025, 1, 1)
+        repo = Mock()
+        service = MealService(repo=repo)
+
+        result = service.add_entries(
+            "user-1",
+            [
+                MealEntryDraft(d, "Apple", 100, Nutrients(52, 0.3, 14, 0.2)),
+                MealEntryDraft(d, "Milk", float("nan"), Nutrients(64, 3.3, 4.8, 3.6)),
+                MealEntryDraft(d, "Bread", 80, Nutrients(float("inf"), 9, 49, 3.2)),
+            ],
+        )
+
+        self.assertEqual([e.product_name for e in result.added], ["Apple"])
+        self.assertEqual(
+            [(e.index, e.message) for e in result.errors],
+            [(1, "grams must be a finite number"), (2, "kcal must be a finite number")],
+        )
+        repo.append_entries.assert_called_once_with({d: [result.added[0]]}, "user-1")
+
+    def test_add_entries_skips_repo_when_nothing_is_valid(self) -> None:
+        repo = Mock()
+        service = MealService(repo=repo)
+
+        result = service.add_entries(
+            "user-1", [MealEntryDraft(date(2025, 1, 1), "Bad", 5000, Nutrients.zero())]
+        )
+
+        self.assertEqual(result.added, [])
+        self.assertEqual(len(result.errors), 1)
+        repo.append_entries.assert_not_called()
 
-    def test_remove_entry_saves_when_removed(self) -> None:
+    def test_remove_entry_deletes_single_entry(self) -> None:
         user_id = "user-1"
         day = date(2025, 1, 1)
         entry = MealEntry(
@@ -115,28 +165,27 @@ class TestMealService(unittest.TestCase):
             grams=100,
             nutrients=Nutrients(200, 20, 1, 10),
         )
-        log = DayLog(day=day, entries=[entry])
         repo = Mock()
-        repo.load_day.return_value = log
+        repo.delete_entry.return_value = entry
         service = MealService(repo=repo)
 
         removed = service.remove_entry(user_id=user_id, day=day, entry_id="e1")
 
         self.assertTrue(removed)
-        repo.save_day.assert_called_once_with(DayLog(day=day, entries=[]), user_id)
+        repo.delete_entry.assert_called_once_with(day, "e1", user_id)
+        repo.load_day.assert_not_called()
+        repo.save_day.assert_not_called()
 
-    def test_remove_entry_no_save_when_missing(self) -> None:
+    def test_remove_entry_returns_false_when_missing(self) -> None:
         user_id = "user-1"
         day = date(2025, 1, 1)
-        log = DayLog(day=day, entries=[])
         repo = Mock()
-        repo.load_day.return_value = log
+        repo.delete_entry.return_value = None
         service = MealService(repo=repo)
 
         removed = service.remove_entry(user_id=user_id, day=day, entry_id="missing")
 
         self.assertFalse(removed)
-        repo.save_day.assert_not_called()
 
     def test_get_day_log_delegates_to_repo(self) -> None:
         user_id = "user-1"
@@ -151,90 +200,72 @@ class TestMealService(unittest.TestCase):
         self.assertEqual(result, log)
         repo.load_day.assert_called_once_with(day, user_id)
 
-    def test_get_day_totals_returns_total_nutrients(self) -> None:
+    def test_get_day_totals_reads_rollup(self) -> None:
         user_id = "user-1"
         day = date(2025, 1, 1)
-        log = DayLog(
-            day=day,
-            entries=[
-                MealEntry(
-                    entry_id="e1",
-                    timestamp=datetime(2025, 1, 1, 8, 0, 0),
-                    barcode="111",
-                    product_name="A",
-                    grams=100,
-                    nutrients=Nutrients(100, 1, 2, 3),
-                ),
-                MealEntry(
-                    entry_id="e2",
-                    timestamp=datetime(2025, 1, 1, 12, 0, 0),
-                    barcode="222",
-                    product_name="B",
-                    grams=50,
-                    nutrients=Nutrients(50, 0.5, 1, 1.5),
-                ),
-            ],
-        )
         repo = Mock()
-        repo.load_day.return_value = log
+        repo.totals_between.return_value = [(day, Nutrients(150, 1.5, 3, 4.5))]
         service = MealService(repo=repo)
 
         totals = service.get_day_totals(user_id, day)
 
         self.assertEqual(totals, Nutrients(150, 1.5, 3, 4.5))
+        repo.totals_between.assert_called_once_with(user_id, day, day)
+        repo.load_day.assert_not_called()
 
-    def test_get_last_days_totals_orders_days(self) -> None:
+    def test_get_last_days_totals_queries_range_once(self) -> None:
         user_id = "user-1"
         end_day = date(2025, 1, 3)
-        logs = {
-            date(2025, 1, 1): DayLog(
-                day=date(2025, 1, 1),
-                entries=[
-                    MealEntry(
-                        entry_id="e1",
-                        timestamp=datetime(2025, 1, 1, 8, 0, 0),
-                        barcode="111",
-                        product_name="A",
-                        grams=100,
-                        nutrients=Nutrients(100, 1, 2, 3),
-                    )
-                ],
-            ),
-            date(2025, 1, 2): DayLog(
-                day=date(2025, 1, 2),
-                entries=[
-                    MealEntry(
-                        entry_id="e2",
-                        timestamp=datetime(2025, 1, 2, 8, 0, 0),
-                        barcode="222",
-                        product_name="B",
-                        grams=100,
-                        nutrients=Nutrients(200, 2, 4, 6),
-                    )
-                ],
-            ),
-            date(2025, 1, 3): DayLog(
-                day=date(2025, 1, 3),
-                entries=[
-                    MealEntry(
-                        entry_id="e3",
-                        timestamp=datetime(2025, 1, 3, 8, 0, 0),
-                        barcode="333",
-                        product_name="C",
-                        grams=100,
-                        nutrients=Nutrients(300, 3, 6, 9),
-                    )
-                ],
-            ),
-        }
-        repo = Mock()
-        repo.load_day.side_effect = lambda d, _: logs[d]
-        service = MealService(repo=repo)
-
-        totals = service.get_last_days_totals(user_id, end_day=end_day, days=3)
-
-        self.assertEqual([d for d, _ in totals], [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)])
-        self.assertEqual([n.kcal for _, n in totals], [100, 200, 300])
+        totals = [
+            (date(2025, 1, 1), Nutrients(100, 1, 2, 3)),
+            (date(2025, 1, 2), Nutrients.zero()),
+            (date(2025, 1, 3), Nutrients(300, 3, 6, 9)),
+        ]
+        repo = Mock()
+        repo.totals_between.return_value = totals
+        service = MealService(repo=repo)
+
+        result = service.get_last_days_totals(user_id, end_day=end_day, days=3)
+
+        self.assertEqual(result, totals)
+        repo.totals_between.assert_called_once_with(user_id, date(2025, 1, 1), end_day)
+        repo.load_day.assert_not_called()
+
+    def test_get_rolling_averages_reads_rollup_with_lead_in(self) -> None:
+        repo = Mock()
+        repo.totals_between.return_value = [
+            (date(2025, 1, 1), Nutrients(100, 0, 0, 0)),
+            (date(2025, 1, 2), Nutrients(200, 0, 0, 0)),
+            (date(2025, 1, 3), Nutrients(0, 0, 0, 0)),
+            (date(2025, 1, 4), Nutrients(400, 0, 0, 0)),
+        ]
+        service = MealService(repo=repo)
+
+        result = service.get_rolling_averages("user-1", end_day=date(2025, 1, 4), days=2, window=3)
+
+        repo.totals_between.assert_called_once_with("user-1", date(2025, 1, 1), date(2025, 1, 4))
+        self.assertEqual([d for d, _ in result], [date(2025, 1, 3), date(2025, 1, 4)])
+        self.assertEqual([n.kcal for _, n in result], [100, 200])
+
+    def test_iter_entries_delegates_to_repo(self) -> None:
+        start, end = date(2025, 1, 1), date(2025, 1, 31)
+        repo = Mock()
+        repo.iter_entries.return_value = iter([])
+        service = MealService(repo=repo)
+
+        self.assertEqual(list(service.iter_entries("user-1", start, end)), [])
+        repo.iter_entries.assert_called_once_with("user-1", start, end)
+        repo.load_day.assert_not_called()
+
+    def test_quick_add_candidates_reads_the_index(self) -> None:
+        repo = Mock()
+        repo.quick_add_candidates.return_value = []
+        service = MealService(repo=repo)
+
+        self.assertEqual(service.quick_add_candidates("user-1", 5), [])
+        repo.quick_add_candidates.assert_called_once_with("user-1", 5)
+        with self.assertRaises(ValueError):
+            service.quick_add_candidates("user-1", 0)
 
     def test_get_last_days_totals_days_must_be_positive(self) -> None:
         repo = Mock()
@@ -0,0 +1,71 @@
+import unittest
+from datetime import date
+
+from havij.application.metrics import (
+    CacheCounts,
+    InstrumentedProductCatalog,
+    MetricsRegistry,
+    instrument_day_log_repository,
+    instrument_product_catalog,
+)
+from havij.domain.model.meal import DayLog
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.product import Product
+
+
+class _Catalog:
+    def get_by_barcode(self, barcode: str) -> Product:
+        if barcode == "0":
+            raise LookupError("missing")
+        return Product(barcode=barcode, name="Oats", nutrients_per_100g=Nutrients(380, 13, 60, 7))
+
+
+class _Repo:
+    def load_day(self, day: date, user_id: str) -> DayLog:
+        return DayLog(day=day, entries=[])
+
+
+class TestMetrics(unittest.TestCase):
+    def test_disabled_metrics_return_the_implementation_itself(self) -> None:
+        catalog = _Catalog()
+        self.assertIs(instrument_product_catalog(catalog, None), catalog)
+
+    def test_records_calls_errors_and_latency(self) -> None:
+        registry = MetricsRegistry()
+        catalog = instrument_product_catalog(_Catalog(), registry)
+
+        self.assertIsInstance(catalog, InstrumentedProductCatalog)
+        self.assertEqual(catalog.get_by_barcode("1").name, "Oats")
+        with self.assertRaises(LookupError):
+            catalog.get_by_barcode("0")
+
+        snapshot = registry.snapshot()[("product_catalog", "get_by_barcode")]
+        self.assertEqual(snapshot.calls, 2)
+        self.assertEqual(snapshot.errors, {"LookupError": 1})
+        self.assertEqual(sum(snapshot.buckets), 2)
+        self.assertGreater(snapshot.total_s, 0)
+
+    def test_renders_prometheus_text(self) -> None:
+        registry = MetricsRegistry()
+        repo = instrument_day_log_repository(_Repo(), registry)  # type: ignore[arg-type]
+        repo.load_day(date(2025, 1, 1), "u1")
+        registry.register_cache("product_lru", lambda: CacheCounts(hits=3, misses=1))
+
+        text = registry.render_prometheus()
+
+        self.assertIn('havij_port_calls_total{port="day_log_repository",method="load_day"} 1', text)
+        self.assertIn('havij_port_latency_seconds_bucket{port="day_log_repository",method="load_day",le="+Inf"} 1', text)
+        self.assertIn('havij_port_latency_seconds_count{port="day_log_repository",method="load_day"} 1', text)
+        self.assertIn('havij_cache_hits_total{cache="product_lru"} 3', text)
+        self.assertIn('havij_cache_hit_ratio{cache="product_lru"} 0.75', text)
+        self.assertNotIn("havij_port_errors_total{", text)
+
+    def test_label_values_are_escaped(self) -> None:
+        registry = MetricsRegistry()
+        registry.observe('odd"port', "m", 0.001)
+
+        self.assertIn('port="odd\\"port"', registry.render_prometheus())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from datetime import date, timedelta
+from typing import Any, List
+
+from havij.application.caching import SingleFlightLruCache
+from havij.application.ports import BarcodeUsage
+from havij.application.prefetch import ProductPrefetcher, pick_candidates
+from havij.application.services.product_service import ProductService
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.product import Product
+from tests.support import FakeClock
+
+_TODAY = date(2025, 3, 1)
+
+
+class _Repo:
+    def __init__(self, usage: List[BarcodeUsage]) -> None:
+        self.usage = usage
+        self.calls: List[tuple] = []
+
+    def barcode_usage(self, user_id: str, since: date, limit: int) -> List[BarcodeUsage]:
+        self.calls.append((user_id, since, limit))
+        return self.usage[:limit]
+
+
+class _Catalog:
+    def __init__(self, clock: FakeClock, latency_s: float = 0.0) -> None:
+        self.clock = clock
+        self.latency_s = latency_s
+        self.fetched: List[str] = []
+
+    def get_by_barcode(self, barcode: str) -> Product:
+        self.clock.now += self.latency_s
+        self.fetched.append(barcode)
+        if barcode.startswith("404"):
+            raise LookupError(barcode)
+        return Product(barcode=barcode, name=f"P{barcode}", nutrients_per_100g=Nutrients(100, 1, 2, 3))
+
+
+def _usage(barcode: str, entries: int, days_ago: int) -> BarcodeUsage:
+    return BarcodeUsage(barcode=barcode, entries=entries, last_day=_TODAY - timedelta(days=days_ago))
+
+
+class TestProductPrefetcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.catalog = _Catalog(self.clock)
+        self.cache: SingleFlightLruCache[str, Product] = SingleFlightLruCache(clock=self.clock)
+        # Most recent first, as the repository returns them.
+        self.repo = _Repo([
+            _usage("111", 1, 0),
+            _usage("222", 2, 1),
+            _usage("abc", 9, 2),
+            _usage("333", 30, 5),
+            _usage("404", 1, 6),
+            _usage("444", 12, 9),
+        ])
+
+    def _prefetcher(self, **kwargs: Any) -> ProductPrefetcher:
+        prefetcher = ProductPrefetcher(
+            self.repo,  # type: ignore[arg-type]
+            self.catalog,
+            self.cache,
+            clock=self.clock,
+            today=lambda: _TODAY,
+            **kwargs,
+        )
+        self.addCleanup(prefetcher.close)
+        return prefetcher
+
+    def test_candidates_alternate_frequent_and_recent(self) -> None:
+        self.assertEqual(pick_candidates(self.repo.usage, 10), ["333", "111", "444", "222", "404"])
+        self.assertEqual(pick_candidates(self.repo.usage, 2), ["333", "111"])
+
+    def test_warms_the_cache_and_counts_hits(self) -> None:
+        self.cache.put("444", Product("444", "cached", Nutrients(1, 1, 1, 1)))
+        prefetcher = self._prefetcher(max_products=3, lookback_days=30)
+
+        self.assertEqual(prefetcher.prefetch("u1"), 3)
+
+        self.assertEqual(self.repo.calls, [("u1", _TODAY - timedelta(days=29), 30)])
+        self.assertEqual(self.catalog.fetched, ["333", "111", "222"])
+        service = ProductService(self.catalog, cache=self.cache, on_lookup=prefetcher.note_lookup)
+        service.lookup_product("333")
+        service.lookup_many(["111", "333", "555"])
+        self.assertEqual(self.catalog.fetched, ["333", "111", "222", "555"])
+        stats = prefetcher.stats()
+        self.assertEqual((stats.prefetched, stats.used, stats.failed), (3, 2, 0))
+        self.assertAlmostEqual(stats.hit_ratio, 2 / 3)
+
+    def test_stops_at_the_time_budget(self) -> None:
+        self.catalog.latency_s = 0.4
+        prefetcher = self._prefetcher(budget_s=1.0)
+
+        self.assertEqual(prefetcher.prefetch("u1"), 3)
+
+        stats = prefetcher.stats()
+        self.assertEqual((stats.prefetched, stats.over_budget), (3, 2))
+
+    def test_failed_lookups_and_late_hits_are_not_counted(self) -> None:
+        prefetcher = self._prefetcher(track_ttl_s=60)
+        prefetcher.prefetch("u1")
+
+        self.clock.now += 60
+        prefetcher.note_lookup("333")
+
+        stats = prefetcher.stats()
+        self.assertEqual((stats.prefetched, stats.failed, stats.used), (4, 1, 0))
+
+    def test_schedule_runs_in_the_background(self) -> None:
+        prefetcher = self._prefetcher()
+
+        future = prefetcher.schedule("u1")
+
+        assert future is not None
+        self.assertEqual(future.result(timeout=5), 4)
+        self.assertTrue(self.cache.contains("333"))
+        self.assertEqual(prefetcher.stats().runs, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
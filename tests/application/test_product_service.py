@@ -1,7 +1,10 @@
+import asyncio
+import threading
 import unittest
 from unittest.mock import Mock
 
-from havij.application.services.product_service import ProductService
+from havij.application.caching import SingleFlightLruCache
+from havij.application.services.product_service import AsyncProductService, ProductService
 from havij.domain.model.nutrients import Nutrients
 from havij.domain.model.product import Product
 
@@ -31,3 +34,140 @@ class TestProductService(unittest.TestCase):
             service.lookup_product("abc")
 
         catalog.get_by_barcode.assert_not_called()
+
+    def test_lookup_product_uses_cache_keyed_on_normalized_barcode(self) -> None:
+        product = Product(
+            barcode="123456",
+            name="Test Bar",
+            nutrients_per_100g=Nutrients(200, 10, 20, 5),
+        )
+        catalog = Mock()
+        catalog.get_by_barcode.return_value = product
+        service = ProductService(catalog=catalog, cache=SingleFlightLruCache())
+
+        self.assertEqual(service.lookup_product("123456"), product)
+        self.assertEqual(service.lookup_product(" 123456 "), product)
+
+        catalog.get_by_barcode.assert_called_once_with("123456")
+
+    def test_lookup_many_dedupes_and_keeps_input_order(self) -> None:
+        products = {
+            "111": Product("111", "A", Nutrients(100, 1, 2, 3)),
+            "222": Product("222", "B", Nutrients(200, 2, 4, 6)),
+        }
+        catalog = Mock()
+        catalog.get_by_barcode.side_effect = lambda b: products[b]
+        service = ProductService(catalog=catalog)
+
+        results = service.lookup_many(["222", "111", " 222", "abc", "333"])
+
+        self.assertEqual([r.barcode for r in results], ["222", "111", "222", "abc", "333"])
+        self.assertEqual([r.product for r in results[:3]], [products["222"], products["111"], products["222"]])
+        self.assertIsInstance(results[3].error, ValueError)
+        self.assertIsInstance(results[4].error, KeyError)
+        self.assertFalse(results[4].ok)
+        self.assertEqual(
+            sorted(c.args[0] for c in catalog.get_by_barcode.call_args_list),
+            ["111", "222", "333"],
+        )
+
+    def test_lookup_many_serves_cached_products_without_fetching(self) -> None:
+        cached = Product("111", "A", Nutrients(100, 1, 2, 3))
+        cache: SingleFlightLruCache[str, Product] = SingleFlightLruCache()
+        cache.put("111", cached)
+        catalog = Mock()
+        service = ProductService(catalog=catalog, cache=cache)
+
+        results = service.lookup_many(["111"])
+
+        self.assertEqual(results[0].product, cached)
+        catalog.get_by_barcode.assert_not_called()
+
+    def test_lookup_many_fetches_concurrently(self) -> None:
+        # Every fetch waits until four are in flight; a sequential lookup would break the barrier.
+        barrier = threading.Barrier(4, timeout=5)
+
+        def fetch(barcode: str) -> Product:
+            barrier.wait()
+            return Product(barcode, "P", Nutrients(1, 1, 1, 1))
+
+        catalog = Mock()
+        catalog.get_by_barcode.side_effect = fetch
+        service = ProductService(catalog=catalog, max_concurrency=4)
+
+        results = service.lookup_many(["1", "2", "3", "4"])
+
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_search_delegates_to_search_backend(self) -> None:
+        product = Product("111", "Greek Yogurt", Nutrients(97, 9, 4, 5))
+        search = Mock()
+        search.search.return_value = [product]
+        service = ProductService(catalog=Mock(), search=search)
+
+        self.assertEqual(service.search(" greek yo ", limit=5), [product])
+        search.search.assert_called_once_with("greek yo", 5)
+        self.assertEqual(service.search("   "), [])
+
+    def test_search_without_backend_raises(self) -> None:
+        service = ProductService(catalog=Mock())
+
+        self.assertFalse(service.can_search)
+        with self.assertRaises(RuntimeError):
+            service.search("greek")
+
+
+class _AsyncCatalog:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_by_barcode(self, barcode: str) -> Product:
+        self.calls.append(barcode)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if barcode.startswith("0"):
+            raise LookupError(barcode)
+        return Product(barcode=barcode, name=f"P{barcode}", nutrients_per_100g=Nutrients(100, 1, 1, 1))
+
+
+class TestAsyncProductService(unittest.IsolatedAsyncioTestCase):
+    async def test_lookup_many_fans_out_within_the_concurrency_limit(self) -> None:
+        catalog = _AsyncCatalog()
+        service = AsyncProductService(catalog, max_concurrency=10)
+        barcodes = [str(100 + i) for i in range(50)]
+
+        results = await service.lookup_many(barcodes)
+
+        self.assertEqual([r.product.name for r in results if r.product], [f"P{b}" for b in barcodes])
+        self.assertEqual(catalog.max_in_flight, 10)
+
+    async def test_lookup_many_keeps_order_and_reports_errors(self) -> None:
+        catalog = _AsyncCatalog()
+        service = AsyncProductService(catalog)
+
+        results = await service.lookup_many(["111", "0111", "abc", " 111 "])
+
+        self.assertEqual([r.barcode for r in results], ["111", "0111", "abc", "111"])
+        self.assertTrue(results[0].ok and results[3].ok)
+        self.assertIsInstance(results[1].error, LookupError)
+        self.assertIsInstance(results[2].error, ValueError)
+        self.assertEqual(sorted(catalog.calls), ["0111", "111"])
+
+    async def test_concurrent_lookups_share_one_fetch_and_fill_the_cache(self) -> None:
+        catalog = _AsyncCatalog()
+        cache: SingleFlightLruCache[str, Product] = SingleFlightLruCache(max_size=10)
+        service = AsyncProductService(catalog, cache=cache)
+
+        first, second = await asyncio.gather(service.lookup_product("222"), service.lookup_product("222"))
+        third = await service.lookup_product("222")
+
+        self.assertEqual(first, second)
+        self.assertEqual(third, first)
+        self.assertEqual(catalog.calls, ["222"])
+        self.assertEqual(cache.get("222"), first)
@@ -1,9 +1,15 @@
 import unittest
 from datetime import datetime
+from typing import List
 
 from havij.application.ports import UserAuthRecord
-from havij.application.services.user_service import UserService
+from havij.application.services.user_service import (
+    LoginThrottledError,
+    ProcessPoolPasswordHasher,
+    UserService,
+)
 from havij.domain.model.user import UserProfile
+from tests.support import FakeClock
 
 
 class _InMemoryUserRepo:
@@ -105,3 +111,75 @@ class TestUserService(unittest.TestCase):
         service.signup("alice", "pw1")
         service.signup("bob", "pw2")
         self.assertEqual(service.count_users(), 2)
+
+    def test_on_login_runs_after_successful_logins_only(self) -> None:
+        logins: List[UserProfile] = []
+        service = UserService(repo=_InMemoryUserRepo(), on_login=logins.append)
+        profile = service.signup("alice", "pw1")
+
+        service.authenticate("alice", "wrong")
+        service.authenticate("alice", "pw1")
+
+        self.assertEqual(logins, [profile])
+
+    def test_session_token_roundtrip(self) -> None:
+        clock = FakeClock(1_700_000_000.0)
+        service = UserService(repo=_InMemoryUserRepo(), session_ttl_s=60, clock=clock)
+
+        token = service.issue_session_token("user-1")
+
+        self.assertEqual(service.verify_session_token(token), "user-1")
+        clock.now += 61
+        self.assertIsNone(service.verify_session_token(token))
+
+    def test_session_token_rejects_tampering_and_foreign_secrets(self) -> None:
+        service = UserService(repo=_InMemoryUserRepo(), session_secret=b"a" * 32)
+        other = UserService(repo=_InMemoryUserRepo(), session_secret=b"b" * 32)
+        token = service.issue_session_token("user-1")
+        payload, signature = token.split(".")
+        forged = other.issue_session_token("user-2").split(".")[0] + "." + signature
+
+        self.assertIsNone(other.verify_session_token(token))
+        self.assertIsNone(service.verify_session_token(forged))
+        self.assertIsNone(service.verify_session_token(payload))
+        self.assertIsNone(service.verify_session_token("not a token"))
+
+    def test_failed_logins_are_throttled_per_username(self) -> None:
+        clock = FakeClock(1_700_000_000.0)
+        repo = _InMemoryUserRepo()
+        service = UserService(repo=repo, max_failed_logins=2, login_lockout_s=60, clock=clock)
+        service.signup("alice", "pw1")
+        service.signup("bob", "pw2")
+
+        self.assertIsNone(service.authenticate("alice", "wrong"))
+        self.assertIsNone(service.authenticate("alice", "wrong"))
+        with self.assertRaises(LoginThrottledError):
+            service.authenticate("alice", "pw1")
+        self.assertIsNotNone(service.authenticate("bob", "pw2"))
+
+        clock.now += 60
+        self.assertIsNotNone(service.authenticate("alice", "pw1"))
+
+    def test_successful_login_resets_failures(self) -> None:
+        service = UserService(repo=_InMemoryUserRepo(), max_failed_logins=2)
+        service.signup("alice", "pw1")
+
+        for _ in range(3):
+            self.assertIsNone(service.authenticate("alice", "wrong"))
+            self.assertIsNotNone(service.authenticate("alice", "pw1"))
+
+
+class TestProcessPoolPasswordHasher(unittest.TestCase):
+    def test_hashes_match_inline_hashing(self) -> None:
+        hasher = ProcessPoolPasswordHasher(max_workers=1)
+        try:
+            repo = _InMemoryUserRepo()
+            pooled = UserService(repo=repo, hasher=hasher)
+            inline = UserService(repo=repo)
+
+            profile = pooled.signup("alice", "secret")
+
+            self.assertEqual(inline.authenticate("alice", "secret"), profile)
+            self.assertEqual(pooled.authenticate("alice", "secret"), profile)
+        finally:
+            hasher.close()
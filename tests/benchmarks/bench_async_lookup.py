@@ -0,0 +1,100 @@
+"""Batch product lookups: thread pool client versus asyncio client.
+
+Usage::
+
+    python -m tests.benchmarks.bench_async_lookup [--batches 50,200,500]
+        [--latency-ms 50] [--concurrency 8,64] [--rounds 3]
+
+Both sides resolve the same batches of distinct barcodes against the local
+Open Food Facts stub, which delays every response by ``--latency-ms``.
+``ProductService.lookup_many`` fans out over a thread pool with one pooled
+connection per worker; ``AsyncProductService.lookup_many`` runs every lookup on
+one event loop over a pooled ``aiohttp`` session. Nothing is cached, so each
+lookup is a round trip. Needs aiohttp.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from itertools import count
+from typing import Iterator, List
+
+from havij.application.services.product_service import AsyncProductService, ProductLookupResult, ProductService
+from havij.infrastructure.api.async_openfoodfacts_client import AsyncOpenFoodFactsClient
+from havij.infrastructure.api.catalog_adapter import AsyncOpenFoodFactsCatalog, OpenFoodFactsCatalog
+from havij.infrastructure.api.openfoodfacts_client import OpenFoodFactsClient
+from tests.benchmarks.harness import percentile
+from tests.benchmarks.off_stub import serve_products
+
+
+def _batches(size: int, rounds: int, ids: Iterator[int]) -> List[List[str]]:
+    # Fresh barcodes per batch keep the client-side caches out of the picture.
+    return [[f"81{next(ids):011d}" for _ in range(size)] for _ in range(rounds)]
+
+
+def bench_threads(base_url: str, batches: List[List[str]], concurrency: int) -> List[float]:
+    client = OpenFoodFactsClient(pool_size=concurrency)
+    client.BASE_URL = base_url
+    service = ProductService(OpenFoodFactsCatalog(client), max_concurrency=concurrency)
+    timings: List[float] = []
+    try:
+        for batch in batches:
+            start = time.perf_counter()
+            results = service.lookup_many(batch)
+            timings.append(time.perf_counter() - start)
+            _check(results)
+    finally:
+        client.close()
+    return timings
+
+
+def bench_asyncio(base_url: str, batches: List[List[str]], concurrency: int) -> List[float]:
+    async def run() -> List[float]:
+        async with AsyncOpenFoodFactsClient(max_concurrency=concurrency) as client:
+            client.BASE_URL = base_url
+            service = AsyncProductService(AsyncOpenFoodFactsCatalog(client), max_concurrency=concurrency)
+            timings: List[float] = []
+            for batch in batches:
+                start = time.perf_counter()
+                results = await service.lookup_many(batch)
+                timings.append(time.perf_counter() - start)
+                _check(results)
+            return timings
+
+    return asyncio.run(run())
+
+
+def _check(results: List[ProductLookupResult]) -> None:
+    failed = [r for r in results if not r.ok]
+    if failed:
+        raise RuntimeError(f"{len(failed)} lookups failed, first: {failed[0].error!r}")
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", default="50,200,500", help="comma-separated batch sizes")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="delay the stub adds to every response")
+    parser.add_argument("--concurrency", default="8,64", help="comma-separated in-flight request limits")
+    parser.add_argument("--rounds", type=int, default=3, help="batches timed per combination")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.batches.split(",")]
+    limits = [int(c) for c in args.concurrency.split(",")]
+    ids = count()
+    print(f"stub latency {args.latency_ms:.0f} ms, {args.rounds} rounds per row")
+    print(f"{'batch':>6} {'limit':>6} {'client':<8} {'p50 s':>8} {'max s':>8} {'lookups/s':>10}")
+    with serve_products(latency_s=args.latency_ms / 1000) as base_url:
+        for size in sizes:
+            for limit in limits:
+                for name, bench in (("threads", bench_threads), ("asyncio", bench_asyncio)):
+                    timings = bench(base_url, _batches(size, args.rounds, ids), limit)
+                    p50 = percentile(sorted(timings), 50)
+                    print(
+                        f"{size:>6} {limit:>6} {name:<8} {p50:>8.3f} {max(timings):>8.3f} "
+                        f"{size / p50:>10,.0f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
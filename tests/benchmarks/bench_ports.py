@@ -0,0 +1,216 @@
+"""Latency percentiles and throughput of every port operation at several dataset sizes.
+
+Usage::
+
+    python -m tests.benchmarks.bench_ports [--sizes small,medium] [--calls N]
+        [--out results.json] [--baseline tests/benchmarks/baseline.json] [--tolerance 0.25]
+
+Each size gets a fresh database filled by ``tests.benchmarks.dataset``. Product
+lookups are measured once, against a local stub of the Open Food Facts API.
+With ``--baseline`` the run is compared to a stored result and the exit code
+is 1 if any metric regressed by more than ``--tolerance``.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from havij.application.caching import SingleFlightLruCache
+from havij.application.services.meal_service import MealService
+from havij.application.services.product_service import ProductService
+from havij.application.services.user_service import UserService
+from havij.domain.model.meal import MealEntry
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.product import Product
+from havij.infrastructure.api.catalog_adapter import OpenFoodFactsCatalog
+from havij.infrastructure.api.openfoodfacts_client import OpenFoodFactsClient
+from havij.infrastructure.config import STORAGE_PROFILES
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.product_cache import SqliteProductCache
+from havij.infrastructure.persistence.sqlite_db import connect, init_schema
+from havij.infrastructure.persistence.user_repository import SqliteUserRepository
+from tests.benchmarks.dataset import PASSWORD, SIZES, Dataset, DatasetSpec, generate_dataset, sample_days
+from tests.benchmarks.harness import (
+    OperationStats,
+    compare,
+    load_results,
+    measure,
+    run_metadata,
+    to_json,
+    write_results,
+)
+from tests.benchmarks.off_stub import serve_products
+
+Operation = Callable[[int], object]
+
+# Password hashing is deliberately slow, so authenticate gets fewer calls.
+_AUTH_CALL_DIVISOR = 20
+
+
+def bench_size(
+    conn: sqlite3.Connection,
+    dataset: Dataset,
+    calls: int,
+    seed: int = 7,
+) -> Dict[str, OperationStats]:
+    spec = dataset.spec
+    rng = random.Random(seed)
+    repo = SqliteDayLogRepository(conn)
+    meals = MealService(repo)
+    users = UserService(SqliteUserRepository(conn))
+
+    def pick_user(i: int) -> str:
+        return dataset.user_ids[i % len(dataset.user_ids)]
+
+    days = sample_days(spec, calls, rng)
+
+    def save_day(i: int) -> None:
+        # Rewrites a whole day, the way the UI persists an edited log.
+        user_id, day = pick_user(i), days[i]
+        repo.save_day(repo.load_day(day, user_id), user_id)
+
+    # Warm-up calls reuse indexes, so ids come from a counter instead.
+    entry_ids = count()
+
+    def append_entry(i: int) -> None:
+        repo.append_entry(days[i], _entry(f"bench-append-{next(entry_ids)}"), pick_user(i))
+
+    operations: Dict[str, Operation] = {
+        "load_day": lambda i: repo.load_day(days[i], pick_user(i)),
+        "save_day": save_day,
+        "append_entry": append_entry,
+        "totals_between_30d": lambda i: repo.totals_between(pick_user(i), days[i] - timedelta(days=29), days[i]),
+        "nutrients_between_365d": lambda i: repo.nutrients_between(
+            pick_user(i), days[i] - timedelta(days=364), days[i]
+        ),
+        "get_last_days_totals_7d": lambda i: meals.get_last_days_totals(pick_user(i), days[i], 7),
+        "get_rolling_averages_30d": lambda i: meals.get_rolling_averages(pick_user(i), days[i], days=30),
+    }
+    results = {name: measure(op, calls, warmup=min(calls, 20)) for name, op in operations.items()}
+    results["authenticate"] = measure(
+        lambda i: users.authenticate(dataset.usernames[i % len(dataset.usernames)], PASSWORD),
+        max(1, calls // _AUTH_CALL_DIVISOR),
+        warmup=1,
+    )
+    return results
+
+
+def bench_products(db_path: Path, calls: int) -> Dict[str, OperationStats]:
+    barcodes = [f"80{i:011d}" for i in range(calls)]
+    results: Dict[str, OperationStats] = {}
+    with serve_products() as base_url:
+        client = OpenFoodFactsClient()
+        client.BASE_URL = base_url
+        try:
+            # Every call goes over HTTP: client overhead plus a local round trip.
+            results["client_get_product"] = measure(
+                lambda i: client.get_product_by_barcode(barcodes[i]), calls, warmup=5
+            )
+
+            conn = connect(db_path, profile=STORAGE_PROFILES["balanced"])
+            try:
+                init_schema(conn)
+                cache = SqliteProductCache(OpenFoodFactsCatalog(client), conn)
+                results["product_cache_miss"] = measure(lambda i: cache.get_by_barcode(barcodes[i]), calls)
+                results["product_cache_hit"] = measure(lambda i: cache.get_by_barcode(barcodes[i]), calls)
+
+                lru: SingleFlightLruCache[str, Product] = SingleFlightLruCache(max_size=calls)
+                service = ProductService(cache, cache=lru)
+                results["lookup_product_lru_miss"] = measure(lambda i: service.lookup_product(barcodes[i]), calls)
+                results["lookup_product_lru_hit"] = measure(lambda i: service.lookup_product(barcodes[i]), calls)
+            finally:
+                conn.close()
+        finally:
+            client.close()
+    return results
+
+
+def _entry(entry_id: str) -> MealEntry:
+    return MealEntry(
+        entry_id=entry_id,
+        timestamp=datetime(2024, 1, 1, 12, 0),
+        barcode="8000000000001",
+        product_name="Bench product",
+        grams=100.0,
+        nutrients=Nutrients(250.0, 10.0, 30.0, 8.0),
+    )
+
+
+def _print_table(results: Dict[str, Dict[str, OperationStats]]) -> None:
+    print(f"{'size':<9} {'operation':<26} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    for size, ops in results.items():
+        for name, s in ops.items():
+            print(
+                f"{size:<9} {name:<26} {s.calls:>6} {s.p50_ms:>9.3f} {s.p95_ms:>9.3f} "
+                f"{s.p99_ms:>9.3f} {s.ops_per_s:>10,.0f}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="small,medium", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--distribution", default="mixed", help="steady, poisson, bursty or mixed")
+    parser.add_argument("--entries-per-day", type=float, default=5.0)
+    parser.add_argument("--calls", type=int, default=500, help="timed calls per operation")
+    parser.add_argument("--out", type=Path, default=None, help="write the results as JSON")
+    parser.add_argument("--baseline", type=Path, default=None, help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=0.05, help="ignore slowdowns smaller than this per call"
+    )
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    results: Dict[str, Dict[str, OperationStats]] = {}
+    datasets: Dict[str, Dict[str, object]] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            users, days = SIZES[size]
+            spec = DatasetSpec(
+                users=users, days=days, entries_per_day=args.entries_per_day, distribution=args.distribution
+            )
+            conn = connect(Path(tmp_dir) / f"{size}.sqlite", profile=STORAGE_PROFILES["balanced"])
+            try:
+                print(f"Generating {size} dataset ({users} users x {days} days)...", flush=True)
+                dataset = generate_dataset(conn, spec)
+                datasets[size] = {"users": users, "days": days, "entries": dataset.entries}
+                results[size] = bench_size(conn, dataset, args.calls)
+            finally:
+                conn.close()
+        results["products"] = bench_products(Path(tmp_dir) / "products.sqlite", args.calls)
+
+    _print_table(results)
+    meta = run_metadata()
+    meta.update(
+        calls=args.calls, distribution=args.distribution, entries_per_day=args.entries_per_day, datasets=datasets
+    )
+    document = to_json(results, meta)
+    if args.out is not None:
+        write_results(args.out, document)
+        print(f"Wrote {args.out}")
+
+    if args.baseline is not None:
+        regressions = compare(document, load_results(args.baseline), args.tolerance, args.min_delta_ms)
+        for r in regressions:
+            print(
+                f"REGRESSION {r.size}/{r.operation} {r.metric}: "
+                f"{r.baseline:,.3f} -> {r.current:,.3f} ({r.change:+.0%})"
+            )
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
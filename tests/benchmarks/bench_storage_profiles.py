@@ -0,0 +1,104 @@
+"""Write/read throughput of the meal repository under each storage profile.
+
+Usage: ``python -m tests.benchmarks.bench_storage_profiles [--writes N] [--reads N] [--json]``
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from havij.domain.model.meal import MealEntry
+from havij.domain.model.nutrients import Nutrients
+from havij.infrastructure.config import STORAGE_PROFILES, StorageProfile
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.sqlite_db import ThreadLocalConnections, init_schema
+
+_START_DAY = date(2024, 1, 1)
+
+
+def bench_profile(profile: StorageProfile, writes: int, reads: int, readers: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        connections = ThreadLocalConnections(Path(tmp_dir) / "bench.sqlite", profile=profile)
+        try:
+            init_schema(connections.get())
+            repo = SqliteDayLogRepository(connections)
+
+            started = time.perf_counter()
+            for i in range(writes):
+                day = _START_DAY + timedelta(days=i % 365)
+                repo.append_entry(day, _entry(i, day), "bench-user")
+            write_s = time.perf_counter() - started
+
+            def read_loop(count: int) -> None:
+                for i in range(count):
+                    day = _START_DAY + timedelta(days=i % 365)
+                    repo.load_day(day, "bench-user")
+                    repo.totals_between("bench-user", day - timedelta(days=29), day)
+
+            per_reader = max(1, reads // readers)
+            threads = [threading.Thread(target=read_loop, args=(per_reader,)) for _ in range(readers)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            # Writes continue while the readers run, to show reader/writer blocking.
+            mixed_writes = 0
+            while any(t.is_alive() for t in threads):
+                day = _START_DAY + timedelta(days=mixed_writes % 365)
+                repo.append_entry(day, _entry(writes + mixed_writes, day), "bench-user")
+                mixed_writes += 1
+            for t in threads:
+                t.join()
+            read_s = time.perf_counter() - started
+        finally:
+            connections.close_all()
+
+    return {
+        "writes_per_s": writes / write_s,
+        "reads_per_s": per_reader * readers / read_s,
+        "writes_during_reads_per_s": mixed_writes / read_s,
+    }
+
+
+def _entry(i: int, day: date) -> MealEntry:
+    return MealEntry(
+        entry_id=f"bench-{i}",
+        timestamp=datetime(day.year, day.month, day.day, 12, 0, 0),
+        barcode="3017620422003",
+        product_name="Bench product",
+        grams=100.0,
+        nutrients=Nutrients(250.0, 10.0, 30.0, 8.0),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=2_000, help="single-entry commits per profile")
+    parser.add_argument("--reads", type=int, default=4_000, help="day + 30-day-range reads per profile")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent reader threads")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    results = {
+        name: bench_profile(profile, args.writes, args.reads, args.readers)
+        for name, profile in STORAGE_PROFILES.items()
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'profile':<10} {'writes/s':>10} {'reads/s':>10} {'writes/s while reading':>24}")
+        for name, r in results.items():
+            print(
+                f"{name:<10} {r['writes_per_s']:>10,.0f} {r['reads_per_s']:>10,.0f} "
+                f"{r['writes_during_reads_per_s']:>24,.0f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+"""Synthetic users and meal history for the benchmarks.
+
+Each user logs from ``start`` for ``days`` days. How many entries a user logs
+per day follows one of ``DISTRIBUTIONS``:
+
+- ``steady``: the same number every day;
+- ``poisson``: Poisson-distributed around the mean;
+- ``bursty``: most days are skipped or light, a few are very heavy.
+
+With ``distribution="mixed"`` users cycle through all three.
+"""
+from __future__ import annotations
+
+import math
+import random
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from havij.application.services.user_service import UserService
+from havij.domain.model.meal import MealEntry
+from havij.domain.model.nutrients import Nutrients
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.sqlite_db import init_schema
+from havij.infrastructure.persistence.user_repository import SqliteUserRepository
+
+DISTRIBUTIONS = ("steady", "poisson", "bursty")
+
+PASSWORD = "bench-password"
+
+# A small product pool, so barcodes and names repeat like in a real log.
+_PRODUCTS: Tuple[Tuple[str, str, Nutrients], ...] = tuple(
+    (f"80{i:011d}", f"Product {i}", Nutrients(50.0 + 7 * i, 1.0 + i % 20, 5.0 + i % 50, 0.5 + i % 15))
+    for i in range(200)
+)
+
+
+@dataclass(frozen=True, slots=True)
+class DatasetSpec:
+    users: int
+    days: int
+    entries_per_day: float = 5.0
+    distribution: str = "mixed"
+    start: date = date(2023, 1, 1)
+    seed: int = 42
+
+    def __post_init__(self) -> None:
+        if self.users <= 0 or self.days <= 0:
+            raise ValueError("users and days must be > 0")
+        if self.entries_per_day <= 0:
+            raise ValueError("entries_per_day must be > 0")
+        if self.distribution not in DISTRIBUTIONS + ("mixed",):
+            raise ValueError(f"distribution must be one of {', '.join(DISTRIBUTIONS)} or mixed")
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.days - 1)
+
+
+@dataclass(frozen=True, slots=True)
+class Dataset:
+    spec: DatasetSpec
+    usernames: List[str]
+    user_ids: List[str]
+    entries: int
+
+
+# Named sizes for the benchmark runner: (users, days).
+SIZES: Dict[str, Tuple[int, int]] = {
+    "small": (10, 90),
+    "medium": (50, 365),
+    "large": (200, 3 * 365),
+}
+
+
+def entries_per_day(distribution: str, mean: float, days: int, rng: random.Random) -> List[int]:
+    if distribution == "steady":
+        return [max(1, round(mean))] * days
+    if distribution == "poisson":
+        return [_poisson(mean, rng) for _ in range(days)]
+    if distribution == "bursty":
+        # Half the days are skipped, most of the rest are light and one in ten
+        # carries about half of the volume; the mean stays at ``mean``.
+        counts = []
+        for _ in range(days):
+            roll = rng.random()
+            if roll < 0.5:
+                counts.append(0)
+            elif roll < 0.9:
+                counts.append(_poisson(mean * 0.5 / 0.4, rng))
+            else:
+                counts.append(_poisson(mean * 0.5 / 0.1, rng))
+        return counts
+    raise ValueError(f"unknown distribution {distribution!r}")
+
+
+def generate_dataset(conn: sqlite3.Connection, spec: DatasetSpec) -> Dataset:
+    """Create ``spec.users`` users and their history in ``conn``."""
+    init_schema(conn)
+    rng = random.Random(spec.seed)
+    users = SqliteUserRepository(conn)
+    meals = SqliteDayLogRepository(conn)
+
+    # Hashing a password takes tens of milliseconds on purpose; every user
+    # shares the first user's hash so generating many users stays fast.
+    first = UserService(users).signup("bench-user-0", PASSWORD)
+    auth = users.get_auth_by_username(first.username)
+    assert auth is not None
+    usernames = [first.username]
+    user_ids = [first.user_id]
+    for i in range(1, spec.users):
+        profile = users.create_user(
+            user_id=f"bench-{i}",
+            username=f"bench-user-{i}",
+            password_hash=auth.password_hash,
+            salt=auth.salt,
+            created_at=auth.created_at,
+        )
+        usernames.append(profile.username)
+        user_ids.append(profile.user_id)
+
+    total = 0
+    for n, user_id in enumerate(user_ids):
+        distribution = DISTRIBUTIONS[n % len(DISTRIBUTIONS)] if spec.distribution == "mixed" else spec.distribution
+        counts = entries_per_day(distribution, spec.entries_per_day, spec.days, rng)
+        by_day: Dict[date, List[MealEntry]] = {}
+        for offset, count in enumerate(counts):
+            if count:
+                day = spec.start + timedelta(days=offset)
+                by_day[day] = [_entry(f"{user_id}-{offset}-{k}", day, rng) for k in range(count)]
+            # Keep each transaction to a few thousand rows.
+            if len(by_day) >= 100 or offset == len(counts) - 1:
+                meals.append_entries(by_day, user_id)
+                total += sum(len(v) for v in by_day.values())
+                by_day = {}
+    return Dataset(spec=spec, usernames=usernames, user_ids=user_ids, entries=total)
+
+
+def sample_days(spec: DatasetSpec, count: int, rng: random.Random) -> Sequence[date]:
+    return [spec.start + timedelta(days=rng.randrange(spec.days)) for _ in range(count)]
+
+
+def _entry(entry_id: str, day: date, rng: random.Random) -> MealEntry:
+    barcode, name, per_100g = _PRODUCTS[rng.randrange(len(_PRODUCTS))]
+    grams = float(rng.randrange(10, 400))
+    return MealEntry(
+        entry_id=entry_id,
+        timestamp=datetime(day.year, day.month, day.day, rng.randrange(6, 23), rng.randrange(60)),
+        barcode=barcode,
+        product_name=name,
+        grams=grams,
+        nutrients=per_100g.scale(grams / 100.0),
+    )
+
+
+def _poisson(mean: float, rng: random.Random) -> int:
+    # Knuth's method; fine for the small means used here.
+    limit = math.exp(-mean)
+    k, p = 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
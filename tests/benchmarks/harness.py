@@ -0,0 +1,171 @@
+"""Timing, percentiles and baseline comparison shared by the benchmarks.
+
+Results are plain JSON::
+
+    {"meta": {...}, "results": {"<size>": {"<operation>": {"p50_ms": ..., ...}}}}
+"""
+from __future__ import annotations
+
+import json
+import math
+import platform
+import sqlite3
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Sequence
+
+# Metrics compared against the baseline, and whether a larger value is worse.
+COMPARED_METRICS: Dict[str, bool] = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "ops_per_s": False,
+}
+
+# Upper bounds of the latency histogram buckets; the last bucket is open.
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 1000.0)
+
+
+@dataclass(frozen=True, slots=True)
+class OperationStats:
+    calls: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    mean_ms: float
+    ops_per_s: float
+
+
+@dataclass(frozen=True, slots=True)
+class Regression:
+    size: str
+    operation: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1.0 if self.baseline else math.inf
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        raise ValueError("no values")
+    if not 0 <= pct <= 100:
+        raise ValueError("pct must be within [0, 100]")
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def measure(op: Callable[[int], object], calls: int, warmup: int = 0) -> OperationStats:
+    """Call ``op(i)`` for i in ``range(calls)`` and summarise the latencies.
+
+    ``warmup`` extra calls run first and are not recorded.
+    """
+    if calls <= 0:
+        raise ValueError("calls must be > 0")
+    for i in range(warmup):
+        op(i)
+    latencies: List[float] = []
+    clock = time.perf_counter
+    started = clock()
+    for i in range(calls):
+        t0 = clock()
+        op(i)
+        latencies.append(clock() - t0)
+    elapsed = clock() - started
+    return summarize(latencies, elapsed)
+
+
+def summarize(latencies_s: Sequence[float], elapsed_s: float) -> OperationStats:
+    ordered = sorted(latencies_s)
+    to_ms = 1000.0
+    return OperationStats(
+        calls=len(ordered),
+        p50_ms=percentile(ordered, 50) * to_ms,
+        p95_ms=percentile(ordered, 95) * to_ms,
+        p99_ms=percentile(ordered, 99) * to_ms,
+        max_ms=ordered[-1] * to_ms,
+        mean_ms=sum(ordered) / len(ordered) * to_ms,
+        ops_per_s=len(ordered) / elapsed_s if elapsed_s > 0 else math.inf,
+    )
+
+
+def histogram(latencies_s: Sequence[float], bounds_ms: Sequence[float] = HISTOGRAM_BOUNDS_MS) -> List[int]:
+    """Counts per bucket: ``<= bounds_ms[0]``, ..., ``<= bounds_ms[-1]``, and above."""
+    counts = [0] * (len(bounds_ms) + 1)
+    for latency in latencies_s:
+        counts[bisect_left(bounds_ms, latency * 1000.0)] += 1
+    return counts
+
+
+def run_metadata() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "argv": sys.argv[1:],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def to_json(results: Mapping[str, Mapping[str, OperationStats]], meta: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": dict(meta),
+        "results": {
+            size: {name: asdict(stats) for name, stats in ops.items()}
+            for size, ops in results.items()
+        },
+    }
+
+
+def write_results(path: Path, document: Mapping[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    document: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+    return document
+
+
+def compare(
+    current: Mapping[str, Any],
+    baseline: Mapping[str, Any],
+    tolerance: float,
+    min_delta_ms: float = 0.05,
+) -> List[Regression]:
+    """Metrics of ``current`` worse than ``baseline`` by more than ``tolerance`` (0.25 = 25%).
+
+    Slowdowns under ``min_delta_ms`` per call are ignored: for operations that
+    take microseconds they are scheduler noise, not regressions. Only sizes
+    and operations present in both documents are compared.
+    """
+    if tolerance < 0:
+        raise ValueError("tolerance must be >= 0")
+    regressions: List[Regression] = []
+    base_results = baseline.get("results", {})
+    for size, ops in current.get("results", {}).items():
+        for name, stats in ops.items():
+            base = base_results.get(size, {}).get(name)
+            if base is None:
+                continue
+            for metric, higher_is_worse in COMPARED_METRICS.items():
+                old, new = float(base[metric]), float(stats[metric])
+                if not higher_is_worse:
+                    # Compare throughput as time per call, so the floor applies.
+                    old_ms, new_ms = _ms_per_call(old), _ms_per_call(new)
+                else:
+                    old_ms, new_ms = old, new
+                if new_ms > old_ms * (1 + tolerance) and new_ms - old_ms >= min_delta_ms:
+                    regressions.append(Regression(size, name, metric, old, new))
+    return regressions
+
+
+def _ms_per_call(ops_per_s: float) -> float:
+    return 1000.0 / ops_per_s if ops_per_s > 0 else math.inf
@@ -0,0 +1,379 @@
+"""Simulated concurrent users against the real meal and product services.
+
+Usage::
+
+    python -m tests.benchmarks.load_meals [--users 1,2,4,8,16] [--duration 5]
+        [--mode threads|processes] [--profile balanced] [--busy-timeout-ms N]
+        [--group-commit N] [--shards K] [--out results.json]
+
+For each concurrency level, that many simulated users log meals at the same
+time for ``--duration`` seconds. Each one runs a mix of add, remove, view-day,
+history and product-lookup calls (see ``OPERATION_MIX``). With ``threads`` the
+users share one deployment (one ``MealService`` over one
+``SqliteDayLogRepository`` with per-thread connections), like a single app
+process. With ``processes`` every user has its own, like several app
+replicas on one database file. ``--group-commit N`` sends each deployment's
+writes through a ``GroupCommitWriter`` that commits up to N of them at once;
+``--shards K`` reshards the generated users into K files first and routes
+every meal and user call to its user's shard.
+
+Product lookups go to ``StubCatalog`` through the SQLite product cache and the
+in-process LRU, instead of to Open Food Facts. Every level reports throughput,
+latency percentiles, a latency histogram and the share of calls that failed
+with ``database is locked``.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from havij.application.caching import SingleFlightLruCache
+from havij.application.services.meal_service import MealService
+from havij.application.services.product_service import ProductService
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.product import Product
+from havij.infrastructure.config import STORAGE_PROFILES, StorageProfile
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.product_cache import SqliteProductCache
+from havij.infrastructure.persistence.reshard import reshard
+from havij.infrastructure.persistence.sharding import ShardConnections, ShardedDayLogRepository, ShardLayout
+from havij.infrastructure.persistence.sqlite_db import ThreadLocalConnections, connect
+from havij.infrastructure.persistence.write_queue import GroupCommitWriter
+from tests.benchmarks.dataset import DatasetSpec, generate_dataset
+from tests.benchmarks.harness import (
+    HISTOGRAM_BOUNDS_MS,
+    histogram,
+    run_metadata,
+    summarize,
+    write_results,
+)
+
+# Relative weight of each simulated action.
+OPERATION_MIX: Dict[str, int] = {
+    "add": 30,
+    "remove": 10,
+    "view_day": 35,
+    "history": 15,
+    "lookup": 10,
+}
+
+# Outcomes recorded per call besides "ok".
+LOCKED = "locked"
+ERROR = "error"
+
+# One sample per call: (operation, latency in seconds, outcome).
+Sample = Tuple[str, float, str]
+
+_BARCODES = tuple(f"{8_000_000_000_000 + i}" for i in range(1_000))
+
+
+class StubCatalog:
+    """ProductCatalog that answers from memory after ``latency_s``, standing in for the network."""
+
+    def __init__(self, latency_s: float = 0.0):
+        self._latency_s = latency_s
+
+    def get_by_barcode(self, barcode: str) -> Product:
+        if self._latency_s:
+            time.sleep(self._latency_s)
+        seed = int(barcode) % 1000
+        return Product(
+            barcode=barcode,
+            name=f"Stub product {barcode}",
+            nutrients_per_100g=Nutrients(50.0 + seed % 400, seed % 20, seed % 50, seed % 25),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class LoadSettings:
+    db_path: Path
+    profile: StorageProfile
+    duration_s: float
+    think_s: float
+    catalog_latency_s: float
+    today: date
+    history_days: int
+    # 0: every write commits on its own.
+    group_commit_max_batch: int = 0
+    group_commit_window_s: float = 0.0
+    # None: users stay in db_path.
+    shards: Optional[ShardLayout] = None
+
+
+@dataclass(frozen=True, slots=True)
+class LevelReport:
+    users: int
+    calls: int
+    ops_per_s: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    locked: int
+    errors: int
+    histogram: List[int]
+    by_operation: Dict[str, Dict[str, float]]
+
+    @property
+    def locked_rate(self) -> float:
+        return self.locked / self.calls if self.calls else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.calls if self.calls else 0.0
+
+
+class _Deployment:
+    def __init__(self, settings: LoadSettings):
+        self.connections = ThreadLocalConnections(settings.db_path, profile=settings.profile)
+        self.writer: Optional[GroupCommitWriter] = None
+        if settings.group_commit_max_batch > 0:
+            self.writer = GroupCommitWriter(
+                settings.db_path,
+                profile=settings.profile,
+                max_batch=settings.group_commit_max_batch,
+                window_s=settings.group_commit_window_s,
+            )
+        self.shards: Optional[ShardConnections] = None
+        if settings.shards is not None:
+            self.shards = ShardConnections(settings.shards, profile=settings.profile)
+            self.meals = MealService(ShardedDayLogRepository(self.shards))
+        else:
+            self.meals = MealService(SqliteDayLogRepository(self.connections, self.writer))
+        cache = SqliteProductCache(StubCatalog(settings.catalog_latency_s), self.connections)
+        lru: SingleFlightLruCache[str, Product] = SingleFlightLruCache(max_size=256)
+        self.products = ProductService(cache, cache=lru)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        if self.shards is not None:
+            self.shards.close_all()
+        self.connections.close_all()
+
+
+def simulate_user(deployment: _Deployment, settings: LoadSettings, user_id: str, seed: int) -> List[Sample]:
+    """Run ``OPERATION_MIX`` for ``settings.duration_s`` seconds as ``user_id``."""
+    rng = random.Random(seed)
+    names = list(OPERATION_MIX)
+    weights = list(OPERATION_MIX.values())
+    meals, products = deployment.meals, deployment.products
+    added: List[Tuple[date, str]] = []
+    samples: List[Sample] = []
+    clock = time.perf_counter
+    deadline = clock() + settings.duration_s
+
+    while clock() < deadline:
+        op = rng.choices(names, weights)[0]
+        day = settings.today - timedelta(days=rng.randrange(min(settings.history_days, 7)))
+        started = clock()
+        outcome = "ok"
+        try:
+            if op == "add":
+                product = products.lookup_product(rng.choice(_BARCODES))
+                entry = meals.add_entry(
+                    user_id,
+                    day,
+                    product.name,
+                    float(rng.randrange(20, 400)),
+                    product.nutrients_per_100g,
+                    barcode=product.barcode,
+                )
+                added.append((day, entry.entry_id))
+            elif op == "remove":
+                if added:
+                    removed_day, entry_id = added.pop(rng.randrange(len(added)))
+                    meals.remove_entry(user_id, removed_day, entry_id)
+            elif op == "view_day":
+                meals.get_day_log(user_id, day)
+                meals.get_day_totals(user_id, day)
+            elif op == "history":
+                meals.get_last_days_totals(user_id, settings.today, 30)
+            else:
+                products.lookup_product(rng.choice(_BARCODES))
+        except sqlite3.OperationalError as exc:
+            outcome = LOCKED if "locked" in str(exc) or "busy" in str(exc) else ERROR
+        except Exception:
+            outcome = ERROR
+        samples.append((op, clock() - started, outcome))
+        if settings.think_s:
+            time.sleep(rng.expovariate(1.0 / settings.think_s))
+    return samples
+
+
+def _simulate_user_in_process(settings: LoadSettings, user_id: str, seed: int) -> List[Sample]:
+    deployment = _Deployment(settings)
+    try:
+        return simulate_user(deployment, settings, user_id, seed)
+    finally:
+        deployment.close()
+
+
+def run_level(settings: LoadSettings, user_ids: Sequence[str], mode: str) -> LevelReport:
+    samples: List[Sample] = []
+    executor: Executor
+    if mode == "threads":
+        deployment = _Deployment(settings)
+        try:
+            with ThreadPoolExecutor(max_workers=len(user_ids)) as executor:
+                futures = [
+                    executor.submit(simulate_user, deployment, settings, user_id, seed)
+                    for seed, user_id in enumerate(user_ids)
+                ]
+                for f in futures:
+                    samples.extend(f.result())
+        finally:
+            deployment.close()
+    else:
+        with ProcessPoolExecutor(max_workers=len(user_ids)) as executor:
+            futures = [
+                executor.submit(_simulate_user_in_process, settings, user_id, seed)
+                for seed, user_id in enumerate(user_ids)
+            ]
+            for f in futures:
+                samples.extend(f.result())
+    return _report(len(user_ids), samples, settings.duration_s)
+
+
+def _report(users: int, samples: Sequence[Sample], duration_s: float) -> LevelReport:
+    if not samples:
+        raise RuntimeError("no calls completed; increase --duration")
+    latencies = [latency for _, latency, _ in samples]
+    overall = summarize(latencies, duration_s)
+    by_operation: Dict[str, Dict[str, float]] = {}
+    for op in OPERATION_MIX:
+        op_samples = [s for s in samples if s[0] == op]
+        if not op_samples:
+            continue
+        stats = summarize([latency for _, latency, _ in op_samples], duration_s)
+        by_operation[op] = {
+            "calls": stats.calls,
+            "p50_ms": stats.p50_ms,
+            "p95_ms": stats.p95_ms,
+            "p99_ms": stats.p99_ms,
+            "locked": sum(1 for s in op_samples if s[2] == LOCKED),
+        }
+    return LevelReport(
+        users=users,
+        calls=overall.calls,
+        ops_per_s=overall.ops_per_s,
+        p50_ms=overall.p50_ms,
+        p95_ms=overall.p95_ms,
+        p99_ms=overall.p99_ms,
+        max_ms=overall.max_ms,
+        locked=sum(1 for s in samples if s[2] == LOCKED),
+        errors=sum(1 for s in samples if s[2] == ERROR),
+        histogram=histogram(latencies),
+        by_operation=by_operation,
+    )
+
+
+def _print_reports(reports: Sequence[LevelReport], show_histogram: bool) -> None:
+    print(
+        f"{'users':>5} {'calls':>8} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>9} "
+        f"{'max ms':>9} {'locked':>8} {'errors':>7}"
+    )
+    for r in reports:
+        print(
+            f"{r.users:>5} {r.calls:>8} {r.ops_per_s:>9,.0f} {r.p50_ms:>8.2f} {r.p95_ms:>8.2f} {r.p99_ms:>9.2f} "
+            f"{r.max_ms:>9.1f} {r.locked_rate:>8.2%} {r.error_rate:>7.2%}"
+        )
+    if not show_histogram:
+        return
+    labels = [f"<={b:g}" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]:g}"]
+    print()
+    print("latency histogram (ms), share of calls per bucket")
+    print(f"{'users':>5} " + " ".join(f"{label:>7}" for label in labels))
+    for r in reports:
+        print(f"{r.users:>5} " + " ".join(f"{count / r.calls:>7.1%}" for count in r.histogram))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per concurrency level")
+    parser.add_argument("--mode", choices=("threads", "processes"), default="threads")
+    parser.add_argument("--profile", choices=tuple(STORAGE_PROFILES), default="balanced")
+    parser.add_argument("--busy-timeout-ms", type=int, default=None, help="override the profile's busy timeout")
+    parser.add_argument("--group-commit", type=int, default=0, help="writes per group commit (0: off)")
+    parser.add_argument(
+        "--group-commit-window-ms", type=float, default=0.0, help="how long a group commit waits for more writes"
+    )
+    parser.add_argument("--shards", type=int, default=0, help="spread users over this many database files (0: one)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's calls")
+    parser.add_argument("--catalog-latency-ms", type=float, default=0.0, help="delay of each stub catalog fetch")
+    parser.add_argument("--history-days", type=int, default=90, help="history generated for each user beforehand")
+    parser.add_argument("--db", type=Path, default=None, help="database file (default: a temporary one)")
+    parser.add_argument("--histogram", action="store_true", help="also print the latency histograms")
+    parser.add_argument("--out", type=Path, default=None, help="write the reports as JSON")
+    args = parser.parse_args(argv)
+    if args.shards and args.group_commit:
+        parser.error("--group-commit needs a single database file")
+
+    levels = sorted({int(u) for u in args.users.split(",") if u.strip()})
+    if not levels or levels[0] <= 0:
+        parser.error("--users must list positive integers")
+    profile = STORAGE_PROFILES[args.profile]
+    if args.busy_timeout_ms is not None:
+        profile = replace(profile, busy_timeout_ms=args.busy_timeout_ms)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = args.db or Path(tmp_dir) / "load.sqlite"
+        spec = DatasetSpec(users=levels[-1], days=args.history_days, entries_per_day=4.0)
+        conn = connect(db_path, profile=profile)
+        try:
+            print(f"Generating {spec.users} users x {spec.days} days of history...", flush=True)
+            dataset = generate_dataset(conn, spec)
+            layout: Optional[ShardLayout] = None
+            if args.shards:
+                layout = ShardLayout(db_path.parent / "shards", count=args.shards)
+                print(f"Resharding into {args.shards} files...", flush=True)
+                reshard([db_path], conn, layout, profile=profile)
+        finally:
+            conn.close()
+
+        settings = LoadSettings(
+            db_path=db_path,
+            profile=profile,
+            duration_s=args.duration,
+            think_s=args.think_ms / 1000.0,
+            catalog_latency_s=args.catalog_latency_ms / 1000.0,
+            today=spec.end,
+            history_days=spec.days,
+            group_commit_max_batch=args.group_commit,
+            group_commit_window_s=args.group_commit_window_ms / 1000.0,
+            shards=layout,
+        )
+        reports: List[LevelReport] = []
+        for users in levels:
+            print(f"{users} concurrent users ({args.mode}) for {args.duration:g}s...", flush=True)
+            reports.append(run_level(settings, dataset.user_ids[:users], args.mode))
+
+    _print_reports(reports, args.histogram)
+    if args.out is not None:
+        meta = run_metadata()
+        meta.update(
+            mode=args.mode,
+            profile=asdict(profile),
+            duration_s=args.duration,
+            group_commit=args.group_commit,
+            group_commit_window_ms=args.group_commit_window_ms,
+            shards=args.shards,
+            operation_mix=OPERATION_MIX,
+            histogram_bounds_ms=list(HISTOGRAM_BOUNDS_MS),
+        )
+        write_results(args.out, {"meta": meta, "levels": [asdict(r) for r in reports]})
+        print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+"""A local stand-in for the Open Food Facts product endpoint.
+
+``serve_products()`` starts it on a free port and yields the base URL to give
+``OpenFoodFactsClient``. Every barcode exists except those starting with
+``404``; ``latency_s`` delays each response to mimic a remote server.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator
+
+
+def product_document(barcode: str) -> Dict[str, Any]:
+    seed = sum(ord(c) for c in barcode)
+    return {
+        "code": barcode,
+        "status": 1,
+        "product": {
+            "product_name": f"Stub product {barcode}",
+            "nutriments": {
+                "energy-kcal_100g": 50 + seed % 400,
+                "proteins_100g": seed % 20,
+                "carbohydrates_100g": seed % 50,
+                "fat_100g": seed % 25,
+            },
+        },
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_StubServer"
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, every
+    # keep-alive response would wait for the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self.server.requests += 1
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        barcode = self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        if barcode.startswith("404"):
+            self._send(404, {"status": 0, "status_verbose": "product not found"})
+        else:
+            self._send(200, product_document(barcode))
+
+    def _send(self, status: int, document: Dict[str, Any]) -> None:
+        body = json.dumps(document).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for a burst of concurrent connects; the default backlog of 5 makes
+    # the rest wait for a SYN retransmit (about a second).
+    request_queue_size = 512
+    latency_s = 0.0
+    requests = 0
+
+
+@contextmanager
+def serve_products(latency_s: float = 0.0) -> Iterator[str]:
+    server = _StubServer(("127.0.0.1", 0), _Handler)
+    server.latency_s = latency_s
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/api/v2"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
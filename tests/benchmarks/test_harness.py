@@ -0,0 +1,128 @@
+import random
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from havij.infrastructure.api.openfoodfacts_client import OpenFoodFactsClient, ProductNotFoundError
+from havij.infrastructure.config import STORAGE_PROFILES
+from havij.infrastructure.persistence.sqlite_db import connect
+from tests.benchmarks.dataset import DISTRIBUTIONS, DatasetSpec, entries_per_day, generate_dataset
+from tests.benchmarks.harness import OperationStats, compare, histogram, measure, percentile, to_json
+from tests.benchmarks.load_meals import OPERATION_MIX, LoadSettings, run_level
+from tests.benchmarks.off_stub import serve_products
+
+
+def _document(**ops: OperationStats) -> dict:
+    return to_json({"small": ops}, {})
+
+
+def _stats(p50_ms: float, p95_ms: float, ops_per_s: float) -> OperationStats:
+    return OperationStats(
+        calls=100, p50_ms=p50_ms, p95_ms=p95_ms, p99_ms=p95_ms, max_ms=p95_ms, mean_ms=p50_ms, ops_per_s=ops_per_s
+    )
+
+
+class TestHarness(unittest.TestCase):
+    def test_percentile_uses_nearest_rank(self) -> None:
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 95), 95.0)
+        self.assertEqual(percentile(values, 0), 1.0)
+        self.assertEqual(percentile(values, 100), 100.0)
+        with self.assertRaises(ValueError):
+            percentile([], 50)
+
+    def test_measure_counts_only_timed_calls(self) -> None:
+        seen: list[int] = []
+
+        stats = measure(seen.append, calls=10, warmup=3)
+
+        self.assertEqual(stats.calls, 10)
+        self.assertEqual(seen, [0, 1, 2] + list(range(10)))
+        self.assertLessEqual(stats.p50_ms, stats.p99_ms)
+
+    def test_compare_flags_slowdowns_beyond_tolerance(self) -> None:
+        baseline = _document(load_day=_stats(1.0, 2.0, 1000.0), tiny=_stats(0.01, 0.02, 100_000.0))
+        current = _document(load_day=_stats(1.1, 3.0, 500.0), tiny=_stats(0.03, 0.06, 30_000.0))
+
+        regressions = compare(current, baseline, tolerance=0.25)
+
+        # p50 is within tolerance; "tiny" tripled but by less than the floor.
+        self.assertEqual([(r.operation, r.metric) for r in regressions], [("load_day", "p95_ms"), ("load_day", "ops_per_s")])
+        self.assertAlmostEqual(regressions[0].change, 0.5)
+
+    def test_histogram_buckets_by_upper_bound(self) -> None:
+        counts = histogram([0.00005, 0.0001, 0.0003, 2.0], bounds_ms=(0.1, 1.0))
+
+        self.assertEqual(counts, [2, 1, 1])
+
+    def test_compare_ignores_operations_missing_from_the_baseline(self) -> None:
+        self.assertEqual(compare(_document(new_op=_stats(9.0, 9.0, 1.0)), _document(), tolerance=0.0), [])
+
+
+class TestDataset(unittest.TestCase):
+    def test_distributions_keep_the_requested_mean(self) -> None:
+        for distribution in DISTRIBUTIONS:
+            counts = entries_per_day(distribution, 5.0, 5000, random.Random(1))
+            self.assertAlmostEqual(sum(counts) / len(counts), 5.0, delta=0.5, msg=distribution)
+        bursty = entries_per_day("bursty", 5.0, 5000, random.Random(1))
+        self.assertGreater(bursty.count(0), 2000)
+
+    def test_generate_dataset_creates_users_and_history(self) -> None:
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        spec = DatasetSpec(users=3, days=20, entries_per_day=2.0)
+
+        dataset = generate_dataset(conn, spec)
+
+        self.assertEqual(len(dataset.user_ids), 3)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 3)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM meal_entries").fetchone()[0], dataset.entries)
+        self.assertEqual(conn.execute("SELECT SUM(entry_count) FROM daily_totals").fetchone()[0], dataset.entries)
+        conn.close()
+
+
+class TestLoadMeals(unittest.TestCase):
+    def test_concurrent_users_run_the_mix_without_errors(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = Path(tmp_dir) / "load.sqlite"
+            conn = connect(db_path)
+            spec = DatasetSpec(users=3, days=10, entries_per_day=1.0)
+            dataset = generate_dataset(conn, spec)
+            conn.close()
+            settings = LoadSettings(
+                db_path=db_path,
+                profile=STORAGE_PROFILES["balanced"],
+                duration_s=0.3,
+                think_s=0.0,
+                catalog_latency_s=0.0,
+                today=spec.end,
+                history_days=spec.days,
+            )
+
+            report = run_level(settings, dataset.user_ids, "threads")
+
+        self.assertEqual(report.users, 3)
+        self.assertGreater(report.calls, 0)
+        self.assertEqual(report.errors, 0)
+        self.assertEqual(sum(report.histogram), report.calls)
+        self.assertEqual(set(report.by_operation) - set(OPERATION_MIX), set())
+
+
+class TestOffStub(unittest.TestCase):
+    def test_client_talks_to_the_stub(self) -> None:
+        client = OpenFoodFactsClient()
+        with serve_products() as base_url:
+            client.BASE_URL = base_url
+            product = client.get_product_by_barcode("8000000000001")
+            with self.assertRaises(ProductNotFoundError):
+                client.get_product_by_barcode("4040000000000")
+        client.close()
+
+        self.assertEqual(product.name, "Stub product 8000000000001")
+        self.assertGreater(product.nutrients_per_100g.kcal, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from datetime import date
+
+import numpy as np
+
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.nutrients_batch import NutrientsBatch
+
+
+def _batch() -> NutrientsBatch:
+    return NutrientsBatch.from_nutrients(
+        [Nutrients(100, 1, 2, 3), Nutrients(50, 2, 0, 1), Nutrients(200, 10, 20, 5)],
+        [date(2025, 1, 3), date(2025, 1, 1), date(2025, 1, 3)],
+    )
+
+
+class TestNutrientsBatch(unittest.TestCase):
+    def test_sum_matches_adding_nutrients(self) -> None:
+        self.assertEqual(_batch().sum(), Nutrients(350, 13, 22, 9))
+        self.assertEqual(NutrientsBatch.empty().sum(), Nutrients.zero())
+
+    def test_scale_by_scalar_and_per_row(self) -> None:
+        batch = _batch()
+
+        self.assertEqual(batch.scale(2).row(0), Nutrients(200, 2, 4, 6))
+        per_row = batch.scale(np.array([0.5, 1.0, 0.1]))
+        self.assertEqual(per_row.row(0), Nutrients(50, 0.5, 1, 1.5))
+        self.assertEqual(per_row.row(2).kcal, 20)
+        self.assertEqual(batch.row(0), Nutrients(100, 1, 2, 3))
+
+    def test_sum_by_day_keeps_only_logged_days_in_order(self) -> None:
+        by_day = _batch().sum_by_day().to_list()
+
+        self.assertEqual(
+            by_day,
+            [(date(2025, 1, 1), Nutrients(50, 2, 0, 1)), (date(2025, 1, 3), Nutrients(300, 11, 22, 8))],
+        )
+
+    def test_daily_fills_gaps_and_drops_rows_outside_range(self) -> None:
+        daily = _batch().daily(date(2025, 1, 2), date(2025, 1, 4))
+
+        self.assertEqual([d for d, _ in daily.to_list()], [date(2025, 1, 2), date(2025, 1, 3), date(2025, 1, 4)])
+        self.assertEqual(list(daily.kcal), [0, 300, 0])
+        with self.assertRaises(ValueError):
+            _batch().daily(date(2025, 1, 4), date(2025, 1, 2))
+
+    def test_rolling_sum_and_mean(self) -> None:
+        daily = _batch().daily(date(2025, 1, 1), date(2025, 1, 4))
+
+        self.assertEqual(list(daily.rolling_sum(2).kcal), [50, 50, 300, 300])
+        np.testing.assert_allclose(daily.rolling_mean(3).kcal, [50, 25, 350 / 3, 100])
+        with self.assertRaises(ValueError):
+            daily.rolling_sum(0)
+
+    def test_from_rows_and_concat(self) -> None:
+        day = date(2025, 1, 1).toordinal()
+        first = NutrientsBatch.from_rows([(day, 10, 1, 1, 1)])
+        second = NutrientsBatch.from_rows([(day, 5, 0, 0, 0), (day + 1, 1, 0, 0, 0)])
+
+        joined = NutrientsBatch.concat([first, second])
+
+        self.assertEqual(len(joined), 3)
+        self.assertEqual(joined.sum_by_day().to_list()[0], (date(2025, 1, 1), Nutrients(15, 1, 1, 1)))
+
+    def test_day_operations_need_days(self) -> None:
+        batch = NutrientsBatch.from_nutrients([Nutrients(1, 0, 0, 0)])
+
+        self.assertEqual(batch.sum(), Nutrients(1, 0, 0, 0))
+        with self.assertRaises(ValueError):
+            batch.sum_by_day()
+
+
+if __name__ == "__main__":
+    unittest.main()
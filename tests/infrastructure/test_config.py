@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from havij.infrastructure.config import STORAGE_PROFILES, AppConfig, StorageProfile, load_config
+from havij.infrastructure.persistence.sqlite_db import connect
+
+
+class TestStorageProfile(unittest.TestCase):
+    def test_default_profile_is_safe(self) -> None:
+        with patch.dict(os.environ, {}, clear=True):
+            cfg = load_config()
+
+        self.assertEqual(cfg.storage, STORAGE_PROFILES["safe"])
+        self.assertEqual((cfg.storage.journal_mode, cfg.storage.synchronous), ("delete", "full"))
+        self.assertEqual(AppConfig(db_path=Path("app.sqlite")).storage, STORAGE_PROFILES["safe"])
+
+    def test_env_selects_profile_and_overrides_fields(self) -> None:
+        env = {"DB_PROFILE": "fast", "DB_SYNCHRONOUS": "NORMAL", "DB_BUSY_TIMEOUT_MS": "250"}
+        with patch.dict(os.environ, env, clear=True):
+            profile = load_config().storage
+
+        self.assertEqual(profile.synchronous, "normal")
+        self.assertEqual(profile.busy_timeout_ms, 250)
+        self.assertEqual(profile.cache_size, STORAGE_PROFILES["fast"].cache_size)
+
+    def test_invalid_values_are_rejected(self) -> None:
+        with patch.dict(os.environ, {"DB_PROFILE": "turbo"}, clear=True):
+            with self.assertRaises(ValueError):
+                load_config()
+        with self.assertRaises(ValueError):
+            StorageProfile(synchronous="sometimes")
+
+    def test_connect_applies_profile(self) -> None:
+        profile = StorageProfile(synchronous="off", cache_size=-1024, temp_store="memory", busy_timeout_ms=1234)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            conn = connect(Path(tmp_dir) / "t.sqlite", profile=profile)
+            try:
+                for name, expected in (
+                    ("journal_mode", "wal"),
+                    ("synchronous", 0),
+                    ("cache_size", -1024),
+                    ("temp_store", 2),
+                    ("busy_timeout", 1234),
+                ):
+                    self.assertEqual(conn.execute(f"PRAGMA {name}").fetchone()[0], expected, name)
+            finally:
+                conn.close()
+
+    def test_connect_without_profile_keeps_sqlite_defaults(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            conn = connect(Path(tmp_dir) / "t.sqlite")
+            try:
+                self.assertIsInstance(conn, sqlite3.Connection)
+                self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+            finally:
+                conn.close()
@@ -0,0 +1,94 @@
+import tempfile
+import unittest
+from dataclasses import replace
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+from havij.domain.model.nutrients import Nutrients
+from havij.infrastructure import container as container_module
+from havij.infrastructure.config import AppConfig
+from havij.infrastructure.container import build_container, get_container, reset_container
+
+
+class TestServiceContainer(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.cfg = AppConfig(db_path=Path(self._tmp_dir.name) / "app.sqlite", session_secret="test-secret")
+
+    def tearDown(self) -> None:
+        reset_container()
+        self._tmp_dir.cleanup()
+
+    def test_built_services_share_the_database(self) -> None:
+        c = build_container(self.cfg)
+        try:
+            profile = c.user_service.signup("alice", "pw")
+            c.meal_service.add_entry(
+                user_id=profile.user_id,
+                day=date(2025, 1, 1),
+                product_name="Oats",
+                grams=50,
+                nutrients_per_100g=Nutrients(380, 13, 60, 7),
+            )
+
+            self.assertEqual(c.user_service.count_users(), 1)
+            self.assertEqual(c.meal_service.get_day_totals(profile.user_id, date(2025, 1, 1)).kcal, 190)
+        finally:
+            c.close()
+
+    def test_group_commit_routes_writes_through_the_writer(self) -> None:
+        c = build_container(replace(self.cfg, group_commit_max_batch=8))
+        try:
+            profile = c.user_service.signup("alice", "pw")
+            c.meal_service.add_entry(
+                user_id=profile.user_id,
+                day=date(2025, 1, 1),
+                product_name="Oats",
+                grams=50,
+                nutrients_per_100g=Nutrients(380, 13, 60, 7),
+            )
+
+            self.assertEqual(c.meal_service.get_day_totals(profile.user_id, date(2025, 1, 1)).kcal, 190)
+            assert c.writer is not None
+            self.assertEqual(c.writer.stats().operations, 2)
+        finally:
+            c.close()
+
+    def test_sharded_storage_keeps_user_data_out_of_the_main_file(self) -> None:
+        c = build_container(replace(self.cfg, sharding="hash", shard_count=2))
+        try:
+            profile = c.user_service.signup("alice", "pw")
+            c.meal_service.add_entry(
+                user_id=profile.user_id,
+                day=date(2025, 1, 1),
+                product_name="Oats",
+                grams=50,
+                nutrients_per_100g=Nutrients(380, 13, 60, 7),
+            )
+
+            self.assertEqual(c.user_service.count_users(), 1)
+            self.assertEqual(c.meal_service.get_day_totals(profile.user_id, date(2025, 1, 1)).kcal, 190)
+            main = c.connections.get()
+            self.assertEqual(main.execute("SELECT COUNT(*) FROM meal_entries").fetchone()[0], 0)
+            assert c.shards is not None
+            self.assertEqual(c.shards.layout.root, self.cfg.db_path.parent / "shards")
+        finally:
+            c.close()
+        with self.assertRaises(ValueError):
+            build_container(replace(self.cfg, sharding="hash", group_commit_max_batch=8))
+
+    def test_missing_session_secret_is_logged(self) -> None:
+        with self.assertLogs(container_module.logger, "WARNING") as logs:
+            build_container(replace(self.cfg, session_secret="")).close()
+
+        self.assertIn("SESSION_SECRET", logs.output[0])
+
+    def test_get_container_builds_once(self) -> None:
+        with patch.object(container_module, "load_config", return_value=self.cfg), \
+                patch.object(container_module, "build_container", wraps=build_container) as build:
+            first = get_container()
+            second = get_container()
+
+        self.assertIs(first, second)
+        build.assert_called_once_with(self.cfg)
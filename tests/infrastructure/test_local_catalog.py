@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+import sqlite3
+import unittest
+from unittest.mock import Mock
+
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.product import Product
+from havij.infrastructure.api.openfoodfacts_client import ProductNotFoundError
+from havij.infrastructure.persistence.local_catalog import LocalProductCatalog, import_dump, import_rows
+from havij.infrastructure.persistence.sqlite_db import init_schema
+
+
+def _jsonl(*docs: dict) -> io.StringIO:
+    return io.StringIO("".join(json.dumps(d) + "\n" for d in docs))
+
+
+class TestLocalProductCatalog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        init_schema(self.conn)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def test_import_jsonl_dump_and_lookup(self) -> None:
+        stream = _jsonl(
+            {
+                "code": "123",
+                "product_name": "Greek Yogurt",
+                "brands": "Fage",
+                "nutriments": {"energy-kcal_100g": 97, "proteins_100g": 9, "carbohydrates_100g": 4, "fat_100g": 5},
+            },
+            {"code": "456", "product_name_en": "Oats", "nutriments": {"energy-kcal": "379"}},
+            {"code": "not-a-barcode", "product_name": "Broken"},
+            {"code": "789"},
+        )
+
+        stats = import_dump(self.conn, stream, "jsonl", batch_size=2)
+
+        self.assertEqual((stats.rows, stats.skipped), (2, 2))
+        catalog = LocalProductCatalog(self.conn)
+        self.assertEqual(
+            catalog.get_by_barcode("123"),
+            Product("123", "Greek Yogurt", Nutrients(97, 9, 4, 5)),
+        )
+        self.assertEqual(catalog.get_by_barcode("456").nutrients_per_100g.kcal, 379)
+
+    def test_malformed_jsonl_records_are_skipped(self) -> None:
+        stream = io.StringIO(
+            '["not", "a", "product"]\n'
+            '"just a string"\n'
+            '{"code": "111", "product_name": 42}\n'
+            '{"code": "222", "product_name": "Rice", "nutriments": [1, 2]}\n'
+            '{"code": "333", "product_name": "Bread"}\n'
+        )
+
+        stats = import_dump(self.conn, stream, "jsonl")
+
+        self.assertEqual((stats.rows, stats.skipped), (2, 3))
+        self.assertEqual(LocalProductCatalog(self.conn).get_by_barcode("222").nutrients_per_100g.kcal, 0)
+
+    def test_import_csv_dump_upserts_existing_rows(self) -> None:
+        header = "code\tproduct_name\tbrands\tenergy-kcal_100g\tproteins_100g\tcarbohydrates_100g\tfat_100g\n"
+        limit = csv.field_size_limit()
+        import_dump(self.conn, io.StringIO(header + "123\tOld name\t\t100\t1\t2\t3\n"), "csv")
+        import_dump(self.conn, io.StringIO(header + "123\tNew \"name\"\tAcme\t120\t1\t2\t3\n"), "csv")
+
+        product = LocalProductCatalog(self.conn).get_by_barcode("123")
+
+        self.assertEqual(product.name, 'New "name"')
+        self.assertEqual(product.nutrients_per_100g.kcal, 120)
+        self.assertEqual(csv.field_size_limit(), limit)
+
+    def test_non_finite_or_negative_nutrients_are_skipped(self) -> None:
+        header = "code\tproduct_name\tbrands\tenergy-kcal_100g\tproteins_100g\tcarbohydrates_100g\tfat_100g\n"
+        rows = (
+            "111\tOats\t\t379\t13\t60\t7\n"
+            "222\tBroken\t\tnan\t1\t2\t3\n"
+            "333\tBroken\t\t100\tinf\t2\t3\n"
+            "444\tBroken\t\t100\t1\t-2\t3\n"
+        )
+
+        stats = import_dump(self.conn, io.StringIO(header + rows), "csv")
+
+        self.assertEqual((stats.rows, stats.skipped), (1, 3))
+
+    def test_missing_barcode_uses_fallback_or_raises(self) -> None:
+        with self.assertRaises(ProductNotFoundError):
+            LocalProductCatalog(self.conn).get_by_barcode("999")
+
+        remote = Mock()
+        remote.get_by_barcode.return_value = Product("999", "Remote", Nutrients.zero())
+        self.assertEqual(LocalProductCatalog(self.conn, fallback=remote).get_by_barcode("999").name, "Remote")
+
+    def test_unknown_format_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            import_dump(self.conn, io.StringIO(""), "xml")
+
+    def test_search_matches_prefixes_of_names_and_brands(self) -> None:
+        import_rows(self.conn, [
+            ("1", "Greek Yogurt", "Fage", 97, 9, 4, 5),
+            ("2", "Greek Yogurt Honey", "Total", 120, 8, 15, 5),
+            ("3", "Yogurt Drink", "Greekland", 60, 3, 8, 1),
+            ("4", "Orange Juice", "Acme", 45, 1, 10, 0),
+        ])
+        catalog = LocalProductCatalog(self.conn)
+
+        self.assertEqual([p.barcode for p in catalog.search("greek yog", 10)][:2], ["1", "2"])
+        self.assertEqual({p.barcode for p in catalog.search("greek yog", 10)}, {"1", "2", "3"})
+        self.assertEqual([p.barcode for p in catalog.search("fag", 10)], ["1"])
+        self.assertEqual([p.barcode for p in catalog.search("orange j", 10)], ["4"])
+        self.assertEqual(len(catalog.search("yogurt", 2)), 2)
+        self.assertEqual(catalog.search("  ", 10), [])
+
+    def test_search_index_follows_direct_writes(self) -> None:
+        import_rows(self.conn, [("1", "Greek Yogurt", "Fage", 97, 9, 4, 5)])
+        with self.conn:
+            self.conn.execute("UPDATE catalog_products SET name = 'Skyr' WHERE barcode = '1'")
+            self.conn.execute(
+                "INSERT INTO catalog_products VALUES ('2', 'Greek Salad', '', 80, 3, 5, 6)"
+            )
+        catalog = LocalProductCatalog(self.conn)
+
+        self.assertEqual([p.barcode for p in catalog.search("greek", 10)], ["2"])
+        self.assertEqual([p.barcode for p in catalog.search("skyr", 10)], ["1"])
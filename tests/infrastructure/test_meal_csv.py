@@ -0,0 +1,77 @@
+import io
+import sqlite3
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+
+from havij.application.services.meal_service import MealService
+from havij.infrastructure.meal_csv import import_meal_csv
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.sqlite_db import init_schema
+
+_HEADER = "day,time,product_name,grams,kcal_per_100g,protein_per_100g,carbs_per_100g,fat_per_100g,barcode\n"
+
+
+class TestMealCsvImport(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(str(Path(self._tmp_dir.name) / "t.sqlite"))
+        self.conn.row_factory = sqlite3.Row
+        init_schema(self.conn)
+        self.repo = SqliteDayLogRepository(self.conn)
+        self.service = MealService(self.repo)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        self._tmp_dir.cleanup()
+
+    def test_imports_valid_rows_in_chunks_and_reports_bad_lines(self) -> None:
+        csv_text = _HEADER + (
+            "2025-01-01,08:30,Oats,50,380,13,60,7,123\n"
+            "2025-01-01,12:00,Soup,0,40,2,5,1,\n"
+            "2025-01-02,,Apple,150,52,0.3,14,0.2,\n"
+            "not-a-day,09:00,Pear,100,57,0.4,15,0.1,\n"
+            "2025-01-02,19:00,Rice,200,130,2.7,28,0.3,456\n"
+            "2025-01-02,20:00,Tea,abc,1,0,0,0,\n"
+        )
+
+        stats = import_meal_csv(self.service, "user-1", io.StringIO(csv_text), chunk_size=2)
+
+        self.assertEqual(stats.rows, 3)
+        self.assertEqual([e.line for e in stats.errors], [3, 5, 7])
+        self.assertEqual(stats.errors[0].message, "grams must be > 0")
+        self.assertIn("grams must be a number", stats.errors[2].message)
+
+        day1 = self.repo.load_day(date(2025, 1, 1), "user-1")
+        self.assertEqual([(e.product_name, e.barcode) for e in day1.entries], [("Oats", "123")])
+        self.assertEqual(day1.entries[0].timestamp, datetime(2025, 1, 1, 8, 30))
+        self.assertAlmostEqual(day1.entries[0].nutrients.kcal, 190)
+        day2 = self.repo.load_day(date(2025, 1, 2), "user-1")
+        self.assertEqual([e.product_name for e in day2.entries], ["Apple", "Rice"])
+        self.assertEqual(day2.entries[0].timestamp, datetime(2025, 1, 2, 0, 0))
+
+    def test_non_finite_numbers_are_reported_per_line(self) -> None:
+        csv_text = _HEADER + (
+            "2025-01-01,08:30,Oats,50,380,13,60,7,123\n"
+            "2025-01-01,09:00,Milk,nan,64,3.3,4.8,3.6,\n"
+            "2025-01-01,10:00,Bread,80,inf,9,49,3.2,\n"
+        )
+
+        stats = import_meal_csv(self.service, "user-1", io.StringIO(csv_text))
+
+        self.assertEqual(stats.rows, 1)
+        self.assertEqual([e.line for e in stats.errors], [3, 4])
+        self.assertIn("grams must be a finite number", stats.errors[0].message)
+        self.assertIn("kcal_per_100g must be a finite number", stats.errors[1].message)
+        self.assertEqual([e.product_name for e in self.repo.load_day(date(2025, 1, 1), "user-1").entries], ["Oats"])
+
+    def test_missing_columns_are_rejected_before_writing(self) -> None:
+        with self.assertRaises(ValueError):
+            import_meal_csv(self.service, "user-1", io.StringIO("day,product_name,grams\n2025-01-01,X,1\n"))
+
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM meal_entries").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import unittest
+from datetime import date, datetime
+
+from havij.domain.model.meal import MealEntry
+from havij.domain.model.nutrients import Nutrients
+from havij.infrastructure.meal_export import EXPORT_COLUMNS, export_csv, export_entries, export_jsonl, export_parquet
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pq = None
+
+
+def _entries(n: int):
+    for i in range(n):
+        day = date(2025, 1, 1 + i % 3)
+        yield day, MealEntry(
+            entry_id=f"e{i}",
+            timestamp=datetime(day.year, day.month, day.day, 8 + i % 10),
+            barcode="123",
+            product_name=f"Food {i}",
+            grams=100.0,
+            nutrients=Nutrients(100.0 + i, 1.0, 2.0, 3.0),
+        )
+
+
+class TestMealExport(unittest.TestCase):
+    def test_csv_has_header_and_one_row_per_entry(self) -> None:
+        out = io.StringIO()
+
+        self.assertEqual(export_csv(_entries(3), out), 3)
+
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(tuple(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual([r["entry_id"] for r in rows], ["e0", "e1", "e2"])
+        self.assertEqual(rows[1]["day"], "2025-01-02")
+        self.assertEqual(rows[1]["timestamp"], "2025-01-02T09:00:00")
+        self.assertEqual(float(rows[2]["kcal"]), 102.0)
+
+    def test_jsonl_consumes_entries_lazily(self) -> None:
+        out = io.StringIO()
+        source = _entries(5)
+
+        self.assertEqual(export_jsonl(source, out), 5)
+        self.assertEqual(list(source), [])
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[4]["product_name"], "Food 4")
+        self.assertEqual(records[4]["day"], "2025-01-02")
+
+    def test_unknown_format_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            export_entries("xlsx", _entries(1), io.StringIO())
+
+    @unittest.skipIf(pq is None, "pyarrow not installed")
+    def test_parquet_writes_row_groups(self) -> None:
+        out = io.BytesIO()
+
+        self.assertEqual(export_parquet(_entries(5), out, row_group_size=2), 5)
+
+        parquet = pq.ParquetFile(io.BytesIO(out.getvalue()))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        table = parquet.read()
+        self.assertEqual(table.column("entry_id").to_pylist(), [f"e{i}" for i in range(5)])
+        self.assertEqual(table.column("day").to_pylist()[1], date(2025, 1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
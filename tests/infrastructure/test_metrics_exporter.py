@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+import requests
+
+from havij.application.metrics import MetricsRegistry
+from havij.domain.model.nutrients import Nutrients
+from havij.infrastructure.config import AppConfig
+from havij.infrastructure.container import build_container
+from havij.infrastructure.metrics_exporter import MetricsFileWriter, MetricsServer
+
+
+class TestMetricsExporter(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.registry = MetricsRegistry()
+        self.registry.observe("user_repository", "count_users", 0.002)
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def test_server_exposes_metrics(self) -> None:
+        server = MetricsServer(self.registry, port=0)
+        try:
+            ok = requests.get(f"http://127.0.0.1:{server.port}/metrics", timeout=5)
+            missing = requests.get(f"http://127.0.0.1:{server.port}/other", timeout=5)
+        finally:
+            server.close()
+
+        self.assertEqual(ok.status_code, 200)
+        self.assertTrue(ok.headers["Content-Type"].startswith("text/plain"))
+        self.assertIn('havij_port_calls_total{port="user_repository",method="count_users"} 1', ok.text)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_file_writer_dumps_on_close(self) -> None:
+        path = Path(self._tmp_dir.name) / "metrics" / "havij.prom"
+        writer = MetricsFileWriter(self.registry, path, interval_s=60)
+        self.registry.observe("user_repository", "count_users", 0.002)
+        writer.close()
+
+        self.assertIn('method="count_users"} 2', path.read_text(encoding="utf-8"))
+
+    def test_container_instruments_the_ports_when_enabled(self) -> None:
+        path = Path(self._tmp_dir.name) / "havij.prom"
+        cfg = AppConfig(db_path=Path(self._tmp_dir.name) / "app.sqlite", metrics_file=str(path))
+        c = build_container(cfg)
+        try:
+            profile = c.user_service.signup("alice", "pw")
+            c.meal_service.add_entry(profile.user_id, date(2025, 1, 1), "Oats", 50, Nutrients(380, 13, 60, 7))
+            c.user_service.authenticate("alice", "pw")
+        finally:
+            c.close()
+
+        text = path.read_text(encoding="utf-8")
+        self.assertIn('havij_port_calls_total{port="user_repository",method="create_user"} 1', text)
+        self.assertIn('havij_port_calls_total{port="day_log_repository",method="append_entry"} 1', text)
+        self.assertIn('havij_cache_hit_ratio{cache="product_lru"}', text)
+        self.assertIn('havij_cache_hit_ratio{cache="product_prefetch"}', text)
+        self.assertIn('havij_port_calls_total{port="day_log_repository",method="barcode_usage"} 1', text)
+
+    def test_container_skips_instrumentation_when_disabled(self) -> None:
+        c = build_container(AppConfig(db_path=Path(self._tmp_dir.name) / "app.sqlite"))
+        c.close()
+
+        self.assertIsNone(c.metrics)
+        self.assertEqual(c.metrics_exporters, ())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+import sqlite3
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from havij.domain.model.meal import MealEntry
+from havij.domain.model.nutrients import Nutrients
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.migrations import (
+    SCHEMA_VERSION,
+    Migration,
+    SchemaVersionError,
+    has_legacy_meal_entries,
+    migrate,
+    migrate_meal_entries_to_compact,
+    schema_version,
+)
+from havij.infrastructure.persistence.sqlite_db import init_schema
+
+_LEGACY_INSERT = "INSERT INTO meal_entries VALUES(?, ?, ?, ?, ?, ?, 100.0, ?, 1.0, 2.0, 3.0)"
+
+
+def _create_legacy_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(
+        """
+        CREATE TABLE meal_entries (
+            entry_id TEXT PRIMARY KEY,
+            user_id TEXT,
+            day TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            barcode TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            grams REAL NOT NULL,
+            kcal REAL NOT NULL,
+            protein_g REAL NOT NULL,
+            carbs_g REAL NOT NULL,
+            fat_g REAL NOT NULL
+        );
+        CREATE INDEX idx_meal_entries_user_day ON meal_entries(user_id, day);
+        CREATE TABLE daily_totals (
+            user_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            kcal REAL NOT NULL,
+            protein_g REAL NOT NULL,
+            carbs_g REAL NOT NULL,
+            fat_g REAL NOT NULL,
+            entry_count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day)
+        );
+        """
+    )
+    conn.executemany(
+        _LEGACY_INSERT,
+        [
+            ("e1", "user-1", "2025-01-01", "2025-01-01T08:00:00", "111", "Oats", 100.0),
+            ("e2", "user-1", "2025-01-01", "2025-01-01T12:30:15.250000", "111", "Oats", 200.0),
+            ("e3", "user-1", "2025-01-02", "2025-01-02T09:00:00+01:00", "222", "Rice", 50.0),
+            ("e4", "user-2", "2025-01-02", "2025-01-02T10:00:00", "111", "Oats", 70.0),
+        ],
+    )
+    conn.execute("INSERT INTO daily_totals VALUES('user-1', '2025-01-01', 300.0, 2.0, 4.0, 6.0, 2)")
+    conn.commit()
+
+
+class TestCompactMigration(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(str(Path(self._tmp_dir.name) / "t.sqlite"))
+        self.conn.row_factory = sqlite3.Row
+        _create_legacy_schema(self.conn)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        self._tmp_dir.cleanup()
+
+    def test_init_schema_migrates_legacy_rows(self) -> None:
+        init_schema(self.conn)
+
+        self.assertFalse(has_legacy_meal_entries(self.conn))
+        repo = SqliteDayLogRepository(self.conn)
+        day1 = repo.load_day(date(2025, 1, 1), "user-1")
+        self.assertEqual([e.entry_id for e in day1.entries], ["e1", "e2"])
+        self.assertEqual(day1.entries[1].timestamp, datetime(2025, 1, 1, 12, 30, 15, 250000))
+        self.assertEqual(day1.entries[1].product_name, "Oats")
+        self.assertEqual(day1.entries[1].barcode, "111")
+        day2 = repo.load_day(date(2025, 1, 2), "user-1")
+        # Aware timestamps come back as their UTC wall-clock time.
+        self.assertEqual(day2.entries[0].timestamp, datetime(2025, 1, 2, 8, 0))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM meal_products").fetchone()[0], 2)
+        self.assertEqual(
+            repo.totals_between("user-1", date(2025, 1, 1), date(2025, 1, 1)),
+            [(date(2025, 1, 1), Nutrients(300, 2, 4, 6))],
+        )
+        self.assertEqual(
+            [(i.barcode, i.uses) for i in repo.quick_add_candidates("user-1", 5)],
+            [("111", 2), ("222", 1)],
+        )
+
+    def test_upgrade_fills_the_user_directory(self) -> None:
+        self.conn.executescript(
+            """
+            CREATE TABLE users (
+                user_id TEXT PRIMARY KEY,
+                username TEXT NOT NULL UNIQUE,
+                password_hash TEXT NOT NULL,
+                salt TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            INSERT INTO users VALUES('user-1', 'alice', 'h', 's', '2025-01-01T00:00:00');
+            INSERT INTO users VALUES('user-2', 'bob', 'h', 's', '2025-01-01T00:00:00');
+            """
+        )
+
+        init_schema(self.conn)
+
+        rows = self.conn.execute("SELECT username, user_id FROM user_directory ORDER BY username").fetchall()
+        self.assertEqual([tuple(r) for r in rows], [("alice", "user-1"), ("bob", "user-2")])
+
+    def test_writes_during_migration_are_mirrored(self) -> None:
+        def legacy_writes(copied: int) -> None:
+            if copied == 1:
+                # e1 is already copied, e2-e4 are not.
+                self.conn.execute(_LEGACY_INSERT, ("e5", "user-1", "2025-01-03", "2025-01-03T07:00:00", "333", "Egg", 80.0))
+                self.conn.execute("UPDATE meal_entries SET kcal = 999.0 WHERE entry_id = 'e3'")
+                self.conn.execute("UPDATE meal_entries SET kcal = 111.0 WHERE entry_id = 'e1'")
+                self.conn.execute("DELETE FROM meal_entries WHERE entry_id = 'e4'")
+                self.conn.commit()
+
+        copied = migrate_meal_entries_to_compact(self.conn, batch_size=1, on_batch=legacy_writes)
+
+        # e3 and e5 were mirrored by the triggers before their batch came up.
+        self.assertEqual(copied, 2)
+        rows = {
+            r["entry_id"]: r["kcal"]
+            for r in self.conn.execute("SELECT entry_id, kcal FROM meal_entries")
+        }
+        self.assertEqual(rows, {"e1": 111.0, "e2": 200.0, "e3": 999.0, "e5": 80.0})
+        triggers = self.conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'").fetchone()[0]
+        self.assertEqual(triggers, 0)
+
+    def test_timestamps_round_trip_exactly(self) -> None:
+        init_schema(self.conn)
+        repo = SqliteDayLogRepository(self.conn)
+        day = date(2025, 3, 1)
+        stamps = [
+            datetime(2025, 3, 1, 23, 59, 59, 999999),
+            datetime(1969, 12, 31, 23, 0, 0, 1),
+            datetime(2025, 3, 1, 1, 0, tzinfo=timezone(timedelta(hours=-5))),
+        ]
+        for i, ts in enumerate(stamps):
+            repo.append_entry(
+                day,
+                MealEntry(
+                    entry_id=f"n{i}", timestamp=ts, barcode="", product_name="X", grams=1.0, nutrients=Nutrients.zero()
+                ),
+                "user-3",
+            )
+
+        loaded = [e.timestamp for e in repo.load_day(day, "user-3").entries]
+
+        self.assertEqual(loaded, [stamps[1], datetime(2025, 3, 1, 6, 0), stamps[0]])
+
+
+def _create_table(name: str) -> Callable[[sqlite3.Connection], None]:
+    def apply(conn: sqlite3.Connection) -> None:
+        conn.execute(f"CREATE TABLE {name}(x)")
+
+    return apply
+
+
+class TestSchemaVersions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def test_init_schema_records_the_version_and_skips_when_current(self) -> None:
+        init_schema(self.conn)
+        self.assertEqual(schema_version(self.conn), SCHEMA_VERSION)
+
+        statements: list[str] = []
+        self.conn.set_trace_callback(statements.append)
+        init_schema(self.conn)
+
+        self.assertEqual(statements, ["PRAGMA user_version;"])
+
+    def test_migrate_applies_pending_versions_in_order(self) -> None:
+        migrations = tuple(Migration(i + 1, name, _create_table(name)) for i, name in enumerate("abc"))
+
+        self.assertEqual(migrate(self.conn, migrations[:2]), [1, 2])
+        self.assertEqual(migrate(self.conn, migrations), [3])
+        self.assertEqual(migrate(self.conn, migrations), [])
+        self.assertEqual(schema_version(self.conn), 3)
+        tables = [r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY rowid")]
+        self.assertEqual(tables, ["a", "b", "c"])
+
+    def test_failed_migration_leaves_the_previous_version(self) -> None:
+        def broken(conn: sqlite3.Connection) -> None:
+            conn.execute("CREATE TABLE half_done(x)")
+            raise sqlite3.OperationalError("boom")
+
+        migrations = (
+            Migration(1, "ok", _create_table("ok")),
+            Migration(2, "broken", broken),
+        )
+
+        with self.assertRaises(sqlite3.OperationalError):
+            migrate(self.conn, migrations)
+
+        self.assertEqual(schema_version(self.conn), 1)
+        tables = {r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertEqual(tables, {"ok"})
+
+    def test_newer_database_is_rejected(self) -> None:
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+
+        with self.assertRaises(SchemaVersionError):
+            init_schema(self.conn)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,27 @@
+import gzip
+import importlib.util
+import json
+import sqlite3
+import threading
+import time
 import unittest
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Tuple
 from unittest.mock import patch
 
-from havij.infrastructure.api.openfoodfacts_client import OpenFoodFactsClient
+from havij.infrastructure.api.async_openfoodfacts_client import AsyncOpenFoodFactsClient
+from havij.infrastructure.api.catalog_adapter import OpenFoodFactsCatalog
+from havij.infrastructure.api.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from havij.infrastructure.api.openfoodfacts_client import (
+    CircuitOpenError,
+    OpenFoodFactsClient,
+    ProductNotFoundError,
+    UpstreamUnavailableError,
+)
+from havij.infrastructure.persistence.product_cache import SqliteProductCache
+from havij.infrastructure.persistence.sqlite_db import init_schema
+from tests.support import FakeClock
 
 
 class FakeResp:
@@ -36,3 +56,239 @@ class TestOpenFoodFactsClient(unittest.TestCase):
         self.assertEqual(p.name, "Test Product")
         self.assertEqual(p.nutrients_per_100g.kcal, 200)
         self.assertEqual(p.nutrients_for_grams(50).kcal, 100)
+
+
+_PRODUCT = {
+    "product": {
+        "product_name": "Stub Oats",
+        "nutriments": {"energy-kcal_100g": 380, "proteins_100g": 13, "carbohydrates_100g": 60, "fat_100g": 7},
+    }
+}
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        # (status, delay_s) per request; the last one repeats.
+        self.script: List[Tuple[int, float]] = [(200, 0.0)]
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Timed-out clients hang up before a delayed response is written.
+        pass
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: _StubServer
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self.server.requests.append((self.path, dict(self.headers)))
+        script = self.server.script
+        status, delay_s = script.pop(0) if len(script) > 1 else script[0]
+        if delay_s:
+            time.sleep(delay_s)
+        body = json.dumps(_PRODUCT if status == 200 else {"status": 0}).encode("utf-8")
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@contextmanager
+def _stub_server() -> Iterator[_StubServer]:
+    server = _StubServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class TestOpenFoodFactsClientAgainstStub(unittest.TestCase):
+    def setUp(self) -> None:
+        self._server_cm = _stub_server()
+        self.server = self._server_cm.__enter__()
+        self.sleeps: List[float] = []
+        self.clock = FakeClock(1_000.0)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=30, clock=self.clock)
+        self.client = self._client(timeout_s=2.0)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self._server_cm.__exit__(None, None, None)
+
+    def _client(self, **kwargs: Any) -> OpenFoodFactsClient:
+        client = OpenFoodFactsClient(breaker=self.breaker, sleep=self.sleeps.append, **kwargs)
+        client.BASE_URL = f"http://127.0.0.1:{self.server.server_address[1]}/api/v2"
+        return client
+
+    def test_requests_only_the_needed_fields_compressed(self) -> None:
+        product = self.client.get_product_by_barcode("123")
+
+        self.assertEqual(product.name, "Stub Oats")
+        self.assertEqual(product.nutrients_per_100g.kcal, 380)
+        [(path, headers)] = self.server.requests
+        self.assertEqual(path, "/api/v2/product/123?fields=product_name,product_name_en,nutriments")
+        self.assertIn("gzip", headers["Accept-Encoding"])
+
+    def test_retries_server_errors_with_jittered_backoff(self) -> None:
+        self.server.script = [(503, 0.0), (502, 0.0), (200, 0.0)]
+
+        self.assertEqual(self.client.get_product_by_barcode("123").name, "Stub Oats")
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(0 <= self.sleeps[0] <= 0.25 and 0 <= self.sleeps[1] <= 0.5, self.sleeps)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_timeouts_are_retried_then_reported_as_unavailable(self) -> None:
+        self.client.close()
+        self.client = self._client(timeout_s=0.05, max_retries=1)
+        self.server.script = [(200, 0.3)]
+
+        with self.assertRaises(UpstreamUnavailableError):
+            self.client.get_product_by_barcode("123")
+
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_not_found_is_neither_retried_nor_a_breaker_failure(self) -> None:
+        self.server.script = [(404, 0.0)]
+
+        for _ in range(3):
+            with self.assertRaises(ProductNotFoundError):
+                self.client.get_product_by_barcode("123")
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_breaker_fails_fast_while_open_then_recovers(self) -> None:
+        self.client.close()
+        self.client = self._client(max_retries=0)
+        self.server.script = [(500, 0.0), (500, 0.0), (200, 0.0)]
+
+        for _ in range(2):
+            with self.assertRaises(UpstreamUnavailableError):
+                self.client.get_product_by_barcode("123")
+        with self.assertRaises(CircuitOpenError):
+            self.client.get_product_by_barcode("123")
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertEqual(self.client.get_product_by_barcode("123").name, "Stub Oats")
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_cache_serves_stale_products_while_the_api_is_down(self) -> None:
+        self.client.close()
+        self.client = self._client(max_retries=0)
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        init_schema(conn)
+        cache = SqliteProductCache(OpenFoodFactsCatalog(self.client), conn, ttl_s=10, clock=self.clock)
+        cache.get_by_barcode("123")
+
+        self.clock.now += 60
+        self.server.script = [(503, 0.0)]
+        for _ in range(3):
+            self.assertEqual(cache.get_by_barcode("123").name, "Stub Oats")
+        with self.assertRaises(CircuitOpenError):
+            cache.get_by_barcode("999")
+
+        # Two failed fetches opened the breaker; the third lookup never left the process.
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(cache.stats().stale_hits, 3)
+        conn.close()
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp not installed")
+class TestAsyncOpenFoodFactsClientAgainstStub(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self._server_cm = _stub_server()
+        self.server = self._server_cm.__enter__()
+        self.sleeps: List[float] = []
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=30)
+
+    def tearDown(self) -> None:
+        self._server_cm.__exit__(None, None, None)
+
+    def _client(self, **kwargs: Any) -> AsyncOpenFoodFactsClient:
+        async def record_sleep(delay: float) -> None:
+            self.sleeps.append(delay)
+
+        client = AsyncOpenFoodFactsClient(breaker=self.breaker, sleep=record_sleep, **kwargs)
+        client.BASE_URL = f"http://127.0.0.1:{self.server.server_address[1]}/api/v2"
+        return client
+
+    async def test_fetches_projected_fields_compressed(self) -> None:
+        async with self._client() as client:
+            product = await client.get_product_by_barcode("123")
+
+        self.assertEqual(product.name, "Stub Oats")
+        [(path, headers)] = self.server.requests
+        self.assertEqual(path, "/api/v2/product/123?fields=product_name,product_name_en,nutriments")
+        self.assertIn("gzip", headers["Accept-Encoding"])
+
+    async def test_retries_then_reports_not_found(self) -> None:
+        self.server.script = [(503, 0.0), (404, 0.0)]
+
+        async with self._client() as client:
+            with self.assertRaises(ProductNotFoundError):
+                await client.get_product_by_barcode("123")
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    async def test_timeouts_open_the_breaker(self) -> None:
+        self.server.script = [(200, 0.3)]
+
+        async with self._client(timeout_s=0.05, max_retries=0) as client:
+            for _ in range(2):
+                with self.assertRaises(UpstreamUnavailableError):
+                    await client.get_product_by_barcode("123")
+            with self.assertRaises(CircuitOpenError):
+                await client.get_product_by_barcode("123")
+
+        self.assertEqual(self.breaker.state, OPEN)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_half_open_allows_a_single_trial(self) -> None:
+        clock = FakeClock(1_000.0)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=5, clock=clock)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        clock.now += 5
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+        clock.now += 5
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
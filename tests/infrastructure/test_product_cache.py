@@ -0,0 +1,63 @@
+import sqlite3
+import unittest
+from unittest.mock import Mock
+
+from havij.domain.model.nutrients import Nutrients
+from havij.domain.model.product import Product
+from havij.infrastructure.api.openfoodfacts_client import ProductNotFoundError
+from havij.infrastructure.persistence.product_cache import SqliteProductCache
+from havij.infrastructure.persistence.sqlite_db import init_schema
+from tests.support import FakeClock
+
+
+class TestSqliteProductCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        init_schema(self.conn)
+        self.clock = FakeClock(1_000.0)
+        self.inner = Mock()
+        self.cache = SqliteProductCache(
+            self.inner, self.conn, ttl_s=100, negative_ttl_s=10, clock=self.clock
+        )
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def test_found_product_is_served_from_cache_until_ttl(self) -> None:
+        product = Product("123", "Bar", Nutrients(200, 10, 20, 5))
+        self.inner.get_by_barcode.return_value = product
+
+        self.assertEqual(self.cache.get_by_barcode("123"), product)
+        self.clock.now += 99
+        self.assertEqual(self.cache.get_by_barcode("123"), product)
+        self.assertEqual(self.inner.get_by_barcode.call_count, 1)
+
+        self.clock.now += 1
+        self.cache.get_by_barcode("123")
+        self.assertEqual(self.inner.get_by_barcode.call_count, 2)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats.hits, stats.negative_hits, stats.misses), (1, 0, 2))
+
+    def test_missing_product_is_remembered_for_negative_ttl(self) -> None:
+        self.inner.get_by_barcode.side_effect = ProductNotFoundError("nope")
+
+        for _ in range(3):
+            with self.assertRaises(ProductNotFoundError):
+                self.cache.get_by_barcode("999")
+        self.assertEqual(self.inner.get_by_barcode.call_count, 1)
+
+        self.clock.now += 10
+        with self.assertRaises(ProductNotFoundError):
+            self.cache.get_by_barcode("999")
+        self.assertEqual(self.inner.get_by_barcode.call_count, 2)
+        self.assertEqual(self.cache.stats().negative_hits, 2)
+
+    def test_other_upstream_errors_are_not_cached(self) -> None:
+        self.inner.get_by_barcode.side_effect = RuntimeError("timeout")
+
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                self.cache.get_by_barcode("123")
+        self.assertEqual(self.inner.get_by_barcode.call_count, 2)
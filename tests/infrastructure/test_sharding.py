@@ -0,0 +1,162 @@
+import sqlite3
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.reshard import reshard
+from havij.infrastructure.persistence.sharding import (
+    ShardConnections,
+    ShardedDayLogRepository,
+    ShardedUserRepository,
+    ShardLayout,
+    shard_index,
+)
+from havij.infrastructure.persistence.sqlite_db import connect, init_schema
+from havij.infrastructure.persistence.user_repository import SqliteUserRepository
+from tests.support import make_entry
+
+_DAY = date(2025, 1, 1)
+_CREATED = datetime(2025, 1, 1)
+
+
+class TestShardLayout(unittest.TestCase):
+    def test_users_map_to_stable_shards(self) -> None:
+        layout = ShardLayout(Path("/data/shards"), count=4)
+
+        self.assertEqual(shard_index("alice", 4), shard_index("alice", 4))
+        self.assertEqual(len({layout.shard_of(f"user-{i}") for i in range(100)}), 4)
+        self.assertRegex(layout.shard_of("alice"), r"^shard-0[0-3]-of-04$")
+        self.assertTrue(layout.holds(Path("/data/shards/shard-01-of-04.sqlite")))
+        self.assertFalse(layout.holds(Path("/data/shards/shard-01-of-08.sqlite")))
+
+        per_user = ShardLayout(Path("/data/shards"), per_user=True)
+        self.assertNotEqual(per_user.shard_of("alice"), per_user.shard_of("bob"))
+        with self.assertRaises(ValueError):
+            ShardLayout(Path("/data/shards"), count=0)
+
+
+class TestShardedRepositories(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.root = Path(tmp_dir.name)
+        self.home = connect(self.root / "app.sqlite")
+        self.addCleanup(self.home.close)
+        init_schema(self.home)
+
+    def _shards(self, layout: ShardLayout, max_per_thread: int = 32) -> ShardConnections:
+        shards = ShardConnections(layout, max_per_thread=max_per_thread)
+        self.addCleanup(shards.close_all)
+        return shards
+
+    def test_calls_go_to_the_users_shard(self) -> None:
+        shards = self._shards(ShardLayout(self.root / "shards", count=4))
+        users = ShardedUserRepository(self.home, shards)
+        meals = ShardedDayLogRepository(shards)
+        for i in range(8):
+            users.create_user(f"u{i}", f"name{i}", "hash", "salt", _CREATED)
+            meals.append_entry(_DAY, make_entry(f"e{i}", 8), f"u{i}")
+
+        auth = users.get_auth_by_username("name5")
+        assert auth is not None
+        self.assertEqual(auth.user_id, "u5")
+        self.assertIsNone(users.get_auth_by_username("nobody"))
+        self.assertEqual([e.entry_id for e in meals.load_day(_DAY, "u5").entries], ["e5"])
+        self.assertEqual(users.count_users(), 8)
+        # Each shard holds only its own users.
+        for shard in shards.layout.existing_shards():
+            conn = shards.get(shard)
+            owners = {r[0] for r in conn.execute("SELECT user_id FROM meal_entries")}
+            self.assertTrue(all(shards.layout.shard_of(u) == shard for u in owners))
+
+    def test_usernames_stay_unique_across_shards(self) -> None:
+        shards = self._shards(ShardLayout(self.root / "shards", count=4))
+        users = ShardedUserRepository(self.home, shards)
+        users.create_user("u1", "alice", "hash", "salt", _CREATED)
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            users.create_user("u2", "alice", "hash", "salt", _CREATED)
+
+        self.assertEqual(users.count_users(), 1)
+
+    def test_user_count_comes_from_the_directory(self) -> None:
+        shards = self._shards(ShardLayout(self.root / "users", per_user=True))
+        users = ShardedUserRepository(self.home, shards)
+        for i in range(3):
+            users.create_user(f"u{i}", f"name{i}", "hash", "salt", _CREATED)
+        shards.close_all()
+
+        with patch.object(shards, "_open", side_effect=AssertionError("opened a shard")):
+            self.assertEqual(users.count_users(), 3)
+
+    def test_each_thread_keeps_its_recent_shard_connections(self) -> None:
+        shards = self._shards(ShardLayout(self.root / "users", per_user=True), max_per_thread=2)
+        meals = ShardedDayLogRepository(shards)
+        for i in range(3):
+            meals.append_entry(_DAY, make_entry(f"e{i}", 8), f"u{i}")
+
+        self.assertEqual(shards.open_count(), 2)
+        self.assertEqual(len(shards.layout.existing_shards()), 3)
+        self.assertEqual(len(meals.load_day(_DAY, "u0").entries), 1)
+
+
+class TestReshard(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.root = Path(tmp_dir.name)
+        self.db_path = self.root / "app.sqlite"
+        self.home = connect(self.db_path)
+        self.addCleanup(self.home.close)
+        init_schema(self.home)
+        users = SqliteUserRepository(self.home)
+        meals = SqliteDayLogRepository(self.home)
+        for i in range(6):
+            users.create_user(f"u{i}", f"name{i}", "hash", "salt", _CREATED)
+            entries = [
+                make_entry(f"e{i * 10 + j}", 8, kcal=100 + i * 10 + j, barcode=str(j), minute=j) for j in range(3)
+            ]
+            meals.append_entries({_DAY: entries}, f"u{i}")
+        meals.append_entry(_DAY, make_entry("e99", 8), "")
+
+    def test_moves_users_with_their_logs_and_rollups(self) -> None:
+        layout = ShardLayout(self.root / "shards", count=3)
+
+        stats = reshard([self.db_path], self.home, layout)
+
+        self.assertEqual((stats.users, stats.entries, stats.unowned_entries), (6, 18, 1))
+        shards = ShardConnections(layout)
+        self.addCleanup(shards.close_all)
+        users = ShardedUserRepository(self.home, shards)
+        meals = ShardedDayLogRepository(shards)
+        auth = users.get_auth_by_username("name4")
+        assert auth is not None
+        self.assertEqual(auth.user_id, "u4")
+        self.assertEqual([e.entry_id for e in meals.load_day(_DAY, "u4").entries], ["e40", "e41", "e42"])
+        self.assertEqual(meals.totals_between("u4", _DAY, _DAY)[0][1].kcal, 100 * 3 + 40 + 41 + 42)
+        self.assertEqual(len(meals.quick_add_candidates("u4", 10)), 3)
+        self.assertEqual(users.count_users(), 6)
+
+    def test_reshards_shards_into_a_new_layout(self) -> None:
+        first = ShardLayout(self.root / "shards", count=2)
+        reshard([self.db_path], self.home, first)
+        second = ShardLayout(self.root / "shards", per_user=True)
+        sources = [first.path_of(shard) for shard in first.existing_shards()]
+
+        stats = reshard(sources, self.home, second)
+
+        self.assertEqual((stats.users, stats.shards), (6, 6))
+        shards = ShardConnections(second)
+        self.addCleanup(shards.close_all)
+        self.assertEqual(len(ShardedDayLogRepository(shards).load_day(_DAY, "u2").entries), 3)
+        with self.assertRaises(ValueError):
+            reshard(sources, self.home, second)
+        with self.assertRaises(ValueError):
+            reshard(sources, self.home, first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from havij.infrastructure.persistence.sqlite_db import ThreadLocalConnections
+
+
+class TestThreadLocalConnections(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.connections = ThreadLocalConnections(Path(self._tmp_dir.name) / "t.sqlite")
+
+    def tearDown(self) -> None:
+        self.connections.close_all()
+        self._tmp_dir.cleanup()
+
+    def test_same_thread_reuses_connection(self) -> None:
+        self.assertIs(self.connections.get(), self.connections.get())
+
+    def test_each_thread_gets_its_own_connection(self) -> None:
+        main_conn = self.connections.get()
+        seen = []
+
+        def worker() -> None:
+            conn = self.connections.get()
+            conn.execute("SELECT 1").fetchone()
+            seen.append(conn)
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+
+        self.assertEqual(len(seen), 1)
+        self.assertIsNot(seen[0], main_conn)
+
+    def test_connections_of_finished_threads_are_closed(self) -> None:
+        for _ in range(5):
+            t = threading.Thread(target=self.connections.get)
+            t.start()
+            t.join()
+
+        self.connections.get()
+
+        self.assertLessEqual(self.connections.open_count(), 2)
@@ -1,41 +1,279 @@
 import sqlite3
 import tempfile
 import unittest
-from datetime import date, datetime
+from dataclasses import replace
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
-from havij.infrastructure.persistence.sqlite_db import init_schema
+from havij.application.ports import BarcodeUsage
+from havij.application.services.user_service import ProcessPoolPasswordHasher, UserService
+from havij.infrastructure.persistence.quick_add import rebuild_quick_add
+from havij.infrastructure.persistence.sqlite_db import init_schema, rebuild_daily_totals
 from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
-from havij.domain.model.meal import DayLog, MealEntry
+from havij.infrastructure.persistence.user_repository import SqliteUserRepository
+from havij.domain.model.meal import DayLog
 from havij.domain.model.nutrients import Nutrients
+from tests.support import make_entry
 
 
 class TestSqliteRepository(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(str(Path(self._tmp_dir.name) / "t.sqlite"))
+        self.conn.row_factory = sqlite3.Row
+        init_schema(self.conn)
+        self.repo = SqliteDayLogRepository(self.conn)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        self._tmp_dir.cleanup()
+
     def test_sqlite_repository_roundtrip(self) -> None:
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            db = Path(tmp_dir) / "t.sqlite"
-            conn = sqlite3.connect(str(db))
-            try:
-                conn.row_factory = sqlite3.Row
-                init_schema(conn)
-                repo = SqliteDayLogRepository(conn)
-
-                d = date(2025, 1, 1)
-                user_id = "user-1"
-                log = DayLog(day=d, entries=[
-                    MealEntry(
-                        entry_id="e1",
-                        timestamp=datetime(2025, 1, 1, 9, 0, 0),
-                        barcode="111",
-                        product_name="X",
-                        grams=100.0,
-                        nutrients=Nutrients(100, 1, 2, 3),
-                    )
-                ])
-                repo.save_day(log, user_id)
-                loaded = repo.load_day(d, user_id)
-                self.assertEqual(len(loaded.entries), 1)
-                self.assertEqual(loaded.entries[0].barcode, "111")
-                self.assertEqual(loaded.total_nutrients().kcal, 100)
-            finally:
-                conn.close()
+        d = date(2025, 1, 1)
+        user_id = "user-1"
+        log = DayLog(day=d, entries=[make_entry("e1", 9)])
+        self.repo.save_day(log, user_id)
+        loaded = self.repo.load_day(d, user_id)
+        self.assertEqual(len(loaded.entries), 1)
+        self.assertEqual(loaded.entries[0].barcode, "111")
+        self.assertEqual(loaded.total_nutrients().kcal, 100)
+
+    def test_append_and_delete_single_entries(self) -> None:
+        d = date(2025, 1, 1)
+        self.repo.append_entry(d, make_entry("e1", 9), "user-1")
+        self.repo.append_entry(d, make_entry("e2", 12, kcal=250), "user-1")
+
+        removed = self.repo.delete_entry(d, "e1", "user-1")
+
+        self.assertEqual(removed, make_entry("e1", 9))
+        loaded = self.repo.load_day(d, "user-1")
+        self.assertEqual([e.entry_id for e in loaded.entries], ["e2"])
+        self.assertEqual(loaded.total_nutrients().kcal, 250)
+
+    def test_delete_entry_is_scoped_to_user_and_day(self) -> None:
+        d = date(2025, 1, 1)
+        self.repo.append_entry(d, make_entry("e1", 9), "user-1")
+
+        self.assertIsNone(self.repo.delete_entry(d, "e1", "user-2"))
+        self.assertIsNone(self.repo.delete_entry(date(2025, 1, 2), "e1", "user-1"))
+        self.assertEqual(len(self.repo.load_day(d, "user-1").entries), 1)
+
+    def test_totals_between_sums_per_day_and_fills_gaps(self) -> None:
+        d1, d3 = date(2025, 1, 1), date(2025, 1, 3)
+        self.repo.append_entry(d1, make_entry("e1", 9, kcal=100, day=d1), "user-1")
+        self.repo.append_entry(d1, make_entry("e2", 12, kcal=50, day=d1), "user-1")
+        self.repo.append_entry(d3, make_entry("e3", 9, kcal=70, day=d3), "user-1")
+        self.repo.append_entry(d3, make_entry("e4", 9, kcal=999, day=d3), "user-2")
+
+        totals = self.repo.totals_between("user-1", d1, d3)
+
+        self.assertEqual([d for d, _ in totals], [d1, date(2025, 1, 2), d3])
+        self.assertEqual([n.kcal for _, n in totals], [150, 0, 70])
+        self.assertEqual(totals[0][1], Nutrients(150, 2, 4, 6))
+
+    def test_totals_between_rejects_inverted_range(self) -> None:
+        with self.assertRaises(ValueError):
+            self.repo.totals_between("user-1", date(2025, 1, 2), date(2025, 1, 1))
+
+    def _rollup(self) -> list:
+        return [
+            (r["user_id"], date.fromordinal(r["day"]).isoformat(), r["kcal"], r["entry_count"])
+            for r in self.conn.execute("SELECT * FROM daily_totals ORDER BY user_id, day")
+        ]
+
+    def test_daily_totals_follow_entry_writes(self) -> None:
+        d = date(2025, 1, 1)
+        self.repo.append_entry(d, make_entry("e1", 9, kcal=100), "user-1")
+        self.repo.append_entry(d, make_entry("e2", 12, kcal=50), "user-1")
+        self.assertEqual(self._rollup(), [("user-1", "2025-01-01", 150, 2)])
+
+        self.repo.delete_entry(d, "e1", "user-1")
+        self.assertEqual(self._rollup(), [("user-1", "2025-01-01", 50, 1)])
+
+        self.repo.delete_entry(d, "e2", "user-1")
+        self.assertEqual(self._rollup(), [])
+
+    def test_append_entries_writes_all_days_and_rollups(self) -> None:
+        d1, d2 = date(2025, 1, 1), date(2025, 1, 2)
+        self.repo.append_entry(d1, make_entry("e0", 8, kcal=10), "user-1")
+        self.repo.append_entries(
+            {
+                d1: [make_entry("e1", 9, kcal=100), make_entry("e2", 12, kcal=50)],
+                d2: [make_entry("e3", 9, kcal=70, day=d2)],
+            },
+            "user-1",
+        )
+
+        self.assertEqual([e.entry_id for e in self.repo.load_day(d1, "user-1").entries], ["e0", "e1", "e2"])
+        self.assertEqual(
+            self._rollup(),
+            [("user-1", "2025-01-01", 160, 3), ("user-1", "2025-01-02", 70, 1)],
+        )
+
+    def test_append_entries_is_atomic(self) -> None:
+        d = date(2025, 1, 1)
+        self.repo.append_entry(d, make_entry("e1", 9), "user-1")
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.repo.append_entries({d: [make_entry("e2", 10), make_entry("e1", 11)]}, "user-1")
+
+        self.assertEqual([e.entry_id for e in self.repo.load_day(d, "user-1").entries], ["e1"])
+        self.assertEqual(self._rollup(), [("user-1", "2025-01-01", 100, 1)])
+
+    def test_iter_entries_streams_range_in_order(self) -> None:
+        d1, d2, d3 = date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)
+        self.repo.append_entries(
+            {
+                d2: [make_entry("e3", 12, day=d2), make_entry("e2", 8, day=d2)],
+                d1: [make_entry("e1", 9)],
+                d3: [make_entry("e4", 9, day=d3)],
+            },
+            "user-1",
+        )
+        self.repo.append_entry(d1, make_entry("other", 9), "user-2")
+
+        streamed = self.repo.iter_entries("user-1", d1, d2, chunk_size=2)
+
+        self.assertEqual([(d, e.entry_id) for d, e in streamed], [(d1, "e1"), (d2, "e2"), (d2, "e3")])
+        with self.assertRaises(ValueError):
+            self.repo.iter_entries("user-1", d2, d1)
+
+    def test_nutrients_between_reads_entry_columns(self) -> None:
+        d1, d2 = date(2025, 1, 1), date(2025, 1, 2)
+        self.repo.append_entries({d1: [make_entry("e1", 9, kcal=100), make_entry("e2", 10, kcal=50)]}, "user-1")
+        self.repo.append_entry(d2, make_entry("e3", 9, kcal=70, day=d2), "user-1")
+        self.repo.append_entry(d2, make_entry("other", 9, kcal=999, day=d2), "user-2")
+
+        batch = self.repo.nutrients_between("user-1", d1, d2)
+
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch.sum(), Nutrients(220, 3, 6, 9))
+        self.assertEqual(
+            batch.sum_by_day().to_list(),
+            [(d1, Nutrients(150, 2, 4, 6)), (d2, Nutrients(70, 1, 2, 3))],
+        )
+        self.assertEqual(len(self.repo.nutrients_between("user-1", date(2024, 1, 1), date(2024, 1, 2))), 0)
+
+    def test_barcode_usage_counts_recent_barcodes(self) -> None:
+        d1, d2, d3 = date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)
+        self.repo.append_entries({d1: [make_entry("old", 9)], d2: [make_entry("e1", 9, day=d2)]}, "user-1")
+        self.repo.append_entries(
+            {
+                d3: [
+                    make_entry("e2", 8, day=d3),
+                    replace(make_entry("e3", 12, day=d3), barcode="222"),
+                    replace(make_entry("manual", 13, day=d3), barcode=""),
+                ]
+            },
+            "user-1",
+        )
+        self.repo.append_entry(d3, replace(make_entry("other", 20, day=d3), barcode="333"), "user-2")
+
+        usage = self.repo.barcode_usage("user-1", since=d2, limit=10)
+
+        self.assertEqual(usage, [BarcodeUsage("222", 1, d3), BarcodeUsage("111", 2, d3)])
+        self.assertEqual(self.repo.barcode_usage("user-1", since=d2, limit=1), [BarcodeUsage("222", 1, d3)])
+
+    def _quick_add(self, user_id: str = "user-1") -> list:
+        return [(i.barcode or i.product_name, i.uses, i.grams) for i in self.repo.quick_add_candidates(user_id, 10)]
+
+    def test_quick_add_ranks_recent_foods_before_old_frequent_ones(self) -> None:
+        old, recent = date(2025, 1, 1), date(2025, 3, 1)
+        self.repo.append_entries({old: [make_entry(f"old{i}", 8 + i) for i in range(4)]}, "user-1")
+        self.repo.append_entry(recent, replace(make_entry("r1", 9, day=recent), barcode="222", grams=30.0), "user-1")
+        self.repo.append_entry(
+            recent, replace(make_entry("r2", 10, day=recent), barcode="", product_name=" Tea "), "user-1"
+        )
+        self.repo.append_entry(
+            recent, replace(make_entry("r3", 11, day=recent), barcode="", product_name="tea"), "user-1"
+        )
+
+        # Two months on, four old entries weigh less than one from today.
+        self.assertEqual(self._quick_add(), [("tea", 2, 100.0), ("222", 1, 30.0), ("111", 4, 100.0)])
+        [_, item, _] = self.repo.quick_add_candidates("user-1", 3)
+        self.assertEqual(item.nutrients_per_100g.kcal, 100 / 0.3)
+        self.assertEqual(item.last_used, datetime(2025, 3, 1, 9))
+        self.assertEqual(self._quick_add("user-2"), [])
+
+    def test_quick_add_follows_deletes_and_day_rewrites(self) -> None:
+        d1, d2 = date(2025, 1, 1), date(2025, 1, 2)
+        self.repo.append_entry(d1, make_entry("e1", 9), "user-1")
+        self.repo.append_entry(d2, replace(make_entry("e2", 9, day=d2), grams=40.0), "user-1")
+        self.assertEqual(self._quick_add(), [("111", 2, 40.0)])
+
+        self.repo.delete_entry(d2, "e2", "user-1")
+        self.assertEqual(self._quick_add(), [("111", 1, 100.0)])
+
+        self.repo.save_day(DayLog(day=d1, entries=[replace(make_entry("e3", 9), barcode="222")]), "user-1")
+        self.assertEqual(self._quick_add(), [("222", 1, 100.0)])
+
+        self.repo.delete_entry(d1, "e3", "user-1")
+        self.assertEqual(self._quick_add(), [])
+
+    def test_quick_add_rebuild_matches_incremental_upkeep(self) -> None:
+        days = [date(2025, 1, 1) + timedelta(days=i) for i in range(10)]
+        for i, d in enumerate(days):
+            self.repo.append_entry(d, replace(make_entry(f"e{i}", 9, day=d), barcode=str(100 + i % 3)), "user-1")
+        self.repo.save_day(DayLog(day=date(2025, 2, 1), entries=[make_entry("u1", 9, day=date(2025, 2, 1))]), "")
+        self.repo.assign_unowned_entries("user-1")
+        # An older entry and the latest one of the same food.
+        self.repo.delete_entry(days[1], "e1", "user-1")
+        self.repo.delete_entry(days[7], "e7", "user-1")
+        incremental = self.conn.execute("SELECT * FROM quick_add ORDER BY item_key").fetchall()
+
+        with self.conn:
+            self.assertEqual(rebuild_quick_add(self.conn), 4)
+
+        rebuilt = self.conn.execute("SELECT * FROM quick_add ORDER BY item_key").fetchall()
+        self.assertEqual([tuple(r)[:-1] for r in rebuilt], [tuple(r)[:-1] for r in incremental])
+        for r, i in zip(rebuilt, incremental):
+            self.assertAlmostEqual(r["score"], i["score"], places=9)
+
+    def test_daily_totals_follow_save_day_and_assignment(self) -> None:
+        d = date(2025, 1, 1)
+        self.repo.save_day(DayLog(day=d, entries=[make_entry("e1", 9), make_entry("e2", 10)]), "")
+        self.assertEqual(self._rollup(), [("", "2025-01-01", 200, 2)])
+
+        self.assertEqual(self.repo.assign_unowned_entries("user-1"), 2)
+        self.assertEqual(self._rollup(), [("user-1", "2025-01-01", 200, 2)])
+
+        self.repo.save_day(DayLog(day=d, entries=[make_entry("e3", 9, kcal=30)]), "user-1")
+        self.assertEqual(self._rollup(), [("user-1", "2025-01-01", 30, 1)])
+
+    def test_rebuild_daily_totals_recovers_from_entries(self) -> None:
+        d = date(2025, 1, 1)
+        self.repo.append_entry(d, make_entry("e1", 9, kcal=100), "user-1")
+        self.conn.execute("DROP TABLE daily_totals")
+        # Re-run the meal-log migration, which recreates and fills the rollup.
+        self.conn.execute("PRAGMA user_version = 1")
+        self.conn.commit()
+
+        init_schema(self.conn)
+        self.assertEqual(self._rollup(), [("user-1", "2025-01-01", 100, 1)])
+
+        self.conn.execute("UPDATE daily_totals SET kcal = 0")
+        self.conn.commit()
+        self.assertEqual(rebuild_daily_totals(self.conn), 1)
+        self.assertEqual(self._rollup(), [("user-1", "2025-01-01", 100, 1)])
+
+
+class TestUserServiceOnSqlite(unittest.TestCase):
+    def test_pooled_hashing_keeps_repository_calls_on_the_calling_thread(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        # A plain connection refuses use from any other thread.
+        conn = sqlite3.connect(str(Path(tmp_dir.name) / "t.sqlite"))
+        self.addCleanup(conn.close)
+        conn.row_factory = sqlite3.Row
+        init_schema(conn)
+        hasher = ProcessPoolPasswordHasher(max_workers=1)
+        self.addCleanup(hasher.close)
+        repo = SqliteUserRepository(conn)
+        logins = []
+        service = UserService(repo=repo, hasher=hasher, on_login=lambda p: logins.append(repo.get_profile(p.user_id)))
+
+        profile = service.signup("alice", "secret")
+
+        self.assertEqual(service.authenticate("alice", "secret"), profile)
+        self.assertIsNone(service.authenticate("alice", "wrong"))
+        self.assertEqual(logins, [profile])
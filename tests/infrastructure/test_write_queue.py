@@ -0,0 +1,124 @@
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable
+
+from havij.infrastructure.persistence.meal_repository import SqliteDayLogRepository
+from havij.infrastructure.persistence.sqlite_db import ThreadLocalConnections, init_schema
+from havij.infrastructure.persistence.user_repository import SqliteUserRepository
+from havij.infrastructure.persistence.write_queue import GroupCommitWriter, WriterClosedError
+from tests.support import make_entry
+
+_DAY = date(2025, 1, 1)
+
+
+class TestGroupCommitWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.db_path = Path(tmp_dir.name) / "app.sqlite"
+        self.connections = ThreadLocalConnections(self.db_path)
+        self.addCleanup(self.connections.close_all)
+        init_schema(self.connections.get())
+
+    def _writer(self, **kwargs: Any) -> GroupCommitWriter:
+        writer = GroupCommitWriter(self.db_path, **kwargs)
+        self.addCleanup(writer.close)
+        return writer
+
+    def _insert_user(self, user_id: str) -> Callable[[sqlite3.Connection], str]:
+        def write(conn: sqlite3.Connection) -> str:
+            conn.execute(
+                "INSERT INTO users(user_id, username, password_hash, salt, created_at) VALUES(?, ?, '', '', '')",
+                (user_id, user_id),
+            )
+            return user_id
+
+        return write
+
+    def test_concurrent_writes_share_transactions(self) -> None:
+        writer = self._writer(window_s=0.02)
+        repo = SqliteDayLogRepository(self.connections, writer)
+
+        def log(start: int) -> None:
+            for i in range(start, start + 10):
+                repo.append_entry(_DAY, make_entry(f"e{i}", 8, kcal=10, minute=i % 60), "u1")
+
+        threads = [threading.Thread(target=log, args=(n * 10,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(repo.load_day(_DAY, "u1").entries), 80)
+        self.assertEqual(repo.totals_between("u1", _DAY, _DAY)[0][1].kcal, 800)
+        stats = writer.stats()
+        self.assertEqual((stats.operations, stats.failed), (80, 0))
+        self.assertLess(stats.batches, 80)
+
+    def test_a_failing_write_is_rolled_back_alone(self) -> None:
+        writer = self._writer(max_batch=3, window_s=1.0)
+        users = SqliteUserRepository(self.connections, writer)
+
+        first = writer.submit(self._insert_user("u1"))
+        duplicate = writer.submit(self._insert_user("u1"))
+        second = writer.submit(self._insert_user("u2"))
+
+        self.assertEqual((first.result(), second.result()), ("u1", "u2"))
+        with self.assertRaises(sqlite3.IntegrityError):
+            duplicate.result()
+        self.assertEqual(users.count_users(), 2)
+        self.assertEqual(writer.stats().batches, 1)
+
+    def test_writer_survives_an_operation_raising_base_exception(self) -> None:
+        class Abort(BaseException):
+            pass
+
+        def abort(conn: sqlite3.Connection) -> None:
+            raise Abort()
+
+        writer = self._writer()
+        with self.assertRaises(Abort):
+            writer.submit(abort).result(timeout=5)
+
+        self.assertEqual(writer.submit(self._insert_user("u1")).result(timeout=5), "u1")
+        self.assertEqual(writer.stats().failed, 1)
+
+    def test_results_are_committed_when_returned(self) -> None:
+        writer = self._writer()
+        repo = SqliteDayLogRepository(self.connections, writer)
+        repo.append_entry(_DAY, make_entry("e1", 8), "u1")
+
+        other = sqlite3.connect(str(self.db_path))
+        self.addCleanup(other.close)
+        self.assertEqual(other.execute("SELECT COUNT(*) FROM meal_entries").fetchone()[0], 1)
+        self.assertEqual(repo.delete_entry(_DAY, "e1", "u1"), make_entry("e1", 8))
+        self.assertIsNone(repo.delete_entry(_DAY, "e1", "u1"))
+        self.assertEqual(other.execute("SELECT COUNT(*) FROM meal_entries").fetchone()[0], 0)
+
+    def test_nested_writes_run_in_the_same_transaction(self) -> None:
+        writer = self._writer()
+
+        def outer(conn: sqlite3.Connection) -> str:
+            return self._insert_user("u1")(conn) + writer.run(self._insert_user("u2"))
+
+        self.assertEqual(writer.run(outer), "u1u2")
+        self.assertEqual(writer.stats().batches, 1)
+
+    def test_close_commits_queued_writes(self) -> None:
+        writer = GroupCommitWriter(self.db_path, window_s=1.0)
+        futures = [writer.submit(self._insert_user(f"u{i}")) for i in range(5)]
+
+        writer.close()
+
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertEqual(SqliteUserRepository(self.connections).count_users(), 5)
+        with self.assertRaises(WriterClosedError):
+            writer.submit(self._insert_user("u9"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Fakes and fixtures shared by the test modules."""
+from datetime import date, datetime
+
+from havij.domain.model.meal import MealEntry
+from havij.domain.model.nutrients import Nutrients
+
+
+class FakeClock:
+    """A ``clock`` callable that only moves when a test sets or advances ``now``."""
+
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_entry(
+    entry_id: str,
+    hour: int,
+    kcal: float = 100,
+    day: date = date(2025, 1, 1),
+    barcode: str = "111",
+    minute: int = 0,
+) -> MealEntry:
+    return MealEntry(
+        entry_id=entry_id,
+        timestamp=datetime(day.year, day.month, day.day, hour, minute, 0),
+        barcode=barcode,
+        product_name="X",
+        grams=100.0,
+        nutrients=Nutrients(kcal, 1, 2, 3),
+    )